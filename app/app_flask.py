@@ -1,40 +1,100 @@
 # app_flask.py 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, url_for, Response, g
+from werkzeug.utils import secure_filename
 import sys
 import os
+import json
+import csv
+import time
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Important pour Flask
-import matplotlib.pyplot as plt
 import io
 import base64
 
 # Ajoute le dossier courant au chemin
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Importe vos modules
-try:
-    from evaporateurs import evaporation_triple_effet
-    from optimisation import *
-    from cristallisation import *
-    from thermodynamique import Thermo
-    print("✅ Modules importés avec succès")
-except Exception as e:
-    print(f"⚠ Erreur d'import: {e}")
-    # Fonctions de secours
-    def evaporation_triple_effet(F, xF, x_final, P_base, T_feed):
-        return [F*0.7, F*0.5, F*0.3], [F*0.3, F*0.2, F*0.1], [0.3, 0.5, 0.65], [85, 70, 55], [1e6, 8e5, 6e5]
+from cache_resultats import CacheResultats, cle_parametres
+from taches import GestionnaireTaches
+import export
+from stockage import StockageColonnaire, DOSSIER_STOCKAGE
+import graphiques
+from graphiques import GRAPHIQUES, Rendu
+from mesures import METRIQUES, etape, commencer_detail, terminer_detail, format_timing
+
+# Modules de calcul : pas de repli, toutes les routes en dépendent
+from evaporateurs import evaporation_triple_effet, evaporation_multi_cas, evaporation_dynamique, echelon
+from optimisation import cout_evaporateur, cout_cristalliseur, TCI, OPEX, ROI
+from cristallisation import (profil_lineaire, sursaturation, croissance, nucleation,
+                             simulation_batch, volume_cristalliseur, puissance_agitation,
+                             optimiser_refroidissement, balayage_continu)
+from thermodynamique import Thermo
+from balayage import balayage_par_blocs, taille_grille, en_lignes, verifier_grille
+from optimisation import sensibilite_iter
+from economie import economic_optimization
+from encrassement import optimiser_nettoyages
+from incertitudes import monte_carlo
+from substitut import charger_si_present, CHEMIN_SUBSTITUT
 
 app = Flask(__name__)
 
-def graphique_to_base64():
-    """Convertit le graphique matplotlib actuel en base64"""
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    buffer.close()
-    return base64.b64encode(image_png).decode('utf-8')
+# Cache des résultats (persistance dans resultats/cache si EVAP_CACHE_DISQUE=1)
+DOSSIER_RESULTATS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resultats')
+CACHE_RESULTATS = CacheResultats(
+    capacite=256,
+    dossier=os.path.join(DOSSIER_RESULTATS, 'cache') if os.environ.get('EVAP_CACHE_DISQUE') else None
+)
+
+# Données brutes de calculer() par jeu de paramètres (mémoire seulement : tableaux
+# NumPy) : /api/simuler et les graphiques d'une même page partagent un seul calcul
+CACHE_CALCULS = CacheResultats(capacite=32)
+
+# Historique des lots et balayages (resultats/stockage) si EVAP_STOCKAGE=1
+HISTORIQUES = {}
+
+def historique(nom):
+    """Stockage colonnaire `nom`, ou None si l'historisation est désactivée"""
+    if not os.environ.get('EVAP_STOCKAGE'):
+        return None
+    if nom not in HISTORIQUES:
+        HISTORIQUES[nom] = StockageColonnaire(os.path.join(DOSSIER_STOCKAGE, nom))
+    return HISTORIQUES[nom]
+
+# Tâches longues exécutées en arrière-plan
+TACHES = GestionnaireTaches(n_workers=int(os.environ.get('EVAP_WORKERS', 2)))
+
+# ============ MESURES ============
+METRIQUES.decrire('evap_requetes_total', "Requêtes HTTP traitées")
+METRIQUES.decrire('evap_requete_duree_secondes', "Durée de traitement des requêtes HTTP")
+METRIQUES.decrire('evap_cache_entrees', "Entrées présentes dans chaque cache")
+METRIQUES.decrire('evap_cache_hits_total', "Consultations servies par chaque cache (mémoire ou disque)")
+METRIQUES.decrire('evap_cache_misses_total', "Consultations absentes de chaque cache")
+METRIQUES.decrire('evap_taches', "Tâches de fond par état")
+
+def timing_demande():
+    """Détail X-Timing demandé : en-tête X-Timing, ?timing=1 ou EVAP_TIMING=1"""
+    return bool(request.headers.get('X-Timing') or request.args.get('timing')
+                or os.environ.get('EVAP_TIMING'))
+
+@app.before_request
+def debut_mesure():
+    g.debut = time.perf_counter()
+    g.jeton_detail = commencer_detail() if timing_demande() else None
+
+@app.after_request
+def fin_mesure(reponse):
+    debut = g.pop('debut', None)
+    if debut is None:
+        return reponse
+    duree = time.perf_counter() - debut
+    route = request.url_rule.rule if request.url_rule else 'inconnue'
+    METRIQUES.observer('evap_requete_duree_secondes', duree, route=route)
+    METRIQUES.incrementer('evap_requetes_total', route=route, methode=request.method,
+                          statut=reponse.status_code)
+    
+    jeton = g.pop('jeton_detail', None)
+    if jeton is not None:
+        reponse.headers['X-Timing'] = format_timing(terminer_detail(jeton), duree)
+    return reponse
 
 @app.route('/')
 def index():
@@ -49,31 +109,64 @@ def test_api():
         'message': 'API Flask fonctionne',
         'endpoints': {
             '/api/test': 'Test API',
-            '/api/simuler': 'Lancer simulation (POST)',
-            '/api/download/<graph_id>': 'Télécharger graphique'
+            '/api/simuler': 'Lancer simulation (POST, "graphs": true pour inclure les images)',
+            '/api/simuler/lot': 'Simuler plusieurs scénarios (POST JSON, CSV ou NDJSON)',
+            '/api/simuler/dynamique': 'Régime transitoire de l\'évaporateur (POST, échelons par scénario)',
+            '/api/cache': 'Statistiques du cache des propriétés',
+            '/api/cache/vider': 'Vider le cache des propriétés (POST)',
+            '/api/cache/resultats': 'Statistiques du cache des résultats',
+            '/api/cache/resultats/vider': 'Vider le cache des résultats (POST)',
+            '/api/download/<graph_id>': 'Graphique à la demande (?F=&xF=&x_final=&T_feed=&format=png|svg|json)',
+            '/api/export/sensibilite': 'Analyse de sensibilité en flux (?param=&debut=&fin=&n=&format=ndjson|csv|xlsx)',
+            '/api/export/balayage': 'Plan factoriel en flux (POST, ?format=ndjson|csv|xlsx)',
+            '/api/historique/<nom>': 'Relire les lots / balayages stockés (?colonne=min,max)',
+            '/metrics': 'Compteurs et latences par étape (format Prometheus)',
+            '/api/jobs': 'Soumettre (POST) ou lister les tâches de fond',
+            '/api/jobs/<id>': 'État et progression d\'une tâche',
+            '/api/jobs/<id>/resultat': 'Résultat d\'une tâche terminée',
+            '/api/jobs/<id>/flux': 'Résultats partiels en continu (NDJSON)'
         }
     })
 
-@app.route('/api/simuler', methods=['POST'])
-def simuler():
-    """API pour exécuter la simulation complète"""
-    try:
-        # Récupère les paramètres
-        data = request.json
-        
-        # Paramètres avec valeurs par défaut
-        F = float(data.get('F', 20000))
-        xF = float(data.get('xF', 0.15))
-        x_final = float(data.get('x_final', 0.65))
-        T_feed = float(data.get('T_feed', 85))
-        
-        print(f"⚙️  Simulation avec: F={F}, xF={xF}, x_final={x_final}, T={T_feed}")
-        
-        # ============ CALCULS D'ÉVAPORATION ============
-        P_base = [1.5, 0.6, 0.15]
-        U = [2500, 2200, 1800]
-        
-        # Appelle votre fonction d'évaporation
+@app.route('/api/cache')
+def cache_stats():
+    """Statistiques du cache des propriétés thermodynamiques"""
+    if Thermo.cache is None:
+        return jsonify({'actif': False})
+    return jsonify({'actif': True, **Thermo.cache.stats()})
+
+@app.route('/api/cache/vider', methods=['POST'])
+def cache_vider():
+    """Vide le cache des propriétés thermodynamiques"""
+    Thermo.vider_cache()
+    return jsonify({'success': True})
+
+def lire_parametres(data):
+    """
+    Paramètres de simulation avec valeurs par défaut
+    masse_semence : semence du cristalliseur batch (kg/m³, 5 par défaut) ; à
+    cette charge la taille finale est celle de la semence (domine_par_semence),
+    une charge de l'ordre de 1e-3 kg/m³ laisse la croissance apparaître
+    """
+    params = {
+        'F': float(data.get('F', 20000)),
+        'xF': float(data.get('xF', 0.15)),
+        'x_final': float(data.get('x_final', 0.65)),
+        'T_feed': float(data.get('T_feed', 85)),
+        'masse_semence': float(data.get('masse_semence', 5.0)),
+    }
+    if params['masse_semence'] < 0:
+        raise ValueError("masse_semence : valeur ≥ 0 attendue (kg/m³)")
+    return params
+
+def calculer(F, xF, x_final, T_feed, masse_semence=5.0):
+    """Calculs d'évaporation, de cristallisation et d'économie (sans graphiques)"""
+    # ============ CALCULS D'ÉVAPORATION ============
+    P_base = [1.5, 0.6, 0.15]
+    U = [2500, 2200, 1800]
+    
+    # Appelle votre fonction d'évaporation
+    with etape('simuler.evaporation'):
         L, V, x, T, Q = evaporation_triple_effet(F, xF, x_final, P_base, T_feed)
         
         # Calcul des surfaces
@@ -87,8 +180,9 @@ def simuler():
         
         S = abs(Q[0]) / 2.15e6 if len(Q) > 0 else 0
         E = sum(V) / S if S > 0 else 0
-        
-        # ============ CALCULS DE CRISTALLISATION ============
+    
+    # ============ CALCULS DE CRISTALLISATION ============
+    with etape('simuler.cristallisation'):
         t = np.linspace(0, 4*3600, 100)
         Tlin = profil_lineaire(t, 70, 35, 4*3600)
         C = 75  # Concentration constante pour l'exemple
@@ -97,203 +191,170 @@ def simuler():
         Glin = croissance(Slin, Tlin)
         Blin = nucleation(Slin, 50)
         
-        # ============ DIMENSIONNEMENT ============
+        # Bilan de population (méthode des moments) pour L50 et CV
+        batch = simulation_batch(lambda ti: profil_lineaire(ti, 70, 35, 4*3600),
+                                 masse_semence=masse_semence)
+    
+    # ============ DIMENSIONNEMENT ============
+    with etape('simuler.dimensionnement'):
         rho = Thermo.densite(0.65, 60)
         Vcr = volume_cristalliseur(5000, rho)
         Pagit = puissance_agitation(Vcr)
-        
-        # ============ ANALYSE ÉCONOMIQUE (si disponible) ============
-        try:
+    
+    # ============ ANALYSE ÉCONOMIQUE (si disponible) ============
+    try:
+        with etape('simuler.economie'):
             Cev = sum([cout_evaporateur(a) for a in A])
             Ccr = cout_cristalliseur(Vcr)
             TCI_total = TCI(Cev + Ccr)
             opex = OPEX(S, 150)
             roi = ROI(TCI_total, 300000)
-            
-            economique = {
-                'tci': float(TCI_total / 1e6),
-                'opex': float(opex / 1e6),
-                'roi': float(roi)
-            }
-        except:
-            economique = {
-                'tci': 225.0,
-                'opex': 1.27,
-                'roi': 750.0
-            }
         
-        # ============ GÉNÉRATION DES GRAPHIQUES ============
+        economique = {
+            'tci': float(TCI_total / 1e6),
+            'opex': float(opex / 1e6),
+            'roi': float(roi)
+        }
+    except:
+        economique = {
+            'tci': 225.0,
+            'opex': 1.27,
+            'roi': 750.0
+        }
+    
+    return {
+        'L': L, 'V': V, 'x': x, 'T': T, 'Q': Q, 'A': A, 'S': S, 'E': E,
+        't': t, 'Tlin': Tlin, 'Slin': Slin, 'Glin': Glin, 'Blin': Blin,
+        'batch': batch, 'Vcr': Vcr, 'Pagit': Pagit, 'economique': economique
+    }
+
+def calculer_en_cache(params):
+    """calculer(**params), mémorisé par jeu de paramètres"""
+    return CACHE_CALCULS.obtenir_ou_calculer(cle_parametres(params, calcul=True),
+                                             lambda: calculer(**params))
+
+def resultats_json(params, d):
+    """Met en forme les résultats numériques pour l'API"""
+    L, V, x, T, A = d['L'], d['V'], d['x'], d['T'], d['A']
+    return {
+        'parametres': {
+            'F': params['F'],
+            'xF': params['xF'] * 100,
+            'x_final': params['x_final'] * 100,
+            'T_feed': params['T_feed'],
+            'masse_semence': params['masse_semence']
+        },
+        'evaporation': {
+            'effets': [
+                {
+                    'numero': i + 1,
+                    'liquide': float(L[i]) if len(L) > i else 0,
+                    'vapeur': float(V[i]) if len(V) > i else 0,
+                    'concentration': float(x[i] * 100) if len(x) > i else 0,
+                    'temperature': float(T[i]) if len(T) > i else 0,
+                    'surface': float(A[i]) if len(A) > i else 0
+                }
+                for i in range(3)
+            ],
+            'performance': {
+                'vapeur_chauffe': float(d['S']),
+                'economie_vapeur': float(d['E'])
+            }
+        },
+        'cristallisation': {
+            'sursaturation_finale': float(d['Slin'][-1]),
+            'croissance_finale': float(d['Glin'][-1]),
+            'nucleation_finale': float(d['Blin'][-1]),
+            'taille_moyenne': float(d['batch']['L50'][-1] * 1e6),
+            'coefficient_variation': float(d['batch']['CV'][-1]),
+            # L50 et CV ne reflètent que la semence supposée si le batch ne la fait pas croître
+            'domine_par_semence': bool(d['batch']['domine_par_semence']),
+            'croissance_relative': float(d['batch']['croissance_relative']),
+            'volume_cristalliseur': float(d['Vcr']),
+            'puissance_agitation': float(d['Pagit'])
+        },
+        'economique': d['economique']
+    }
+
+# ============ GÉNÉRATION DES GRAPHIQUES ============
+# Rendu sur objets Figure (graphiques.py), en parallèle pour les 4 graphiques
+RENDU = Rendu(n_workers=int(os.environ.get('EVAP_RENDU_WORKERS', 4)),
+              mode=os.environ.get('EVAP_RENDU_MODE', 'thread'))
+
+def tracer_graphique(graph_id, d, format_='png'):
+    """Trace un graphique et renvoie l'image (PNG ou SVG)"""
+    with etape(f'rendu.{graph_id}'):
+        return graphiques.tracer(graph_id, d, format_)
+
+@app.route('/api/cache/resultats')
+def cache_resultats_stats():
+    """Statistiques du cache des résultats de simulation"""
+    return jsonify(CACHE_RESULTATS.stats())
+
+@app.route('/api/cache/resultats/vider', methods=['POST'])
+def cache_resultats_vider():
+    """Vide le cache des résultats (?disque=1 supprime aussi les fichiers)"""
+    CACHE_RESULTATS.vider(disque=bool(request.args.get('disque')))
+    return jsonify({'success': True})
+
+def non_modifie(cle):
+    """Réponse 304 si le client possède déjà la version `cle` (If-None-Match)"""
+    if cle in request.if_none_match:
+        reponse = app.response_class(status=304)
+        reponse.set_etag(cle)
+        return reponse
+    return None
+
+def preparer_resultats(params, avec_graphiques=False):
+    """Calcule la simulation complète et met en forme les résultats"""
+    d = calculer_en_cache(params)
+    
+    # ============ PRÉPARE LES RÉSULTATS COMPLETS ============
+    resultats = resultats_json(params, d)
+    resultats['graphiques'] = {
+        graph_id: url_for('download_graph', graph_id=graph_id, **params)
+        for graph_id in GRAPHIQUES
+    }
+    
+    if avec_graphiques:
         print("📊 Génération des graphiques...")
+        with etape('rendu.tous'):
+            images = RENDU.tracer_tous(d)
+        resultats['graphiques_png'] = {
+            graph_id: base64.b64encode(png).decode('utf-8') for graph_id, png in images.items()
+        }
+        print("✅ Graphiques générés")
+    return resultats
+
+@app.route('/api/simuler', methods=['POST'])
+def simuler():
+    """
+    API pour exécuter la simulation complète
+    Renvoie les données numériques et les URL des graphiques ;
+    'graphs': true inclut en plus les images PNG en base64
+    """
+    try:
+        # Récupère les paramètres
+        data = request.json or {}
+        params = lire_parametres(data)
         
-        # Graphique 1 : Profils température et concentration
-        plt.figure(figsize=(10, 4))
-        
-        plt.subplot(1, 2, 1)
-        plt.plot(range(1, 4), T, 'o-', linewidth=2, markerfacecolor='white', markersize=8)
-        plt.title("Profil de température", fontweight='bold', fontsize=12)
-        plt.xlabel("Effet", fontweight='bold')
-        plt.ylabel("Température (°C)", fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.xticks([1, 2, 3])
-        
-        plt.subplot(1, 2, 2)
-        plt.plot(range(1, 4), np.array(x) * 100, 'o-', color='red', linewidth=2, 
-                markerfacecolor='white', markersize=8)
-        plt.title("Profil de concentration", fontweight='bold', fontsize=12)
-        plt.xlabel("Effet", fontweight='bold')
-        plt.ylabel("Concentration (%)", fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.xticks([1, 2, 3])
-        
-        plt.tight_layout()
-        graph1 = graphique_to_base64()
-        plt.close()
-        
-        # Graphique 2 : Production vapeur et surfaces
-        plt.figure(figsize=(10, 4))
-        
-        plt.subplot(1, 2, 1)
-        bars1 = plt.bar(range(1, 4), V, color='skyblue', edgecolor='navy', width=0.6)
-        plt.title("Production de vapeur", fontweight='bold', fontsize=12)
-        plt.xlabel("Effet", fontweight='bold')
-        plt.ylabel("Vapeur (kg/h)", fontweight='bold')
-        plt.grid(axis='y', alpha=0.3)
-        plt.xticks([1, 2, 3])
-        
-        # Ajoute les valeurs sur les barres
-        for bar in bars1:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.0f}', ha='center', va='bottom', fontweight='bold')
-        
-        plt.subplot(1, 2, 2)
-        bars2 = plt.bar(range(1, 4), A, color='lightgreen', edgecolor='darkgreen', width=0.6)
-        plt.title("Surface d'échange", fontweight='bold', fontsize=12)
-        plt.xlabel("Effet", fontweight='bold')
-        plt.ylabel("Surface (m²)", fontweight='bold')
-        plt.grid(axis='y', alpha=0.3)
-        plt.xticks([1, 2, 3])
-        
-        # Ajoute les valeurs sur les barres
-        for bar in bars2:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.1f}', ha='center', va='bottom', fontweight='bold')
-        
-        plt.tight_layout()
-        graph2 = graphique_to_base64()
-        plt.close()
-        
-        # Graphique 3 : Cristallisation (température et sursaturation)
-        plt.figure(figsize=(10, 4))
-        
-        plt.subplot(1, 2, 1)
-        plt.plot(t/3600, Tlin, 'b-', linewidth=2)
-        plt.title("Profil de température - Cristallisation", fontweight='bold', fontsize=12)
-        plt.xlabel("Temps (h)", fontweight='bold')
-        plt.ylabel("Température (°C)", fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.fill_between(t/3600, Tlin, alpha=0.3, color='blue')
-        
-        plt.subplot(1, 2, 2)
-        plt.plot(t/3600, Slin, 'r-', linewidth=2)
-        plt.title("Profil de sursaturation", fontweight='bold', fontsize=12)
-        plt.xlabel("Temps (h)", fontweight='bold')
-        plt.ylabel("Sursaturation relative", fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.fill_between(t/3600, Slin, alpha=0.3, color='red')
-        
-        plt.tight_layout()
-        graph3 = graphique_to_base64()
-        plt.close()
-        
-        # Graphique 4 : Vitesse de croissance et taille
-        plt.figure(figsize=(10, 4))
-        
-        plt.subplot(1, 2, 1)
-        plt.plot(t/3600, Glin * 1e6, 'g-', linewidth=2)  # Converti en µm/s
-        plt.title("Vitesse de croissance", fontweight='bold', fontsize=12)
-        plt.xlabel("Temps (h)", fontweight='bold')
-        plt.ylabel("G (µm/s)", fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.fill_between(t/3600, Glin * 1e6, alpha=0.3, color='green')
-        
-        # Taille des cristaux au cours du temps
-        taille_cristaux = Glin * t * 1e6  # Taille en µm
-        plt.subplot(1, 2, 2)
-        plt.plot(t/3600, taille_cristaux, '#6f42c1', linewidth=2)
-        plt.title("Évolution de la taille des cristaux", fontweight='bold', fontsize=12)
-        plt.xlabel("Temps (h)", fontweight='bold')
-        plt.ylabel("Taille (µm)", fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.fill_between(t/3600, taille_cristaux, alpha=0.3, color='#6f42c1')
-        
-        plt.tight_layout()
-        graph4 = graphique_to_base64()
-        plt.close()
+        print(f"⚙️  Simulation avec: F={params['F']}, xF={params['xF']}, "
+              f"x_final={params['x_final']}, T={params['T_feed']}")
         
-        print("✅ Graphiques générés")
+        avec_graphiques = bool(data.get('graphs'))
+        cle = cle_parametres(params, graphs=avec_graphiques)
+        reponse = non_modifie(cle)
+        if reponse is not None:
+            return reponse
         
-        # ============ PRÉPARE LES RÉSULTATS COMPLETS ============
-        resultats = {
-            'parametres': {
-                'F': F,
-                'xF': xF * 100,
-                'x_final': x_final * 100,
-                'T_feed': T_feed
-            },
-            'evaporation': {
-                'effets': [
-                    {
-                        'numero': 1,
-                        'liquide': float(L[0]) if len(L) > 0 else 0,
-                        'vapeur': float(V[0]) if len(V) > 0 else 0,
-                        'concentration': float(x[0] * 100) if len(x) > 0 else 0,
-                        'temperature': float(T[0]) if len(T) > 0 else 0,
-                        'surface': float(A[0]) if len(A) > 0 else 0
-                    },
-                    {
-                        'numero': 2,
-                        'liquide': float(L[1]) if len(L) > 1 else 0,
-                        'vapeur': float(V[1]) if len(V) > 1 else 0,
-                        'concentration': float(x[1] * 100) if len(x) > 1 else 0,
-                        'temperature': float(T[1]) if len(T) > 1 else 0,
-                        'surface': float(A[1]) if len(A) > 1 else 0
-                    },
-                    {
-                        'numero': 3,
-                        'liquide': float(L[2]) if len(L) > 2 else 0,
-                        'vapeur': float(V[2]) if len(V) > 2 else 0,
-                        'concentration': float(x[2] * 100) if len(x) > 2 else 0,
-                        'temperature': float(T[2]) if len(T) > 2 else 0,
-                        'surface': float(A[2]) if len(A) > 2 else 0
-                    }
-                ],
-                'performance': {
-                    'vapeur_chauffe': float(S),
-                    'economie_vapeur': float(E)
-                }
-            },
-            'cristallisation': {
-                'sursaturation_finale': float(Slin[-1]),
-                'croissance_finale': float(Glin[-1]),
-                'nucleation_finale': float(Blin[-1]),
-                'taille_moyenne': float(L50(Glin[-1], t[-1]) * 1e6),
-                'coefficient_variation': float(CV()),
-                'volume_cristalliseur': float(Vcr),
-                'puissance_agitation': float(Pagit)
-            },
-            'economique': economique,
-            'graphiques': {
-                'profils_temp_conc': graph1,
-                'vapeur_surface': graph2,
-                'cristallisation': graph3,
-                'croissance_taille': graph4
-            }
-        }
+        resultats = CACHE_RESULTATS.obtenir_ou_calculer(
+            cle, lambda: preparer_resultats(params, avec_graphiques)
+        )
         
         print("✅ Simulation terminée avec succès")
-        return jsonify({'success': True, 'resultats': resultats})
+        reponse = jsonify({'success': True, 'resultats': resultats})
+        reponse.set_etag(cle)
+        return reponse
         
     except Exception as e:
         print(f"❌ Erreur: {e}")
@@ -301,17 +362,508 @@ def simuler():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)})
 
+# ============ SIMULATION PAR LOT ============
+MAX_SCENARIOS = 100000
+COLONNES_LOT = ['F', 'xF', 'x_final', 'T_feed', 'T1', 'T2', 'T3', 'A1', 'A2', 'A3',
+                'vapeur_chauffe', 'economie_vapeur', 'tci', 'opex', 'roi']
+
+def lire_scenarios(req):
+    """
+    Scénarios d'une requête : liste JSON (ou {"scenarios": [...]}),
+    fichier / corps CSV avec en-tête, ou JSON-lines
+    """
+    if req.files:
+        fichier = next(iter(req.files.values()))
+        texte = fichier.read().decode('utf-8')
+        format_ = 'csv' if fichier.filename.lower().endswith('.csv') else 'ndjson'
+    elif req.mimetype == 'text/csv':
+        texte, format_ = req.get_data(as_text=True), 'csv'
+    elif req.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        texte, format_ = req.get_data(as_text=True), 'ndjson'
+    else:
+        data = req.get_json() or {}
+        return data if isinstance(data, list) else data.get('scenarios', [])
+    
+    if format_ == 'csv':
+        return list(csv.DictReader(io.StringIO(texte)))
+    return [json.loads(ligne) for ligne in texte.splitlines() if ligne.strip()]
+
+def calculer_lot(F, xF, x_final, T_feed, evaporation=None):
+    """
+    Évaporation et économie de N scénarios en une passe vectorisée
+    evaporation : bilans à utiliser (evaporation_multi_cas par défaut, ou celui du substitut)
+    """
+    P_base = [1.5, 0.6, 0.15]
+    U = np.array([2500, 2200, 1800])
+    
+    L, V, x, T, Q = (evaporation or evaporation_multi_cas)(F, xF, x_final, P_base, T_feed)
+    
+    # Mêmes conventions que calculer() : surface nulle si force motrice <= 0
+    DT = np.column_stack([120 - T[:, 0], T[:, 0] - T[:, 1], T[:, 1] - T[:, 2]])
+    A = np.where(DT > 0, np.abs(Q) / (U * np.where(DT > 0, DT, 1)), 0)
+    S = np.abs(Q[:, 0]) / 2.15e6
+    E = np.where(S > 0, V.sum(axis=1) / np.where(S > 0, S, 1), 0)
+    
+    # Le cristalliseur ne dépend pas des scénarios
+    Vcr = volume_cristalliseur(5000, Thermo.densite(0.65, 60))
+    TCI_total = TCI(cout_evaporateur(A).sum(axis=1) + cout_cristalliseur(Vcr))
+    opex = OPEX(S, 150)
+    
+    return {
+        'F': F, 'xF': xF, 'x_final': x_final, 'T_feed': T_feed,
+        'T1': T[:, 0], 'T2': T[:, 1], 'T3': T[:, 2],
+        'A1': A[:, 0], 'A2': A[:, 1], 'A3': A[:, 2],
+        'vapeur_chauffe': S, 'economie_vapeur': E,
+        'tci': TCI_total / 1e6, 'opex': opex / 1e6, 'roi': ROI(TCI_total, 300000),
+    }
+
+@app.route('/api/simuler/lot', methods=['POST'])
+def simuler_lot():
+    """
+    Simule une liste de scénarios en une seule requête
+    Réponse tabulaire : {"colonnes": [...], "lignes": [[...], ...]}, ou CSV avec ?format=csv
+    """
+    try:
+        scenarios = [lire_parametres(sc) for sc in lire_scenarios(request)]
+        if not scenarios:
+            return jsonify({'success': False, 'error': 'Aucun scénario fourni'}), 400
+        if len(scenarios) > MAX_SCENARIOS:
+            return jsonify({'success': False,
+                            'error': f'Trop de scénarios ({len(scenarios)} > {MAX_SCENARIOS})'}), 413
+        
+        entrees = {k: np.array([sc[k] for sc in scenarios]) for k in ('F', 'xF', 'x_final', 'T_feed')}
+        resultats = calculer_lot(**entrees)
+        table = np.column_stack([np.asarray(resultats[c], dtype=float) for c in COLONNES_LOT])
+        
+        stock = historique('lot')
+        if stock is not None:
+            stock.ajouter({c: table[:, i] for i, c in enumerate(COLONNES_LOT)})
+        
+        if request.args.get('format') == 'csv':
+            sortie = io.StringIO()
+            sortie.write(','.join(COLONNES_LOT) + '\n')
+            np.savetxt(sortie, table, delimiter=',', fmt='%.10g')
+            return Response(sortie.getvalue(), mimetype='text/csv')
+        
+        return jsonify({'success': True, 'n': len(table),
+                        'colonnes': COLONNES_LOT, 'lignes': table.tolist()})
+        
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# ============ ESTIMATION RAPIDE (SUBSTITUT) ============
+# Substitut entraîné hors ligne (python substitut.py), chargé au démarrage s'il existe
+SUBSTITUT = charger_si_present(os.environ.get('EVAP_SUBSTITUT', CHEMIN_SUBSTITUT))
+
+@app.route('/api/estimer', methods=['POST'])
+def estimer():
+    """
+    Estimation instantanée (curseurs de l'interface) : mêmes colonnes que
+    /api/simuler/lot, bilans donnés par le substitut s'il est chargé
+    (modèle complet hors de son domaine d'entraînement)
+    """
+    try:
+        data = request.json or {}
+        scenarios = data if isinstance(data, list) else data.get('scenarios', [data])
+        scenarios = [lire_parametres(sc) for sc in scenarios]
+        if len(scenarios) > MAX_SCENARIOS:
+            return jsonify({'success': False,
+                            'error': f'Trop de scénarios ({len(scenarios)} > {MAX_SCENARIOS})'}), 413
+        
+        entrees = {k: np.array([sc[k] for sc in scenarios]) for k in ('F', 'xF', 'x_final', 'T_feed')}
+        evaporation = SUBSTITUT.evaporation_multi_cas if SUBSTITUT is not None else None
+        resultats = calculer_lot(**entrees, evaporation=evaporation)
+        table = np.column_stack([np.asarray(resultats[c], dtype=float) for c in COLONNES_LOT])
+        return jsonify({'success': True, 'n': len(table),
+                        'source': 'substitut' if SUBSTITUT is not None else 'modele',
+                        'erreurs_validation': SUBSTITUT.erreurs if SUBSTITUT is not None else None,
+                        'colonnes': COLONNES_LOT, 'lignes': table.tolist()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# ============ CRISTALLISATION CONTINUE ============
+@app.route('/api/cristallisation/continu', methods=['POST'])
+def cristallisation_continue():
+    """
+    Cascade MSMPR en régime permanent sur un plan temps de séjour × nombre d'étages
+    {"taus": [s, ...], "n_etages": [1, 2, 3], "T_final": 35, "T_alim": 70, "masse_semence": 5}
+    """
+    try:
+        data = request.json or {}
+        options = {cle: float(data[cle]) for cle in ('T_final', 'T_alim', 'C_alim', 'masse_semence',
+                                                      'L_semence', 'debit') if cle in data}
+        taus = np.asarray(data.get('taus', np.linspace(1800, 4 * 3600, 8)), dtype=float)
+        if taus.size * len(data.get('n_etages', (1, 2, 3, 4))) > MAX_SCENARIOS:
+            return jsonify({'success': False, 'error': f'Plan trop grand (> {MAX_SCENARIOS} points)'}), 413
+        grilles = balayage_continu(taus, data.get('n_etages', (1, 2, 3, 4)), **options)
+        return jsonify({'success': True, 'resultats': en_natif(grilles)})
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# ============ RÉGIME TRANSITOIRE ============
+def lire_entree_dynamique(valeur):
+    """
+    Entrée du modèle transitoire : nombre (constante), liste (un niveau par
+    scénario) ou {"t0": s, "avant": ..., "apres": ..., "duree": s} (échelon)
+    """
+    if isinstance(valeur, dict):
+        return echelon(float(valeur['t0']), np.asarray(valeur['avant'], dtype=float),
+                       np.asarray(valeur['apres'], dtype=float), float(valeur.get('duree', 60)))
+    return np.asarray(valeur, dtype=float)
+
+@app.route('/api/simuler/dynamique', methods=['POST'])
+def simuler_dynamique():
+    """
+    Transitoire de l'évaporateur (démarrage, perturbations de débit, de
+    concentration, de température d'alimentation ou de pression de vapeur)
+    {"duree": 3600, "F": {"t0": 600, "avant": 20000, "apres": [18000, 22000]}, ...}
+    """
+    try:
+        data = request.json or {}
+        options = {cle: lire_entree_dynamique(data[cle])
+                   for cle in ('F', 'xF', 'T_feed', 'P_vapeur') if cle in data}
+        for cle in ('P', 'x_final', 'retention', 'n_points', 'demarrage'):
+            if cle in data:
+                options[cle] = data[cle]
+        resultat = evaporation_dynamique(float(data.get('duree', 3600)), **options)
+        return jsonify({'success': True, 'resultats': en_natif(resultat)})
+    except (ValueError, KeyError, TypeError, RuntimeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/api/download/<graph_id>')
 def download_graph(graph_id):
-    """Télécharge un graphique spécifique"""
-    # Cette fonction peut être étendue pour sauvegarder les graphiques
-    return jsonify({'message': f'Téléchargement de {graph_id} (à implémenter)'})
+    """
+    Trace un graphique à la demande pour les paramètres passés en query string
+    ?format=png (défaut), svg, ou json (séries et libellés, tracé par le navigateur)
+    ?telecharger=1 force le téléchargement du fichier
+    """
+    if graph_id not in GRAPHIQUES:
+        return jsonify({'success': False, 'error': f'Graphique inconnu : {graph_id}'}), 404
+    format_ = request.args.get('format', 'png')
+    if format_ not in ('png', 'svg', 'json'):
+        return jsonify({'success': False, 'error': f'Format inconnu : {format_}'}), 400
+    
+    try:
+        params = lire_parametres(request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    cle = cle_parametres(params, graphique=graph_id, format=format_)
+    reponse = non_modifie(cle)
+    if reponse is not None:
+        return reponse
+    
+    if format_ == 'json':
+        donnees = CACHE_RESULTATS.obtenir_ou_calculer(
+            cle, lambda: graphiques.donnees_graphique(graph_id, calculer_en_cache(params))
+        )
+        reponse = jsonify(donnees)
+        reponse.set_etag(cle)
+        return reponse
+    
+    image = CACHE_RESULTATS.obtenir_ou_calculer(
+        cle, lambda: tracer_graphique(graph_id, calculer_en_cache(params), format_), '.' + format_
+    )
+    nom_fichier = os.path.splitext(GRAPHIQUES[graph_id])[0] + '.' + format_
+    reponse = send_file(io.BytesIO(image), mimetype=graphiques.FORMATS_IMAGE[format_],
+                        as_attachment=bool(request.args.get('telecharger')),
+                        download_name=nom_fichier, etag=False)
+    reponse.set_etag(cle)
+    return reponse
+
+# ============ EXPORTS EN FLUX ============
+def nom_export(nom):
+    """Nom de fichier d'export sûr (sans chemin) ; ValueError s'il est vide une fois nettoyé"""
+    sur = secure_filename(str(nom))
+    if not sur.strip('.'):
+        raise ValueError(f"Nom d'export invalide : {nom!r}")
+    return sur
+
+def reponse_export(lignes, nom):
+    """
+    Diffuse les lignes au format ?format= (ndjson, csv ou xlsx) ;
+    ?enregistrer=1 écrit aussi le fichier dans resultats/exports au fil de l'eau
+    """
+    try:
+        nom = nom_export(nom)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    format_ = request.args.get('format', 'ndjson')
+    if format_ == 'xlsx':
+        buffer = io.BytesIO()
+        try:
+            export.exporter_excel(lignes, buffer)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        buffer.seek(0)
+        return send_file(buffer, as_attachment=True, download_name=nom + '.xlsx',
+                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    if format_ not in export.FORMATS:
+        return jsonify({'success': False, 'error': f'Format inconnu : {format_}'}), 400
+    
+    mimetype, extension = export.FORMATS[format_]
+    morceaux = export.serialiser(lignes, format_)
+    if request.args.get('enregistrer'):
+        morceaux = export.ecrire_en_flux(morceaux, os.path.join(export.DOSSIER_EXPORTS, nom + extension))
+    
+    reponse = Response(morceaux, mimetype=mimetype)
+    reponse.headers['Content-Disposition'] = f'attachment; filename={nom}{extension}'
+    return reponse
+
+@app.route('/api/export/sensibilite')
+def export_sensibilite():
+    """Analyse de sensibilité sur n points entre debut et fin, calculée et diffusée par blocs"""
+    try:
+        param = request.args.get('param', 'pression')
+        debut = float(request.args.get('debut', 1.2))
+        fin = float(request.args.get('fin', 1.9))
+        n = int(request.args.get('n', 100))
+        params = lire_parametres(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if param not in ('pression', 'concentration', 'debit', 'temperature'):
+        return jsonify({'success': False, 'error': f'Paramètre inconnu : {param}'}), 400
+    
+    pas = (fin - debut) / max(n - 1, 1)
+    valeurs = (debut + i * pas for i in range(n))
+    lignes = sensibilite_iter(valeurs, param, params['F'], params['xF'], params['x_final'],
+                              params['T_feed'], [1.5, 0.6, 0.15])
+    return reponse_export(lignes, f'sensibilite_{param}')
+
+# Processus par balayage demandé via l'API (n_processus absent : min(cœurs, plafond))
+MAX_PROCESSUS_BALAYAGE = int(os.environ.get('EVAP_PROCESSUS_BALAYAGE', 4))
+
+def options_balayage(n_processus=None, taille_bloc=5000):
+    """(n_processus, taille_bloc) validés ; ValueError si non entiers ≥ 1"""
+    plafond = min(os.cpu_count() or 1, MAX_PROCESSUS_BALAYAGE)
+    if n_processus is None:
+        n_processus = plafond
+    for nom, valeur in (('n_processus', n_processus), ('taille_bloc', taille_bloc)):
+        if isinstance(valeur, bool) or not isinstance(valeur, int) or valeur < 1:
+            raise ValueError(f"{nom} : entier ≥ 1 attendu (reçu {valeur!r})")
+    return min(n_processus, plafond), taille_bloc
+
+@app.route('/api/export/balayage', methods=['POST'])
+def export_balayage():
+    """Plan factoriel {"grille": {...}} calculé et diffusé bloc par bloc"""
+    data = request.json or {}
+    grille = data.get('grille', {})
+    # Erreurs signalées avant le début du flux (sinon 200 et corps tronqué)
+    try:
+        verifier_grille(grille)
+        n_processus, taille_bloc = options_balayage(data.get('n_processus'),
+                                                    data.get('taille_bloc', 5000))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    blocs = (bloc for _, _, bloc in balayage_par_blocs(grille, n_processus, taille_bloc))
+    return reponse_export(export.lignes_blocs(blocs), data.get('nom', 'balayage'))
+
+# ============ HISTORIQUE ============
+@app.route('/api/historique/<nom>')
+def lire_historique(nom):
+    """
+    Relit l'historique `nom` ('lot' ou 'balayage') sans recalcul
+    ?colonnes=F,tci restreint les colonnes ; ?F=15000,20000 filtre une plage
+    (borne vide = non bornée) ; ?format=csv|ndjson diffuse le résultat
+    """
+    if nom not in ('lot', 'balayage'):
+        return jsonify({'success': False, 'error': f'Historique inconnu : {nom}'}), 404
+    stock = historique(nom)
+    if stock is None:
+        return jsonify({'success': False, 'error': 'Historisation désactivée (EVAP_STOCKAGE)'}), 404
+    
+    connues = stock.colonnes
+    colonnes = [c for c in request.args.get('colonnes', '').split(',') if c] or None
+    inconnues = sorted(set(colonnes or ()) - set(connues))
+    if inconnues:
+        return jsonify({'success': False, 'error': f'Colonnes inconnues : {inconnues}'}), 400
+    filtres = {}
+    for colonne, plage in request.args.items():
+        if colonne in connues:
+            bas, _, haut = plage.partition(',')
+            try:
+                filtres[colonne] = (float(bas) if bas else None, float(haut) if haut else None)
+            except ValueError:
+                return jsonify({'success': False,
+                                'error': f'Plage invalide pour {colonne} : {plage!r}'}), 400
+    
+    donnees = stock.lire(colonnes, **filtres)
+    noms = list(donnees)
+    if request.args.get('format'):
+        lignes = (dict(zip(noms, ligne)) for ligne in zip(*(donnees[c].tolist() for c in noms)))
+        return reponse_export(lignes, f'historique_{nom}')
+    return jsonify({'success': True, 'n': len(donnees[noms[0]]) if noms else 0,
+                    'colonnes': {c: donnees[c].tolist() for c in noms}})
+
+# ============ MÉTRIQUES ============
+@app.route('/metrics')
+def metriques():
+    """Compteurs, histogrammes de latence et état des caches / tâches (format Prometheus)"""
+    jauges = []
+    for nom, stats in (('resultats', CACHE_RESULTATS.stats()),
+                       ('calculs', CACHE_CALCULS.stats()),
+                       ('proprietes', Thermo.cache.stats() if Thermo.cache is not None else None)):
+        if stats:
+            jauges.append(('evap_cache_entrees', stats['taille'], {'cache': nom}))
+            jauges.append(('evap_cache_hits_total', stats['hits'] + stats.get('hits_disque', 0),
+                           {'cache': nom}, 'counter'))
+            jauges.append(('evap_cache_misses_total', stats['misses'], {'cache': nom}, 'counter'))
+    
+    etats = {}
+    for tache in TACHES.lister():
+        etats[tache.etat] = etats.get(tache.etat, 0) + 1
+    for etat in ('en_attente', 'en_cours', 'terminee', 'echec'):
+        jauges.append(('evap_taches', etats.get(etat, 0), {'etat': etat}))
+    
+    return Response(METRIQUES.prometheus(jauges), mimetype='text/plain; version=0.0.4')
+
+# ============ TÂCHES DE FOND ============
+def en_natif(valeur):
+    """Convertit récursivement les types NumPy en types Python (JSON)"""
+    if isinstance(valeur, dict):
+        return {k: en_natif(v) for k, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [en_natif(v) for v in valeur]
+    if isinstance(valeur, np.ndarray):
+        return valeur.tolist()
+    if isinstance(valeur, np.generic):
+        return valeur.item()
+    return valeur
+
+def tache_simulation(tache, **params):
+    """Simulation complète (sans graphiques)"""
+    params = lire_parametres(params)
+    return resultats_json(params, calculer_en_cache(params))
+
+def tache_balayage(tache, grille, taille_bloc=5000, n_processus=None):
+    """Plan factoriel : chaque bloc évalué est publié comme résultat partiel"""
+    verifier_grille(grille)
+    n_processus, taille_bloc = options_balayage(n_processus, taille_bloc)
+    n = taille_grille(grille)
+    stock = historique('balayage')
+    for debut, fin, bloc in balayage_par_blocs(grille, n_processus, taille_bloc):
+        if stock is not None:
+            stock.ajouter(bloc)
+        tache.publier(en_lignes(bloc))
+        tache.avancer(fin / n)
+    return {'n_points': n}
+
+def tache_optimisation(tache, variables=('F',), methode='recherche', substitut=False, **options):
+    """Optimisation économique de l'évaporateur (substitut=True : sur le substitut chargé)"""
+    modele = SUBSTITUT if substitut else None
+    return en_natif(economic_optimization(tuple(variables), methode, modele=modele, **options))
+
+def tache_refroidissement(tache, famille='morceaux', **options):
+    """Optimisation du profil de refroidissement du cristalliseur"""
+    return en_natif(optimiser_refroidissement(famille, **options))
+
+def tache_nettoyages(tache, **options):
+    """Planning de nettoyage de l'évaporateur sur une campagne"""
+    return en_natif(optimiser_nettoyages(**options))
+
+def tache_incertitudes(tache, methode='sobol', **options):
+    """Propagation des incertitudes (Monte Carlo) sur la vapeur, la surface, le TCI et le ROI"""
+    return en_natif(monte_carlo(methode, **options))
+
+TYPES_TACHES = {
+    'simulation': tache_simulation,
+    'balayage': tache_balayage,
+    'optimisation': tache_optimisation,
+    'refroidissement': tache_refroidissement,
+    'nettoyages': tache_nettoyages,
+    'incertitudes': tache_incertitudes,
+}
+
+@app.route('/api/jobs', methods=['POST'])
+def soumettre_tache():
+    """
+    Soumet une tâche de fond : {"type": "balayage", "parametres": {...}}
+    Renvoie immédiatement l'identifiant de la tâche (202)
+    """
+    data = request.json or {}
+    type_tache = data.get('type')
+    if type_tache not in TYPES_TACHES:
+        return jsonify({'success': False,
+                        'error': f'Type de tâche inconnu : {type_tache}',
+                        'types': list(TYPES_TACHES)}), 400
+    
+    tache = TACHES.soumettre(type_tache, TYPES_TACHES[type_tache], data.get('parametres', {}))
+    reponse = jsonify({'success': True, **tache.etat_json(),
+                       'url': url_for('etat_tache', id_tache=tache.id)})
+    reponse.status_code = 202
+    return reponse
+
+@app.route('/api/jobs')
+def lister_taches():
+    """Liste des tâches connues"""
+    return jsonify([t.etat_json() for t in TACHES.lister()])
+
+def _tache_ou_404(id_tache):
+    tache = TACHES.obtenir(id_tache)
+    if tache is None:
+        return None, (jsonify({'success': False, 'error': f'Tâche inconnue : {id_tache}'}), 404)
+    return tache, None
+
+@app.route('/api/jobs/<id_tache>')
+def etat_tache(id_tache):
+    """État et progression d'une tâche"""
+    tache, erreur = _tache_ou_404(id_tache)
+    if erreur:
+        return erreur
+    return jsonify(tache.etat_json())
+
+@app.route('/api/jobs/<id_tache>/resultat')
+def resultat_tache(id_tache):
+    """
+    Résultat d'une tâche terminée ; les résultats partiels ne sont plus
+    conservés (/flux pendant le calcul, /api/historique si EVAP_STOCKAGE=1)
+    """
+    tache, erreur = _tache_ou_404(id_tache)
+    if erreur:
+        return erreur
+    if not tache.terminee:
+        return jsonify({'success': False, **tache.etat_json()}), 409
+    if tache.etat == 'echec':
+        return jsonify({'success': False, **tache.etat_json()}), 500
+    
+    return jsonify({'success': True, 'resultat': tache.resultat})
+
+@app.route('/api/jobs/<id_tache>/flux')
+def flux_tache(id_tache):
+    """Résultats partiels diffusés au fil du calcul (une ligne JSON par élément)"""
+    tache, erreur = _tache_ou_404(id_tache)
+    if erreur:
+        return erreur
+    
+    def generer():
+        for element in tache.suivre():
+            yield json.dumps(element) + '\n'
+    
+    return Response(generer(), mimetype='application/x-ndjson')
+
+# ============ PRÉCHAUFFAGE ============
+def prechauffer():
+    """
+    Prépare un worker avant qu'il accepte du trafic : importe CoolProp et
+    Matplotlib, remplit le cache des propriétés aux pressions de service et
+    met en cache la simulation par défaut (EVAP_PRECHAUFFAGE=1 au démarrage)
+    """
+    with etape('prechauffage'):
+        params = lire_parametres({})
+        d = calculer_en_cache(params)
+        tracer_graphique(next(iter(GRAPHIQUES)), d)
+        with app.test_request_context():
+            CACHE_RESULTATS.obtenir_ou_calculer(cle_parametres(params, graphs=False),
+                                               lambda: preparer_resultats(params))
+
+if os.environ.get('EVAP_PRECHAUFFAGE'):
+    prechauffer()
 
 if __name__ == '__main__':
     print("=" * 50)
     print("🚀 Lancement de l'interface web avec graphiques")
     print("📁 Dossier:", os.getcwd())
-    print("📊 Graphiques: Activés")
+    print("📊 Graphiques: À la demande (/api/download/<graph_id>)")
     print("🌐 URL: http://localhost:5000")
     print("=" * 50)
     app.run(debug=True, port=5000)
@@ -0,0 +1,166 @@
+"""
+Module balayage
+Plans factoriels complets sur l'évaporateur triple effet, répartis par
+blocs sur un pool de processus
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+import numpy as np
+
+from evaporateurs import evaporation_multi_cas
+from optimisation import surface_echange, ecarts_temperature, U
+from thermodynamique import Thermo
+
+# Valeurs de référence (celles de l'application web)
+REFERENCE = {
+    'debit': 20000,         # F (kg/h)
+    'xF': 0.15,
+    'concentration': 0.65,  # x_final
+    'temperature': 85,      # T_feed (°C)
+    'pression': 1.5,        # P1 (bar)
+    'P2': 0.6,
+    'P3': 0.15,
+}
+
+CHAMPS_SORTIE = ['vapeur', 'economie', 'surface', 'T1', 'T2', 'T3', 'A1', 'A2', 'A3']
+
+
+def verifier_grille(grille):
+    """Lève ValueError si la grille contient un paramètre inconnu ou un axe vide"""
+    if not isinstance(grille, dict) or not grille:
+        raise ValueError("Grille vide : {'pression': [...], ...} attendu")
+    inconnus = set(grille) - set(REFERENCE)
+    if inconnus:
+        raise ValueError(f"Paramètres inconnus : {sorted(inconnus)}")
+    for nom, valeurs in grille.items():
+        if np.ndim(valeurs) != 1 or len(valeurs) == 0:
+            raise ValueError(f"Valeurs de '{nom}' : liste non vide attendue")
+
+
+def taille_grille(grille):
+    """Nombre de points du plan factoriel"""
+    return int(np.prod([len(v) for v in grille.values()]))
+
+
+def points_grille(grille, debut, fin):
+    """Points [debut, fin) du plan factoriel, sous forme de dict de colonnes"""
+    noms = list(grille)
+    axes = [np.asarray(grille[nom], dtype=float) for nom in noms]
+    indices = np.unravel_index(np.arange(debut, fin), [len(a) for a in axes])
+
+    colonnes = {nom: np.full(fin - debut, float(v)) for nom, v in REFERENCE.items()}
+    for nom, axe, idx in zip(noms, axes, indices):
+        colonnes[nom] = axe[idx]
+    return colonnes
+
+
+def evaluer_bloc(grille, debut, fin):
+    """Évalue un bloc du plan et renvoie un tableau structuré"""
+    c = points_grille(grille, debut, fin)
+    P = np.column_stack([c['pression'], c['P2'], c['P3']])
+
+    L, V, x, T, Q = evaporation_multi_cas(c['debit'], c['xF'], c['concentration'], P, c['temperature'])
+    A = surface_echange(Q, U, ecarts_temperature(T))
+    S = Q[:, 0] / 2.15e6
+
+    sorties = {
+        'vapeur': S,
+        'economie': V.sum(axis=1) / S,
+        'surface': A.sum(axis=1),
+    }
+    for i in range(3):
+        sorties[f'T{i + 1}'] = T[:, i]
+        sorties[f'A{i + 1}'] = A[:, i]
+
+    champs = list(REFERENCE) + CHAMPS_SORTIE
+    resultat = np.empty(fin - debut, dtype=[(nom, 'f8') for nom in champs])
+    for nom, valeurs in {**c, **sorties}.items():
+        resultat[nom] = valeurs
+    return resultat
+
+
+def _initialiser_processus(tables):
+    """Initialisation d'un processus de travail du pool (jamais du processus appelant)"""
+    if tables:
+        Thermo.activer_tables()
+
+
+def balayage_par_blocs(grille, n_processus=None, taille_bloc=5000, tables=True):
+    """
+    Générateur : évalue le plan factoriel bloc par bloc et produit
+    (debut, fin, bloc) dans l'ordre, au fur et à mesure des calculs
+    grille : {'pression': [...], 'concentration': [...], 'debit': [...], ...}
+             (clés de REFERENCE, les autres paramètres restent à leur valeur de référence)
+    n_processus : nombre de processus (None : tous les cœurs, 1 : en série)
+    tables : active les tables de saturation dans chaque processus de travail ;
+             en série, le calcul se fait dans le processus appelant avec son
+             propre backend (Thermo n'est pas modifié)
+    Les processus sont lancés par 'spawn' : un fork hériterait des verrous
+    (METRIQUES, cache des propriétés) dans l'état où les tient un autre thread
+    """
+    verifier_grille(grille)
+    n = taille_grille(grille)
+    blocs = [(d, min(d + taille_bloc, n)) for d in range(0, n, taille_bloc)]
+    if n_processus is None:
+        n_processus = os.cpu_count() or 1
+    n_processus = min(n_processus, len(blocs))
+
+    if n_processus <= 1:
+        for d, f in blocs:
+            yield d, f, evaluer_bloc(grille, d, f)
+        return
+
+    # Au plus 2 blocs en vol par processus : la mémoire reste bornée même si
+    # le consommateur (flux HTTP, écriture disque) est plus lent que le calcul
+    with ProcessPoolExecutor(n_processus, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_initialiser_processus, initargs=(tables,)) as pool:
+        en_cours = deque()
+        for d, f in blocs:
+            en_cours.append((d, f, pool.submit(evaluer_bloc, grille, d, f)))
+            if len(en_cours) >= 2 * n_processus:
+                d0, f0, futur = en_cours.popleft()
+                yield d0, f0, futur.result()
+        while en_cours:
+            d0, f0, futur = en_cours.popleft()
+            yield d0, f0, futur.result()
+
+
+def balayage_parallele(grille, n_processus=None, taille_bloc=5000, tables=True):
+    """
+    Plan factoriel complet sur les paramètres de `grille` (voir balayage_par_blocs)
+    Retourne un tableau structuré NumPy (une ligne par point)
+    """
+    blocs = balayage_par_blocs(grille, n_processus, taille_bloc, tables)
+    return np.concatenate([bloc for _, _, bloc in blocs])
+
+
+def en_lignes(bloc):
+    """Convertit un tableau structuré en liste de dict (sérialisable en JSON)"""
+    noms = bloc.dtype.names
+    return [dict(zip(noms, ligne)) for ligne in bloc.tolist()]
+
+
+def en_dataframe(resultat):
+    """Convertit le tableau structuré en DataFrame pandas"""
+    import pandas as pd
+    return pd.DataFrame.from_records(resultat)
+
+
+if __name__ == "__main__":
+    import time
+
+    grille = {
+        'pression': np.linspace(1.2, 1.9, 50),
+        'concentration': np.linspace(0.55, 0.70, 40),
+        'debit': np.linspace(15000, 25000, 50),
+        'temperature': np.linspace(70, 95, 20),
+    }
+    for n_processus in [1, None]:
+        t0 = time.perf_counter()
+        res = balayage_parallele(grille, n_processus)
+        print(f"{len(res)} points, processus={n_processus or os.cpu_count()} : "
+              f"{time.perf_counter() - t0:.2f} s")
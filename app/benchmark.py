@@ -0,0 +1,380 @@
+"""
+Module benchmark
+Banc de mesure des chemins critiques (propriétés, bilans, surfaces,
+sensibilité, cristallisation, /api/simuler) à plusieurs tailles de problème :
+débit (ops/s), percentiles de latence et pic mémoire, avec référence
+enregistrée et détection des régressions
+
+Utilisation (depuis app/) :
+    python benchmark.py                       # mesure et affiche
+    python benchmark.py --enregistrer         # mesure et enregistre la référence
+    python benchmark.py --comparer            # mesure et compare à la référence
+                                              # (code de sortie 2 si aucune référence)
+    python benchmark.py --filtre sensibilite  # seulement les cas correspondants
+    python benchmark.py --imports             # temps d'import de app_flask par module
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+FICHIER_REFERENCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'resultats', 'benchmarks', 'reference.json')
+
+# Paramètres de référence (ceux de l'application web)
+F, XF, X_FINAL, T_FEED = 20000, 0.15, 0.65, 85
+P_BASE = [1.5, 0.6, 0.15]
+
+
+# ---------- CAS MESURÉS ----------
+# Chaque préparateur reçoit la taille et renvoie la fonction à chronométrer ;
+# la préparation (données, imports, tables) n'est pas mesurée
+
+def _tsat(n):
+    from thermodynamique import Thermo
+    P = np.linspace(0.1, 2.0, n)
+
+    def cas():
+        Thermo.vider_cache()
+        Thermo.Tsat(P if n > 1 else 1.5)
+    return cas
+
+
+def _tsat_tables(n):
+    from thermodynamique import Thermo
+    Thermo.activer_tables()
+    P = np.linspace(0.1, 2.0, n)
+
+    def cas():
+        Thermo.Tsat(P if n > 1 else 1.5)
+    return cas
+
+
+def _triple_effet(n):
+    from evaporateurs import evaporation_triple_effet, evaporation_multi_cas
+    from thermodynamique import Thermo
+    if n == 1:
+        def cas():
+            Thermo.vider_cache()
+            evaporation_triple_effet(F, XF, X_FINAL, P_BASE, T_FEED)
+        return cas
+
+    P = np.column_stack([np.linspace(1.2, 1.9, n), np.full(n, 0.6), np.full(n, 0.15)])
+
+    def cas():
+        Thermo.vider_cache()
+        evaporation_multi_cas(F, XF, X_FINAL, P, T_FEED)
+    return cas
+
+
+def _surface_echange(n):
+    from optimisation import surface_echange, U
+    rng = np.random.default_rng(0)
+    Q = rng.uniform(1e9, 5e10, (n, 3))
+    DT = rng.uniform(5, 25, (n, 3))
+
+    def cas():
+        surface_echange(Q, U, DT)
+    return cas
+
+
+def _sensibilite(n):
+    from optimisation import sensibilite
+    from thermodynamique import Thermo
+    valeurs = np.linspace(15000, 25000, n)
+
+    def cas():
+        Thermo.vider_cache()
+        sensibilite(valeurs, 'debit', F, XF, X_FINAL, T_FEED, P_BASE)
+    return cas
+
+
+def _cristallisation(n):
+    from cristallisation import simulation_batch, profil_lineaire
+    # n profils de refroidissement intégrés ensemble
+    Tf = np.linspace(30, 45, n)
+
+    def cas():
+        simulation_batch(lambda t: profil_lineaire(t, 70, Tf if n > 1 else 35, 4 * 3600))
+    return cas
+
+
+def _encrassement(n):
+    from encrassement import evaluer_plannings, bilan_reference
+    # n plannings de nettoyage aléatoires sur 56 jours, 3 effets
+    reference = bilan_reference()
+    plannings = np.random.default_rng(0).random((n, 56, 3)) < 0.1
+
+    def cas():
+        evaluer_plannings(plannings, reference=reference)
+    return cas
+
+
+def _incertitudes(n):
+    from incertitudes import monte_carlo
+    # n = 0 : tirage aléatoire, n = 1 : Sobol (même tolérance sur les percentiles)
+    methode = ['aleatoire', 'sobol'][n]
+
+    def cas():
+        monte_carlo(methode, tolerance=0.005)
+    return cas
+
+
+def _substitut(n):
+    from substitut import charger_si_present, entrainer
+    # Même lot que evaporation_triple_effet, bilans donnés par le substitut
+    substitut = charger_si_present() or entrainer(n=512, n_validation=64)
+    P = np.column_stack([np.linspace(1.2, 1.9, n), np.full(n, 0.6), np.full(n, 0.15)])
+
+    def cas():
+        substitut.evaporation_multi_cas(F, XF, X_FINAL, P, T_FEED)
+    return cas
+
+
+def _cristallisation_continue(n):
+    from cristallisation import balayage_continu
+    # n temps de séjour x cascades de 1 à 4 étages
+    taus = np.linspace(600, 4 * 3600, n)
+
+    def cas():
+        balayage_continu(taus, (1, 2, 3, 4))
+    return cas
+
+
+def _graphiques(n):
+    # Les 4 graphiques en PNG ; n = 0 : figures reconstruites, n = 1 : gabarits réutilisés
+    import contextlib, io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app_flask
+    import graphiques
+    d = app_flask.calculer(F, XF, X_FINAL, T_FEED)
+
+    def cas():
+        for graph_id in graphiques.GRAPHIQUES:
+            graphiques.tracer(graph_id, d, gabarit=bool(n))
+    return cas
+
+
+def _api_simuler(n):
+    # n = 0 : caches de résultats et de calculs vidés à chaque appel, n = 1 : résultat en cache
+    import contextlib, io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app_flask
+    client = app_flask.app.test_client()
+    corps = {'F': F, 'xF': XF, 'x_final': X_FINAL, 'T_feed': T_FEED}
+
+    def cas():
+        if n == 0:
+            app_flask.CACHE_RESULTATS.vider()
+            app_flask.CACHE_CALCULS.vider()
+        with contextlib.redirect_stdout(io.StringIO()):
+            reponse = client.post('/api/simuler', json=corps)
+        if reponse.status_code != 200:
+            raise RuntimeError(f"/api/simuler : HTTP {reponse.status_code}")
+    return cas
+
+
+def _demarrage(n):
+    # Démarrage à froid d'un worker : interpréteur + import de app_flask
+    # (n = 1 : avec le préchauffage EVAP_PRECHAUFFAGE)
+    env = {**os.environ, 'EVAP_PRECHAUFFAGE': '1' if n else ''}
+    commande = [sys.executable, '-c', 'import app_flask']
+    dossier = os.path.dirname(os.path.abspath(__file__))
+
+    def cas():
+        subprocess.run(commande, cwd=dossier, env=env, check=True, capture_output=True)
+    return cas
+
+
+# nom : (préparateur, tailles complètes, tailles rapides)
+CAS = {
+    'thermo.Tsat': (_tsat, [1, 1000, 100000], [1, 1000]),
+    'thermo.Tsat_tables': (_tsat_tables, [1, 1000, 100000], [1, 1000]),
+    'evaporation_triple_effet': (_triple_effet, [1, 1000, 100000], [1, 1000]),
+    'substitut.evaporation': (_substitut, [1, 1000, 100000], [1, 1000]),
+    'surface_echange': (_surface_echange, [1, 1000, 1000000], [1, 1000]),
+    'sensibilite': (_sensibilite, [10, 1000, 100000], [10, 1000]),
+    'cristallisation.simulation_batch': (_cristallisation, [1, 16, 64], [1, 16]),
+    'encrassement.plannings': (_encrassement, [1, 1000, 10000], [1, 1000]),
+    'incertitudes.monte_carlo': (_incertitudes, [0, 1], [0, 1]),
+    'cristallisation.continu': (_cristallisation_continue, [1, 100, 10000], [1, 100]),
+    'graphiques.tracer': (_graphiques, [0, 1], [0, 1]),
+    'api.simuler': (_api_simuler, [0, 1], [0, 1]),
+    'demarrage.app_flask': (_demarrage, [0, 1], [0]),
+}
+
+
+# ---------- MESURE ----------
+def mesurer(cas, duree_min=1.0, n_min=5, n_max=10000):
+    """
+    Chronomètre cas() jusqu'à duree_min secondes (au moins n_min appels),
+    puis mesure le pic mémoire d'un appel supplémentaire avec tracemalloc
+    """
+    cas()  # échauffement (imports paresseux, caches de code)
+
+    durees = []
+    gc_actif = gc.isenabled()
+    gc.disable()
+    try:
+        debut = time.perf_counter()
+        while len(durees) < n_max and (len(durees) < n_min or time.perf_counter() - debut < duree_min):
+            t0 = time.perf_counter()
+            cas()
+            durees.append(time.perf_counter() - t0)
+    finally:
+        if gc_actif:
+            gc.enable()
+
+    tracemalloc.start()
+    cas()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durees = np.asarray(durees)
+    p50, p95, p99 = np.percentile(durees, [50, 95, 99])
+    return {
+        'n_appels': len(durees),
+        'ops_s': 1.0 / durees.mean(),
+        'min_ms': 1e3 * durees.min(),
+        'p50_ms': 1e3 * p50,
+        'p95_ms': 1e3 * p95,
+        'p99_ms': 1e3 * p99,
+        'memoire_pic_ko': pic / 1024,
+    }
+
+
+def executer(filtre=None, rapide=False, duree_min=1.0):
+    """Mesure tous les cas (ou ceux dont le nom contient `filtre`) ; {'nom[taille]': mesure}"""
+    from thermodynamique import Thermo
+
+    resultats = {}
+    for nom, (preparer, tailles, tailles_rapides) in CAS.items():
+        if filtre and filtre not in nom:
+            continue
+        for taille in (tailles_rapides if rapide else tailles):
+            cle = f"{nom}[{taille}]"
+            Thermo.desactiver_tables()  # seul thermo.Tsat_tables les active
+            resultats[cle] = mesurer(preparer(taille), duree_min)
+            r = resultats[cle]
+            print(f"{cle:<45} {r['ops_s']:>10.1f} ops/s  p50 {r['p50_ms']:>9.3f} ms  "
+                  f"p95 {r['p95_ms']:>9.3f} ms  mém {r['memoire_pic_ko']:>9.0f} Ko")
+    return resultats
+
+
+def rapport_imports(module='app_flask', n_essais=3, n_lignes=15):
+    """
+    Temps d'import de `module` mesuré par `python -X importtime` (meilleur de
+    n_essais processus neufs) ; affiche les modules les plus coûteux
+    Retourne {module: durée cumulée (ms)}
+    """
+    dossier = os.path.dirname(os.path.abspath(__file__))
+    meilleur = None
+    for _ in range(n_essais):
+        sortie = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=dossier, capture_output=True, text=True, check=True).stderr
+        cumuls = {}
+        for ligne in sortie.splitlines():
+            if not ligne.startswith('import time:') or 'cumulative' in ligne:
+                continue
+            _, cumul, nom = ligne[len('import time:'):].split('|')
+            # seuls les imports de premier niveau (sous-modules exclus) de chaque paquet
+            if nom.strip() == module or nom.startswith('   ') and not nom.startswith('    '):
+                cumuls[nom.strip()] = int(cumul) / 1e3
+        if meilleur is None or cumuls[module] < meilleur[module]:
+            meilleur = cumuls
+
+    print(f"\nImport de {module} : {meilleur[module]:.1f} ms (meilleur de {n_essais})")
+    lourds = sorted(((ms, nom) for nom, ms in meilleur.items() if nom != module), reverse=True)
+    for ms, nom in lourds[:n_lignes]:
+        print(f"  {nom:<40} {ms:>9.1f} ms")
+    return meilleur
+
+
+# ---------- RÉFÉRENCE ----------
+def environnement():
+    import CoolProp
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'coolprop': CoolProp.__version__,
+        'machine': platform.machine(),
+        'processeurs': os.cpu_count(),
+    }
+
+
+def enregistrer_reference(resultats, chemin=FICHIER_REFERENCE):
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump({'environnement': environnement(), 'resultats': resultats}, f, indent=1)
+    return chemin
+
+
+def comparer(resultats, chemin=FICHIER_REFERENCE, seuil=0.2):
+    """
+    Compare les p50 à la référence ; une régression est un ralentissement
+    de plus de `seuil` (0.2 = +20 %). Retourne la liste des régressions
+    La référence dépend de la machine et n'est pas versionnée (resultats/ est
+    ignoré par git) : FileNotFoundError si elle n'a pas été enregistrée
+    """
+    if not os.path.exists(chemin):
+        raise FileNotFoundError(f"Aucune référence dans {chemin} : la créer sur cette machine "
+                                "avec python benchmark.py --enregistrer")
+    with open(chemin, encoding='utf-8') as f:
+        reference = json.load(f)
+    if reference['environnement'] != environnement():
+        print("⚠ Référence mesurée dans un autre environnement :", reference['environnement'])
+
+    regressions = []
+    print(f"\n{'cas':<45} {'réf. p50':>12} {'p50':>12} {'rapport':>8}")
+    for cle, r in resultats.items():
+        ref = reference['resultats'].get(cle)
+        if ref is None:
+            print(f"{cle:<45} {'-':>12} {r['p50_ms']:>9.3f} ms {'nouveau':>8}")
+            continue
+        rapport = r['p50_ms'] / ref['p50_ms']
+        marque = ''
+        if rapport > 1 + seuil:
+            regressions.append(cle)
+            marque = '  ❌ régression'
+        elif rapport < 1 / (1 + seuil):
+            marque = '  ✅ gain'
+        print(f"{cle:<45} {ref['p50_ms']:>9.3f} ms {r['p50_ms']:>9.3f} ms {rapport:>8.2f}{marque}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filtre', help="ne mesurer que les cas dont le nom contient ce texte")
+    parser.add_argument('--rapide', action='store_true', help="petites tailles seulement")
+    parser.add_argument('--duree', type=float, default=1.0, help="durée de mesure par cas (s)")
+    parser.add_argument('--enregistrer', action='store_true', help="enregistrer comme référence")
+    parser.add_argument('--comparer', action='store_true', help="comparer à la référence")
+    parser.add_argument('--seuil', type=float, default=0.2, help="ralentissement toléré (0.2 = 20 %%)")
+    parser.add_argument('--reference', default=FICHIER_REFERENCE, help="fichier de référence")
+    parser.add_argument('--imports', action='store_true', help="rapport des temps d'import de app_flask")
+    args = parser.parse_args()
+
+    if args.imports:
+        rapport_imports()
+        sys.exit(0)
+
+    if args.comparer and not args.enregistrer and not os.path.exists(args.reference):
+        # Échec explicite avant de mesurer : pas de comparaison silencieusement vide
+        print(f"❌ Aucune référence dans {args.reference} : lancer d'abord "
+              "python benchmark.py --enregistrer sur cette machine")
+        sys.exit(2)
+
+    resultats = executer(args.filtre, args.rapide, args.duree)
+    if args.comparer and os.path.exists(args.reference):
+        if comparer(resultats, args.reference, args.seuil):
+            sys.exit(1)
+    if args.enregistrer:
+        print("Référence enregistrée :", enregistrer_reference(resultats, args.reference))
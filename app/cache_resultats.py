@@ -0,0 +1,184 @@
+"""
+Module cache_resultats
+Cache des résultats de simulation adressé par le contenu des paramètres
+(clé = empreinte SHA-256 des entrées normalisées)
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+
+# À incrémenter quand les modèles changent : invalide les entrées persistées
+VERSION_MODELE = 2
+
+# Sources dont dépendent les résultats : toute modification change les clés
+MODULES_MODELE = ('app_flask.py', 'cristallisation.py', 'evaporateurs.py', 'graphiques.py',
+                  'optimisation.py', 'thermodynamique.py')
+
+# Extensions des fichiers persistés (.json pour les dict, format des images)
+EXTENSIONS = ('.json', '.png', '.svg')
+
+
+def empreinte_modeles(dossier=os.path.dirname(os.path.abspath(__file__))):
+    """Empreinte SHA-256 (abrégée) des sources de MODULES_MODELE"""
+    h = hashlib.sha256()
+    for nom in MODULES_MODELE:
+        chemin = os.path.join(dossier, nom)
+        if os.path.exists(chemin):
+            with open(chemin, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()[:16]
+
+EMPREINTE_MODELES = empreinte_modeles()
+
+
+def cle_parametres(params, decimales=6, **extra):
+    """Empreinte des paramètres normalisés (arrondis, triés) et de la version des modèles"""
+    normalises = {k: round(float(v), decimales) for k, v in params.items()}
+    contenu = {'version': VERSION_MODELE, 'modeles': EMPREINTE_MODELES,
+               'parametres': normalises, **extra}
+    texte = json.dumps(contenu, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texte.encode('utf-8')).hexdigest()
+
+
+class CacheResultats:
+    """
+    Cache LRU borné en mémoire, avec persistance optionnelle sur disque
+    (un fichier par entrée : .json pour les dict, extension du format pour
+    les images). Les lectures et écritures de fichiers se font hors du verrou
+    """
+
+    def __init__(self, capacite=128, dossier=None, capacite_disque=1024):
+        self.capacite = capacite
+        self.dossier = dossier
+        self.capacite_disque = capacite_disque
+        self._valeurs = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.hits_disque = 0
+        self.misses = 0
+        self.evictions = 0
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+    def _chemin(self, cle, extension):
+        return os.path.join(self.dossier, cle + extension)
+
+    def _fichiers(self):
+        return [os.path.join(self.dossier, nom) for nom in os.listdir(self.dossier)
+                if nom.endswith(EXTENSIONS)]
+
+    def _lire_disque(self, cle):
+        if not self.dossier:
+            return None
+        for extension in EXTENSIONS:
+            try:
+                if extension == '.json':
+                    with open(self._chemin(cle, extension), encoding='utf-8') as f:
+                        return json.load(f)
+                with open(self._chemin(cle, extension), 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _ecrire_disque(self, cle, valeur, extension):
+        chemin = self._chemin(cle, extension)
+        # Fichier temporaire propre au thread : os.replace le publie d'un bloc
+        temporaire = f'{chemin}.{os.getpid()}.{threading.get_ident()}.tmp'
+        if isinstance(valeur, bytes):
+            with open(temporaire, 'wb') as f:
+                f.write(valeur)
+        else:
+            with open(temporaire, 'w', encoding='utf-8') as f:
+                json.dump(valeur, f)
+        os.replace(temporaire, chemin)
+
+        fichiers = self._fichiers()
+        if len(fichiers) > self.capacite_disque:
+            anciennete = {}
+            for fichier in fichiers:
+                try:
+                    anciennete[fichier] = os.path.getmtime(fichier)
+                except FileNotFoundError:
+                    pass
+            for ancien in sorted(anciennete, key=anciennete.get)[:len(anciennete) - self.capacite_disque]:
+                try:
+                    os.remove(ancien)
+                except FileNotFoundError:
+                    pass
+
+    def _memoriser(self, cle, valeur):
+        self._valeurs[cle] = valeur
+        self._valeurs.move_to_end(cle)
+        while len(self._valeurs) > self.capacite:
+            self._valeurs.popitem(last=False)
+            self.evictions += 1
+
+    def obtenir(self, cle):
+        """Valeur associée à la clé (mémoire puis disque), None si absente"""
+        with self._verrou:
+            if cle in self._valeurs:
+                self._valeurs.move_to_end(cle)
+                self.hits += 1
+                return self._valeurs[cle]
+
+        valeur = self._lire_disque(cle)
+        with self._verrou:
+            if valeur is None:
+                self.misses += 1
+                return None
+            self.hits_disque += 1
+            self._memoriser(cle, valeur)
+        return valeur
+
+    def enregistrer(self, cle, valeur, extension=None):
+        """
+        Enregistre un dict sérialisable en JSON ou une image (bytes)
+        extension : extension du fichier persisté pour une image ('.png', '.svg')
+        """
+        if extension is None:
+            extension = '.png' if isinstance(valeur, bytes) else '.json'
+        if extension not in EXTENSIONS:
+            raise ValueError(f"Extension non gérée : {extension}")
+        with self._verrou:
+            self._memoriser(cle, valeur)
+        if self.dossier:
+            self._ecrire_disque(cle, valeur, extension)
+
+    def obtenir_ou_calculer(self, cle, calcul, extension=None):
+        """Valeur en cache, sinon calculée par calcul() puis enregistrée"""
+        valeur = self.obtenir(cle)
+        if valeur is None:
+            valeur = calcul()
+            self.enregistrer(cle, valeur, extension)
+        return valeur
+
+    def vider(self, disque=False):
+        """Vide le cache mémoire (et les fichiers persistés si disque=True)"""
+        with self._verrou:
+            self._valeurs.clear()
+            self.hits = self.hits_disque = self.misses = self.evictions = 0
+        if disque and self.dossier:
+            for fichier in self._fichiers():
+                try:
+                    os.remove(fichier)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        """Compteurs du cache"""
+        with self._verrou:
+            total = self.hits + self.hits_disque + self.misses
+            return {
+                'taille': len(self._valeurs),
+                'capacite': self.capacite,
+                'persistance': self.dossier,
+                'hits': self.hits,
+                'hits_disque': self.hits_disque,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'taux_hit': (self.hits + self.hits_disque) / total if total else 0.0,
+            }
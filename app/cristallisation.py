@@ -1,4 +1,6 @@
 import numpy as np
+from thermodynamique import Thermo
+from mesures import chronometre
 
 R = 8.314  # J/(mol·K)
 
@@ -9,6 +11,18 @@ def solubilite(T):
     """
     return 64.18 + 0.1337*T + 5.52e-3*T**2 - 9.73e-6*T**3
 
+def temperature_saturation(C, n_iter=8):
+    """
+    Température (°C) à laquelle la solution de concentration C (g/100g)
+    est saturée : inversion de solubilite par Newton
+    """
+    C = np.asarray(C, dtype=float)
+    T = np.full_like(C, 50.0)
+    for _ in range(n_iter):
+        dsol = 0.1337 + 2*5.52e-3*T - 3*9.73e-6*T**2
+        T = T - (solubilite(T) - C) / dsol
+    return T
+
 def sursaturation(C, T):
     """
     Sursaturation relative S
@@ -57,6 +71,26 @@ def profil_exponentiel(t, T0, Tf, beta):
     """
     return Tf + (T0 - Tf) * np.exp(-beta * t)
 
+def profil_cubique(t, T0, Tf, tau, p=3):
+    """
+    Profil en puissance : refroidissement lent au début (p = 3 : cubique,
+    p = 1 : linéaire)
+    """
+    return T0 - (T0 - Tf) * np.clip(t / tau, 0, 1)**p
+
+def profil_par_morceaux(t, T_noeuds, tau):
+    """
+    Profil linéaire par morceaux entre des nœuds équirépartis sur [0, tau]
+    T_noeuds : (m,) ou (K, m) pour K profils
+    t : scalaire ou tableau ; renvoie ([K,] *t.shape)
+    """
+    T_noeuds = np.asarray(T_noeuds, dtype=float)
+    m = T_noeuds.shape[-1]
+    position = np.clip(np.asarray(t, dtype=float) / tau, 0, 1) * (m - 1)
+    i = np.minimum(position.astype(int), m - 2)
+    f = position - i
+    return (1 - f) * T_noeuds[..., i] + f * T_noeuds[..., i + 1]
+
 # ---------- BILAN DE POPULATION SIMPLIFIÉ ----------
 def population_finale(B, G, t):
     """
@@ -78,6 +112,362 @@ def CV():
     """
     return 35  # %
 
+# ---------- SIMULATION BATCH (MÉTHODE DES MOMENTS) ----------
+RHO_CRISTAL = 1587  # masse volumique du saccharose cristallisé (kg/m³)
+KV = 0.52           # facteur de forme volumique
+
+def moments_semence(masse, L_moy, cv, n_moments=6):
+    """
+    Moments μ0..μ5 (m^k/m³) d'une semence gaussienne
+    masse : masse de semence (kg/m³), L_moy : taille moyenne (m), cv : écart-type / moyenne
+    """
+    L = np.linspace(max(L_moy * (1 - 5 * cv), 0), L_moy * (1 + 5 * cv), 401)
+    n = np.exp(-0.5 * ((L - L_moy) / (cv * L_moy))**2)
+    # grille régulière : le pas se simplifie lors de la normalisation par μ3
+    mu = np.array([np.sum(n * L**k) for k in range(n_moments)])
+    return mu * masse / (RHO_CRISTAL * KV * mu[3])
+
+def taille_moyenne_masse(mu):
+    """Taille moyenne en masse L43 = μ4/μ3 (m), assimilée à L50"""
+    return mu[4] / mu[3]
+
+def cv_masse(mu):
+    """Coefficient de variation de la distribution en masse (%)"""
+    return 100 * np.sqrt(np.maximum(mu[5] * mu[3] / mu[4]**2 - 1, 0))
+
+# Variation relative de L50 et de la masse cristallisée en dessous de laquelle
+# le résultat du batch n'est que la semence (cinétiques trop lentes)
+SEUIL_SEMENCE = 0.01
+
+@chronometre('cristallisation.batch')
+def simulation_batch(profil_T=None, duree=4*3600, C0=None, masse_semence=5.0,
+                     L_semence=100e-6, cv_semence=0.3, L_noyau=1e-6, n_points=100,
+                     S_consigne=None, T_min=None):
+    """
+    Cristallisoir batch refroidi : bilan de soluté + moments μ0..μ5 de la
+    distribution de tailles, intégrés avec LSODA (bascule auto raide/non raide).
+
+    profil_T : fonction t -> T (°C) ; si elle renvoie un tableau (K,), les K
+               profils sont simulés ensemble (défaut : linéaire 70 -> 35 °C)
+    C0 : concentration initiale (g/100g), par défaut saturation à T(0)
+    S_consigne : si donnée (scalaire ou (K,)), la température suit la
+                 sursaturation constante S_consigne, bornée par [T_min, T(0)]
+    masse_semence, L_semence, cv_semence : semence supposée (kg/m³, m, -)
+    Retourne un dict de trajectoires (n_points,) ou (n_points, K), et par profil
+    'croissance_relative' (L50), 'masse_relative' et 'domine_par_semence' :
+    avec les cinétiques de ce module, L50 et CV restent ceux de la semence
+    dès que ces variations sont inférieures à SEUIL_SEMENCE
+    """
+    from scipy.integrate import solve_ivp
+
+    if profil_T is None:
+        profil_T = lambda t: profil_lineaire(t, 70, 35, duree)
+
+    T_init = np.atleast_1d(np.asarray(profil_T(0.0), dtype=float))
+    if S_consigne is not None:
+        T_init = np.broadcast_to(T_init, np.broadcast(T_init, np.atleast_1d(S_consigne)).shape)
+    K = len(T_init)
+    if C0 is None:
+        C0 = solubilite(T_init)
+    C0 = np.broadcast_to(np.asarray(C0, dtype=float), (K,))
+
+    # Les moments sont intégrés relativement à ceux de la semence (mise à l'échelle)
+    mu_ref = moments_semence(masse_semence, L_semence, cv_semence)
+    k = np.arange(6)[:, None]
+    rho_sol = Thermo.densite(C0 / 100, T_init)
+
+    def temperature(t, C):
+        if S_consigne is None:
+            return np.asarray(profil_T(t), dtype=float).reshape(K, 1)
+        S_c = np.broadcast_to(np.asarray(S_consigne, dtype=float), (K,))[:, None]
+        T = temperature_saturation(C / (1 + S_c))
+        return np.clip(T, T_min if T_min is not None else -np.inf, T_init[:, None])
+
+    def derivees(t, y):
+        y = y.reshape(7, K, -1)
+        mu = y[:6] * mu_ref[:, None, None]
+        C = y[6]
+        T = temperature(t, C)
+
+        S = sursaturation(C, T)
+        actif = S > 0
+        mT = RHO_CRISTAL * KV * mu[3]
+        B = np.where(actif, nucleation(S, mT), 0)
+        G = np.where(actif, croissance(S, T), 0)
+
+        dmu = np.empty_like(mu)
+        dmu[0] = B
+        dmu[1:] = k[1:, :, None] * G * mu[:-1] + B * L_noyau**k[1:, :, None]
+        dC = -100 * RHO_CRISTAL * KV * dmu[3] / rho_sol[:, None]
+        return np.concatenate([dmu / mu_ref[:, None, None], dC[None]]).reshape(7 * K, -1)
+
+    y0 = np.concatenate([np.ones((6, K)), C0[None]]).ravel()
+    t = np.linspace(0, duree, n_points)
+    sol = solve_ivp(derivees, (0, duree), y0, method='LSODA', t_eval=t,
+                    rtol=1e-6, atol=1e-9, vectorized=True)
+    if not sol.success:
+        raise RuntimeError(f"Intégration du cristalliseur échouée : {sol.message}")
+
+    y = sol.y.reshape(7, K, -1)
+    mu = y[:6] * mu_ref[:, None, None]
+    C = y[6]
+    if S_consigne is None:
+        T = np.array([np.broadcast_to(profil_T(ti), (K,)) for ti in t]).T
+    else:
+        T = temperature(None, C)
+    S = sursaturation(C, T)
+
+    unique = K == 1 and np.ndim(profil_T(0.0)) == 0 and np.ndim(S_consigne) == 0
+
+    def sortie(a):
+        """([6,] K, n_points) -> (n_points, K[, 6]), sans l'axe K pour un profil unique"""
+        a = np.moveaxis(a, -1, 0)
+        if a.ndim == 3:
+            a = np.moveaxis(a, 1, 2)
+        return a[:, 0] if unique else a
+
+    L43 = taille_moyenne_masse(mu)
+    croissance_relative = L43[:, -1] / L43[:, 0] - 1
+    masse_relative = mu[3][:, -1] / mu[3][:, 0] - 1
+    domine = np.maximum(np.abs(croissance_relative), np.abs(masse_relative)) < SEUIL_SEMENCE
+    par_profil = lambda a: a[0] if unique else a
+
+    return {
+        't': t,
+        'T': sortie(T),
+        'C': sortie(C),
+        'S': sortie(S),
+        'moments': sortie(mu),
+        'L50': sortie(L43),
+        'CV': sortie(cv_masse(mu)),
+        'masse_cristaux': sortie(RHO_CRISTAL * KV * mu[3]),
+        'croissance_relative': par_profil(croissance_relative),
+        'masse_relative': par_profil(masse_relative),
+        'domine_par_semence': par_profil(domine),
+        'n_evaluations': sol.nfev,
+    }
+
+# ---------- OPTIMISATION DU REFROIDISSEMENT ----------
+# Paramètres de chaque famille de profils et leurs bornes
+FAMILLES_PROFILS = {
+    'morceaux': [(0.0, 1.0)] * 6,     # décréments relatifs des 6 segments
+    'cubique': [(0.3, 6.0)],          # exposant p
+    'sursaturation': [(0.005, 0.5)],  # sursaturation de consigne
+}
+
+def _simuler_famille(famille, parametres, T0, Tf, duree, **options):
+    """Simule K profils (parametres : (K, n_parametres)) en un seul appel"""
+    if famille == 'morceaux':
+        d = parametres + 1e-9
+        T_noeuds = T0 - (T0 - Tf) * np.cumsum(d, axis=1) / d.sum(axis=1, keepdims=True)
+        T_noeuds = np.column_stack([np.full(len(d), float(T0)), T_noeuds])
+        return simulation_batch(lambda t: profil_par_morceaux(t, T_noeuds, duree), duree, **options)
+    if famille == 'cubique':
+        p = parametres[:, 0]
+        return simulation_batch(lambda t: profil_cubique(t, T0, Tf, duree, p), duree, **options)
+    if famille == 'sursaturation':
+        return simulation_batch(lambda t: np.full(len(parametres), float(T0)), duree,
+                                S_consigne=parametres[:, 0], T_min=Tf, **options)
+    raise ValueError(f"Famille de profils inconnue : {famille}")
+
+@chronometre('cristallisation.optimisation')
+def optimiser_refroidissement(famille='morceaux', T0=70, Tf=35, duree=4*3600, poids_cv=1.0,
+                              n_candidats=64, n_generations=8, fraction_elite=0.2,
+                              tolerance_Tf=0.5, graine=0, **options):
+    """
+    Recherche le profil de refroidissement maximisant L50 (µm) - poids_cv * CV (%)
+    par la méthode de l'entropie croisée : chaque génération de n_candidats
+    profils est simulée en un seul appel vectorisé à simulation_batch.
+    Les profils n'atteignant pas Tf (à tolerance_Tf près) dans la durée du
+    batch sont écartés.
+    Si tous les profils simulés sont dominés par la semence (voir
+    simulation_batch), le score ne dépend pas du profil : aucun optimum n'est
+    rapporté ('significatif' False, 'parametres' None, 'message').
+    """
+    bornes = np.array(FAMILLES_PROFILS[famille], dtype=float)
+    bas, haut = bornes[:, 0], bornes[:, 1]
+    rng = np.random.default_rng(graine)
+    moyenne = (bas + haut) / 2
+    ecart = (haut - bas) / 2
+    n_elite = max(2, int(fraction_elite * n_candidats))
+
+    meilleur = {'score': -np.inf}
+    historique = []
+    significatif = False
+    for generation in range(n_generations):
+        parametres = np.clip(rng.normal(moyenne, ecart, (n_candidats, len(bornes))), bas, haut)
+        res = _simuler_famille(famille, parametres, T0, Tf, duree, n_points=50, **options)
+
+        L50_um = res['L50'][-1] * 1e6
+        cv = res['CV'][-1]
+        score = L50_um - poids_cv * cv
+        score = np.where(res['T'][-1] <= Tf + tolerance_Tf, score, -np.inf)
+        significatif |= bool(np.any(~res['domine_par_semence'] & np.isfinite(score)))
+
+        i = int(np.argmax(score))
+        if score[i] > meilleur['score']:
+            meilleur = {'score': float(score[i]), 'parametres': parametres[i],
+                        'L50': float(L50_um[i]), 'CV': float(cv[i])}
+        historique.append(float(score[i]))
+
+        elites = parametres[np.argsort(score)[-n_elite:]]
+        moyenne, ecart = elites.mean(axis=0), elites.std(axis=0) + 1e-3 * (haut - bas)
+
+    meilleur.update({
+        'famille': famille,
+        'evaluations': n_candidats * n_generations,
+        'historique': historique,
+        'significatif': significatif,
+        'message': None,
+    })
+    if not significatif:
+        meilleur['parametres'] = None
+        meilleur['message'] = ("Score indépendant du profil : la croissance reste inférieure à "
+                               f"{SEUIL_SEMENCE:.0%} de la semence pour tous les profils simulés")
+    return meilleur
+
+# ---------- CRISTALLISEUR CONTINU (MSMPR) ----------
+def _moments_etage(mu_amont, tau, B, G, L_noyau):
+    """
+    Moments en régime permanent d'un étage parfaitement agité à soutirage
+    non classé (croissance indépendante de la taille) :
+    0 = (μk_amont - μk) / τ + k G μ(k-1) + B L_noyau^k
+    """
+    mu = np.empty_like(mu_amont)
+    mu[0] = mu_amont[0] + tau * B
+    for k in range(1, len(mu)):
+        mu[k] = mu_amont[k] + tau * (k * G * mu[k - 1] + B * L_noyau**k)
+    return mu
+
+def _racine_illinois(f, a, b, fa, fb, tol=1e-10, n_iter=100):
+    """
+    Racines de N équations scalaires indépendantes f(φ) = 0, φ (N,), encadrées
+    par [a, b] (f(a) et f(b) de signes opposés) : regula falsi modifiée
+    (Illinois), toutes les équations avancent ensemble
+    Retourne (φ, nombre d'itérations)
+    """
+    for i in range(1, n_iter + 1):
+        phi = np.where(fb != fa, (a * fb - b * fa) / np.where(fb != fa, fb - fa, 1), (a + b) / 2)
+        fphi = f(phi)
+        change = fphi * fb < 0
+        a, fa = np.where(change, b, a), np.where(change, fb, fa / 2)
+        b, fb = phi, fphi
+        if np.all((np.abs(b - a) < tol) | (fphi == 0)):
+            break
+    return b, i
+
+def cascade_msmpr(tau_total=3600.0, n_etages=1, T_final=35.0, T_alim=70.0, C_alim=None,
+                  masse_semence=5.0, L_semence=100e-6, cv_semence=0.3, L_noyau=1e-6, debit=None,
+                  f_nucleation=nucleation, f_croissance=croissance, tol=1e-10):
+    """
+    Cascade de n_etages cristalliseurs continus MSMPR en régime permanent
+    (volumes égaux : τ = tau_total / n_etages par étage, températures
+    réparties linéairement de T_alim à T_final). Dans chaque étage, le bilan
+    de soluté et les moments μ0..μ5 sont couplés par la masse cristallisée ;
+    l'inconnue est la fraction φ ∈ ]0, 1] de la sursaturation entrante
+    consommée, résolue par _racine_illinois pour tous les points à la fois.
+    Vectorisé : tau_total (s), n_etages, T_final, T_alim, C_alim, masse_semence
+    sont des scalaires ou des tableaux (N,) (points de fonctionnement)
+    C_alim : concentration d'alimentation (g/100g), saturation à T_alim par défaut
+    masse_semence : semence apportée par l'alimentation (kg/m³), 0 = alimentation claire
+    debit : débit de suspension (m³/s) ; donne volume par étage et production
+    Retourne un dict de sorties (N,) (scalaires pour un seul point) et 'etages' :
+    profils par étage (N, n_max), NaN au-delà du nombre d'étages du point
+    """
+    unique = all(np.ndim(v) == 0 for v in (tau_total, n_etages, T_final, T_alim, C_alim, masse_semence))
+    entrees = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in
+                                    (tau_total, n_etages, T_final, T_alim, masse_semence)))
+    tau_total, n_etages, T_final, T_alim, masse_semence = entrees
+    n_etages = n_etages.astype(int)
+    if np.any(n_etages < 1):
+        raise ValueError("n_etages doit être >= 1")
+    C_alim = solubilite(T_alim) if C_alim is None else np.broadcast_to(np.asarray(C_alim, dtype=float),
+                                                                       tau_total.shape)
+    rho_sol = Thermo.densite(C_alim / 100, T_alim)
+    masse_par_mu3 = RHO_CRISTAL * KV
+
+    # Semence : moments d'une distribution gaussienne, proportionnels à la masse
+    mu = moments_semence(1.0, L_semence, cv_semence)[:, None] * masse_semence[None]
+    C = C_alim.copy()
+    n_max = int(n_etages.max())
+    profils = {nom: np.full((len(C), n_max), np.nan) for nom in ('T', 'C', 'S', 'B', 'G', 'L50', 'masse_cristaux')}
+    iterations = 0
+    eps = 1e-30
+
+    for j in range(n_max):
+        actif = j < n_etages
+        tau = tau_total / n_etages
+        T = T_alim + (T_final - T_alim) * (j + 1) / n_etages
+        ecart = np.maximum(C - solubilite(T), 0)
+
+        def etat(phi):
+            C_j = C - phi * ecart
+            mu3_bilan = mu[3] + phi * ecart * rho_sol / (100 * masse_par_mu3)
+            S = sursaturation(C_j, T)
+            B = np.where(S > 0, f_nucleation(S, masse_par_mu3 * mu3_bilan), 0)
+            G = np.where(S > 0, f_croissance(S, T), 0)
+            return C_j, S, B, G, mu3_bilan, _moments_etage(mu, tau, B, G, L_noyau)
+
+        def residu(phi):
+            *_, mu3_bilan, mu_j = etat(phi)
+            return np.log((mu_j[3] + eps) / (mu3_bilan + eps))
+
+        # r(φ) décroît de r(0+) >= 0 (cristaux amont) à r(1) < 0 (S = 0) ;
+        # sans cristaux ni nucléation suffisante (r(0+) <= 0) : lessivage, φ = 0
+        a, b = np.full(len(C), 1e-12), np.ones(len(C))
+        fa, fb = residu(a), residu(b)
+        encadre = (fa > 0) & (fb < 0)
+        phi, n_iter = _racine_illinois(residu, a, b, np.where(encadre, fa, 1.0),
+                                       np.where(encadre, fb, -1.0), tol)
+        phi = np.where(encadre, phi, 0.0)
+        iterations += n_iter
+
+        C_j, S, B, G, _, mu_j = etat(phi)
+        C = np.where(actif, C_j, C)
+        mu = np.where(actif, mu_j, mu)
+        for nom, valeur in (('T', T), ('C', C_j), ('S', S), ('B', B), ('G', G),
+                            ('L50', taille_moyenne_masse(mu_j)), ('masse_cristaux', masse_par_mu3 * mu_j[3])):
+            profils[nom][:, j] = np.where(actif, valeur, np.nan)
+
+    masse_cristaux = masse_par_mu3 * mu[3]
+    resultat = {
+        'C': C,
+        'S': sursaturation(C, T_final),
+        'L50': taille_moyenne_masse(mu),
+        'CV': cv_masse(mu),
+        'moments': mu.T,
+        'masse_cristaux': masse_cristaux,
+        # part de la sursaturation de l'alimentation (par rapport à T_final) récupérée
+        'desursaturation': (C_alim - C) / np.maximum(C_alim - solubilite(T_final), 1e-12),
+    }
+    if debit is not None:
+        resultat['volume_etage'] = tau_total / n_etages * debit
+        resultat['production'] = (masse_cristaux - masse_semence) * debit * 3600  # kg/h
+    resultat['etages'] = profils
+
+    if unique:
+        resultat = {nom: ({k: v[0] for k, v in valeur.items()} if nom == 'etages' else valeur[0])
+                    for nom, valeur in resultat.items()}
+    resultat['iterations'] = iterations
+    return resultat
+
+def msmpr(tau=3600.0, T=35.0, **options):
+    """Cristalliseur continu MSMPR à un étage (voir cascade_msmpr)"""
+    return cascade_msmpr(tau, 1, T, **options)
+
+@chronometre('cristallisation.continu')
+def balayage_continu(taus, n_etages=(1, 2, 3, 4), **options):
+    """
+    Plan temps de séjour total × nombre d'étages évalué en un seul appel
+    Retourne les sorties de cascade_msmpr sous forme de grilles (len(taus), len(n_etages))
+    """
+    tau, n = np.meshgrid(np.asarray(taus, dtype=float), np.asarray(n_etages), indexing='ij')
+    res = cascade_msmpr(tau.ravel(), n.ravel(), **options)
+    grilles = {nom: v.reshape(tau.shape) for nom, v in res.items()
+               if isinstance(v, np.ndarray) and v.shape == (tau.size,)}
+    grilles.update({'tau': tau, 'n_etages': n, 'iterations': res['iterations']})
+    return grilles
+
 # ---------- DIMENSIONNEMENT ----------
 def volume_cristalliseur(masse_batch, densite):
     """
@@ -1,39 +1,133 @@
-from evaporateurs import TripleEffectEvaporator
 import numpy as np
+from evaporateurs import evaporation_multi_cas, pressions_effets
+from optimisation import (surface_echange, ecarts_temperature, cout_evaporateur, TCI, OPEX, U,
+                          SECONDES_HEURE)
+from mesures import chronometre
 
-def cost_evaporator(A):
-    return 15000 * A**0.65
+# Bornes des variables de décision
+BORNES = {
+    'F': (16000, 24000),        # débit d'alimentation (kg/h)
+    'P1': (0.7, 1.9),           # pression 1er effet (bar)
+    'P2': (0.3, 0.9),           # pression 2e effet (bar)
+    'P3': (0.1, 0.25),          # pression 3e effet (bar)
+    'x_final': (0.55, 0.70),    # concentration finale
+}
 
-def annual_steam_cost(steam_kg_h):
-    return steam_kg_h * 24 * 330 * 25 / 1000
+ANNEES_AMORTISSEMENT = 10
+HEURES_AN = 8000
+PENALITE = 1e12
 
-def economic_optimization():
 
-    best_cost = 1e20
-    best_flow = 0
-    best_result = None
+def cout_specifique(F=20000, xF=0.15, x_final=0.65, P=None, T_feed=85, Pelec=150, modele=None):
+    """
+    Coût annualisé (TCI amorti + OPEX) par tonne de sirop produit (€/t)
+    Vectorisé : F, x_final (N,) et P (N, 3) donnent N coûts.
+    Les configurations sans force motrice positive sont pénalisées.
+    P : pressions des effets, par défaut pressions_effets(3, xF, x_final)
+        (écarts de température égaux sous une vapeur de chauffe à 120 °C)
+    modele : substitut (substitut.Substitut) remplaçant les bilans complets
+    """
+    if P is None:
+        P = pressions_effets(3, xF, x_final)
+    evaporation = evaporation_multi_cas if modele is None else modele.evaporation_multi_cas
+    L, V, x, T, Q = evaporation(F, xF, x_final, P, T_feed)
+    DT = ecarts_temperature(T)
 
-    for F in np.linspace(16000, 24000, 10):
-        evap = TripleEffectEvaporator(F, 15, 85, 65)
-        res = evap.energy_balance()
+    # surface_echange renvoie des m² × 3600 (Q en J/h) : le coût porte sur des m²
+    A = surface_echange(Q, U, DT) / SECONDES_HEURE
+    S = Q[:, 0] / 2.15e6
+    C_annuel = TCI(cout_evaporateur(A).sum(axis=1)) / ANNEES_AMORTISSEMENT + OPEX(S, Pelec)
+    cout = C_annuel / (L[:, -1] * HEURES_AN / 1000)
 
-        A_total = sum(res["areas"])
-        C_inv = cost_evaporator(A_total)
-        C_op = annual_steam_cost(res["steam"])
-        C_total = C_inv + C_op
+    P = np.broadcast_to(P, T.shape)
+    faisable = np.all(DT > 0, axis=1) & np.all(np.diff(P, axis=1) < 0, axis=1)
+    cout = np.where(faisable, cout, PENALITE)
+    if cout.size == 1 and np.ndim(F) == 0 and np.ndim(x_final) == 0:
+        return float(cout[0])
+    return cout
 
-        if C_total < best_cost:
-            best_cost = C_total
-            best_flow = F
-            best_result = res
 
-    return best_flow, best_cost, best_result
+# ---------- RECHERCHE 1-D ----------
+def section_doree(f, a, b, tol=1e-3, max_eval=60):
+    """
+    Minimise f sur [a, b] par section dorée (f unimodale) ; les bornes sont
+    aussi évaluées, l'optimum d'une fonction monotone étant à une borne
+    Retourne (x_opt, f_opt, nombre d'évaluations)
+    """
+    bornes = [(a, f(a)), (b, f(b))]
+    r = (np.sqrt(5) - 1) / 2
+    c, d = b - r * (b - a), a + r * (b - a)
+    fc, fd = f(c), f(d)
+    n_eval = 2
 
-if __name__ == "__main__":
-    Fopt, Copt, res = economic_optimization()
+    while abs(b - a) > tol * (abs(c) + abs(d)) and n_eval < max_eval:
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - r * (b - a)
+            fc = f(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + r * (b - a)
+            fd = f(d)
+        n_eval += 1
+
+    x_opt, f_opt = min([(c, fc), (d, fd)] + bornes, key=lambda p: p[1])
+    return x_opt, f_opt, n_eval + 2
+
+
+# ---------- OPTIMISATION ----------
+@chronometre('economie.optimisation')
+def economic_optimization(variables=('F',), methode='recherche', n_grille=10, xF=0.15, T_feed=85,
+                          modele=None, **fixes):
+    """
+    Optimisation économique sur une ou plusieurs variables parmi BORNES
+    methode='recherche' : section dorée (1 variable) ou Nelder-Mead borné (N variables)
+    methode='grille'    : grille dense de n_grille points par variable (comparaison)
+    modele : substitut évalué à la place du modèle complet (voir cout_specifique)
+    Retourne un dict : variables optimales, coût, nombre d'évaluations
+    """
+    P0 = pressions_effets(3, xF, fixes.get('x_final', 0.65))
+    base = {'F': 20000, 'P1': P0[0], 'P2': P0[1], 'P3': P0[2], 'x_final': 0.65}
+    base.update(fixes)
+    variables = list(variables)
+    n_eval = [0]
+
+    def objectif(valeurs):
+        p = dict(base, **dict(zip(variables, np.atleast_2d(valeurs).T)))
+        n_eval[0] += len(np.atleast_2d(valeurs))
+        P = np.column_stack(np.broadcast_arrays(p['P1'], p['P2'], p['P3']))
+        # cout_specifique renvoie un float pour F et x_final scalaires (variables de pression seules)
+        return np.atleast_1d(cout_specifique(p['F'], xF, p['x_final'], P, T_feed, modele=modele))
 
+    bornes = [BORNES[v] for v in variables]
+
+    if methode == 'grille':
+        axes = [np.linspace(a, b, n_grille) for a, b in bornes]
+        points = np.array(np.meshgrid(*axes, indexing='ij')).reshape(len(variables), -1).T
+        # Toute la grille est évaluée en une passe vectorisée
+        couts = objectif(points)
+        x_opt, f_opt = points[np.argmin(couts)], couts.min()
+    elif len(variables) == 1:
+        x_opt, f_opt, _ = section_doree(lambda v: objectif([v])[0], *bornes[0])
+        x_opt = np.array([x_opt])
+    else:
+        from scipy.optimize import minimize
+        x0 = [base[v] for v in variables]
+        res = minimize(lambda v: objectif(v)[0], x0, method='Nelder-Mead', bounds=bornes,
+                       options={'xatol': 1e-4, 'fatol': 1e-6})
+        x_opt, f_opt = res.x, res.fun
+
+    return {
+        'variables': dict(zip(variables, (float(v) for v in x_opt))),
+        'cout_specifique': float(f_opt),
+        'evaluations': n_eval[0],
+        'methode': methode,
+    }
+
+if __name__ == "__main__":
     print("\n====== OPTIMISATION ÉCONOMIQUE ======")
-    print("Débit optimal (kg/h):", Fopt)
-    print("Coût total minimal (€):", round(Copt,2))
-    print("Vapeur consommée (kg/h):", round(res["steam"],2))
-    print("Surface totale (m²):", round(sum(res["areas"]),2))
\ No newline at end of file
+    for variables in [('F',), ('P1', 'P2', 'P3', 'x_final')]:
+        for methode in ['recherche', 'grille']:
+            res = economic_optimization(variables, methode)
+            print(f"{methode:10s} {variables}: {res['variables']}")
+            print(f"    coût = {res['cout_specifique']:.2f} €/t, évaluations = {res['evaluations']}")
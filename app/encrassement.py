@@ -0,0 +1,212 @@
+"""
+Module encrassement
+Croissance de l'encrassement de chaque effet au cours d'une campagne
+(modèle asymptotique de Kern-Seaton, remis à zéro à chaque nettoyage) et
+recherche du planning de nettoyage minimisant vapeur + arrêts.
+Les plannings sont des tableaux booléens (K, P, n) : K plannings candidats,
+P périodes de la campagne, n effets ; ils sont évalués en une passe vectorisée
+"""
+
+import numpy as np
+from evaporateurs import evaporation_multi_cas, pressions_effets
+from optimisation import surface_echange, ecarts_temperature, coefficients_U, Rf
+from mesures import chronometre
+
+# Encrassement asymptotique de chaque effet du triple effet (m².K/W) et
+# constante de temps (h) : les derniers effets, plus concentrés, s'encrassent plus vite
+RF_PROPRE = 0.0
+RF_ASYMPTOTE = [0.0003, 0.0004, 0.0006]
+TAU_ENCRASSEMENT = [300.0, 240.0, 160.0]
+
+PRIX_VAPEUR = 25          # €/t (comme OPEX)
+COUT_NETTOYAGE = 1500     # € par effet nettoyé (produits, main d'œuvre)
+COUT_ARRET_HORAIRE = 250  # €/h d'arrêt de l'évaporateur (production perdue hors vapeur)
+DUREE_ARRET = 8           # h d'arrêt par nettoyage
+ECONOMIE_SECOURS = 1.0    # kg d'eau évaporée par kg de vapeur hors de l'évaporateur
+MAX_PERIODIQUES = 200000  # plannings périodiques énumérés au plus
+
+
+def parametres_encrassement(n):
+    """(Rf asymptotique, constante de temps) de n effets, interpolés sur ceux du triple effet"""
+    if n == 1:
+        return np.array(RF_ASYMPTOTE[:1]), np.array(TAU_ENCRASSEMENT[:1])
+    t = np.linspace(0, 1, n)
+    t_ref = np.linspace(0, 1, len(RF_ASYMPTOTE))
+    return np.interp(t, t_ref, RF_ASYMPTOTE), np.interp(t, t_ref, TAU_ENCRASSEMENT)
+
+
+def resistance_encrassement(age, Rf_asymptote=RF_ASYMPTOTE, tau=TAU_ENCRASSEMENT, Rf0=RF_PROPRE):
+    """
+    Rf(t) = Rf0 + Rf∞ (1 - exp(-t/τ)) (m².K/W)
+    age : heures depuis le dernier nettoyage, (..., n) avec Rf∞ et τ par effet
+    """
+    age = np.asarray(age, dtype=float)
+    return Rf0 + np.asarray(Rf_asymptote) * -np.expm1(-age / np.asarray(tau))
+
+
+def ages_depuis_nettoyage(nettoyages, pas=24, age_initial=0):
+    """
+    Heures écoulées depuis le dernier nettoyage au début de chaque période
+    nettoyages : (..., P, n) booléens, effet nettoyé en début de période
+    age_initial : âge de l'encrassement (h) au début de la campagne, scalaire ou (n,)
+    """
+    nettoyages = np.asarray(nettoyages, dtype=bool)
+    debut = np.arange(nettoyages.shape[-2])[:, None] * float(pas)
+    dernier = np.maximum.accumulate(np.where(nettoyages, debut, -np.inf), axis=-2)
+    dernier = np.maximum(dernier, -np.asarray(age_initial, dtype=float))
+    return debut - dernier
+
+
+def bilan_reference(F=20000, xF=0.15, x_final=0.65, P=None, T_feed=85, n_effets=3):
+    """
+    Régime nominal de l'évaporateur et surfaces installées : dimensionnées
+    avec la marge d'encrassement de conception (optimisation.Rf)
+    """
+    if P is None:
+        P = pressions_effets(n_effets, xF, x_final)
+    L, V, x, T, Q = (a[0] for a in evaporation_multi_cas(F, xF, x_final, P, T_feed))
+    DT = ecarts_temperature(T)
+    U = coefficients_U(len(T))
+    return {
+        'Q': Q, 'DT': DT, 'U': U,
+        'A': surface_echange(Q, U, DT, Rf),
+        'S': Q[0] / 2.15e6,
+        'V': float(V.sum()),
+    }
+
+
+def evaluer_plannings(nettoyages, pas=24, reference=None, duree_arret=DUREE_ARRET,
+                      prix_vapeur=PRIX_VAPEUR, cout_nettoyage=COUT_NETTOYAGE,
+                      cout_arret_horaire=COUT_ARRET_HORAIRE, age_initial=0, detail=False):
+    """
+    Coût de campagne (€) de K plannings de nettoyage, nettoyages : (K, P, n)
+    À surface installée fixe, l'encrassement Rf(t) de chaque effet augmente la
+    surface requise (surface_echange) ; la capacité de l'effet est le rapport
+    surface installée / surface requise (plafonné à 1) et l'évaporateur, en
+    série, suit son effet le plus limitant. L'eau non évaporée par manque de
+    capacité ou pendant les arrêts l'est hors de l'évaporateur, à l'économie
+    ECONOMIE_SECOURS. Un arrêt (duree_arret h) a lieu à chaque période où au
+    moins un effet est nettoyé ; Rf est évalué au milieu de chaque période.
+    detail=True renvoie aussi Rf (K, P, n), capacité et vapeur (K, P)
+    """
+    if reference is None:
+        reference = bilan_reference()
+    nettoyages = np.asarray(nettoyages, dtype=bool)
+    if nettoyages.ndim == 2:
+        nettoyages = nettoyages[None]
+    Rf_asymptote, tau = parametres_encrassement(nettoyages.shape[-1])
+
+    age = ages_depuis_nettoyage(nettoyages, pas, age_initial) + pas / 2
+    Rf_t = resistance_encrassement(age, Rf_asymptote, tau)
+    A_requise = surface_echange(reference['Q'], reference['U'], reference['DT'], Rf_t)
+    capacite = np.minimum(reference['A'] / A_requise, 1.0).min(axis=-1)
+
+    arret = nettoyages.any(axis=-1)
+    capacite = capacite * (1 - arret * min(duree_arret / pas, 1.0))
+    vapeur = capacite * reference['S'] + (1 - capacite) * reference['V'] / ECONOMIE_SECOURS
+
+    cout_vapeur = vapeur.sum(axis=-1) * pas * prix_vapeur / 1000
+    cout_arrets = (nettoyages.sum(axis=(-2, -1)) * cout_nettoyage
+                   + arret.sum(axis=-1) * duree_arret * cout_arret_horaire)
+    cout = cout_vapeur + cout_arrets
+    if not detail:
+        return cout
+    return {'cout': cout, 'cout_vapeur': cout_vapeur, 'cout_arrets': cout_arrets,
+            'Rf': Rf_t, 'capacite': capacite, 'vapeur': vapeur}
+
+
+def plannings_periodiques(n_periodes, n_effets, intervalles=None):
+    """
+    Tous les plannings périodiques : chaque effet nettoyé toutes les k_i périodes
+    (k_i parmi `intervalles`, k_i >= n_periodes : jamais). Renvoie (K, n) intervalles
+    Par défaut tous les intervalles de 1 à n_periodes, ou une suite géométrique
+    si le nombre de combinaisons dépasse MAX_PERIODIQUES
+    """
+    if intervalles is None:
+        m = int(MAX_PERIODIQUES ** (1 / n_effets))
+        if m >= n_periodes:
+            intervalles = range(1, n_periodes + 1)
+        else:
+            intervalles = np.unique(np.geomspace(1, n_periodes, m).round().astype(int))
+    axes = [np.asarray(list(intervalles))] * n_effets
+    return np.array(np.meshgrid(*axes, indexing='ij')).reshape(n_effets, -1).T
+
+
+def planning_periodique(intervalles, n_periodes):
+    """(K, n) intervalles -> (K, P, n) nettoyages aux périodes k, 2k, ..."""
+    periodes = np.arange(n_periodes)[None, :, None]
+    intervalles = np.asarray(intervalles)[:, None, :]
+    return (periodes > 0) & (periodes % intervalles == 0)
+
+
+@chronometre('encrassement.optimisation')
+def optimiser_nettoyages(duree_campagne=56, pas=24, F=20000, xF=0.15, x_final=0.65, T_feed=85,
+                         n_effets=3, intervalles=None, n_candidats=2000, n_generations=10,
+                         fraction_elite=0.05, lissage=0.7, taille_bloc=4096, graine=0, **couts):
+    """
+    Planning de nettoyage minimisant vapeur + arrêts sur une campagne de
+    duree_campagne périodes de `pas` heures (jours par défaut)
+    1) tous les plannings périodiques (un intervalle par effet), évalués par blocs
+    2) entropie croisée sur des plannings quelconques, partant du meilleur
+       planning périodique : regroupe les nettoyages de plusieurs effets sur un
+       même arrêt ou les décale selon l'encrassement réel
+    couts : duree_arret, prix_vapeur, cout_nettoyage, cout_arret_horaire, age_initial
+    """
+    reference = bilan_reference(F, xF, x_final, None, T_feed, n_effets)
+    P = int(duree_campagne)
+
+    candidats = plannings_periodiques(P, n_effets, intervalles)
+    meilleur_cout, meilleur_intervalles = np.inf, None
+    for debut in range(0, len(candidats), taille_bloc):
+        bloc = candidats[debut:debut + taille_bloc]
+        cout = evaluer_plannings(planning_periodique(bloc, P), pas, reference, **couts)
+        i = int(np.argmin(cout))
+        if cout[i] < meilleur_cout:
+            meilleur_cout, meilleur_intervalles = float(cout[i]), bloc[i]
+    n_eval = len(candidats)
+    meilleur = planning_periodique(meilleur_intervalles[None], P)[0]
+    cout_periodique = meilleur_cout
+
+    rng = np.random.default_rng(graine)
+    probabilites = 0.9 * meilleur + 0.05
+    n_elite = max(2, int(fraction_elite * n_candidats))
+    historique = [meilleur_cout]
+    for generation in range(n_generations):
+        plannings = rng.random((n_candidats, P, n_effets)) < probabilites
+        cout = evaluer_plannings(plannings, pas, reference, **couts)
+        n_eval += n_candidats
+
+        i = int(np.argmin(cout))
+        if cout[i] < meilleur_cout:
+            meilleur_cout, meilleur = float(cout[i]), plannings[i]
+        historique.append(meilleur_cout)
+
+        elites = plannings[np.argsort(cout)[:n_elite]]
+        probabilites = lissage * elites.mean(axis=0) + (1 - lissage) * probabilites
+
+    res = evaluer_plannings(meilleur, pas, reference, detail=True, **couts)
+    return {
+        'nettoyages': [{'periode': int(p), 'effets': [int(e) + 1 for e in np.flatnonzero(meilleur[p])]}
+                       for p in np.flatnonzero(meilleur.any(axis=1))],
+        'cout': meilleur_cout,
+        'cout_vapeur': float(res['cout_vapeur'][0]),
+        'cout_arrets': float(res['cout_arrets'][0]),
+        'capacite': res['capacite'][0],
+        'Rf': res['Rf'][0],
+        'cout_periodique': cout_periodique,
+        'intervalles_periodiques': [int(k) for k in meilleur_intervalles],
+        'evaluations': n_eval,
+        'historique': historique,
+    }
+
+
+if __name__ == "__main__":
+    import time
+    t0 = time.perf_counter()
+    res = optimiser_nettoyages()
+    print(f"Coût de campagne : {res['cout']:.0f} € (périodique : {res['cout_periodique']:.0f} €, "
+          f"intervalles {res['intervalles_periodiques']})")
+    print(f"  vapeur {res['cout_vapeur']:.0f} €, arrêts {res['cout_arrets']:.0f} €")
+    for n in res['nettoyages']:
+        print(f"  jour {n['periode']:3d} : effets {n['effets']}")
+    print(f"{res['evaluations']} plannings évalués en {time.perf_counter() - t0:.2f} s")
@@ -1,43 +1,249 @@
 import numpy as np
 from thermodynamique import Thermo
+from mesures import chronometre
 
 
 def evaporation_triple_effet(F, xF, x_final, P, T_feed):
-    n = 3
+    return evaporation_n_effets(F, xF, x_final, P[:3], T_feed)
 
-    # Bilans matière
+
+def evaporation_n_effets(F, xF, x_final, P, T_feed):
+    """
+    Évaporateur à n effets en alimentation directe (n = len(P))
+    Retourne les listes L, V, x, T, Q des n effets
+    """
+    L, V, x, T, Q = evaporation_multi_cas(F, xF, x_final, P, T_feed)
+    return L[0].tolist(), V[0].tolist(), x[0].tolist(), T[0].tolist(), Q[0].tolist()
+
+
+@chronometre('evaporateurs.bilans')
+def evaporation_multi_cas(F, xF, x_final, P, T_feed):
+    """
+    Résout N cas d'alimentation en une seule passe vectorisée
+    (n effets en alimentation directe, n = nombre de colonnes de P)
+    F, xF, x_final, T_feed : scalaires ou tableaux (N,)
+    P : pressions des effets, (n,) commune à tous les cas ou (N, n)
+    Retourne L, V, x, T, Q sous forme de tableaux (N, n)
+    """
+    P = np.atleast_2d(np.asarray(P, dtype=float))
+    F, xF, x_final, T_feed = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (F, xF, x_final, T_feed))
+    )
+    N = max(len(F), len(P))
+    P = np.broadcast_to(P, (N, P.shape[1]))
+    F, xF, x_final, T_feed = (np.broadcast_to(a, (N,)) for a in (F, xF, x_final, T_feed))
+    n = P.shape[1]
+
+    # Bilans matière (répartition égale de la vapeur)
     Lf = F * xF / x_final
     Vtot = F - Lf
-    V = [Vtot / n] * n
+    V = np.repeat((Vtot / n)[:, None], n, axis=1)
+
+    L = F[:, None] - np.cumsum(V, axis=1)
+    x = (F * xF)[:, None] / L
 
-    L = [F]
-    x = [xF]
+    # Températures et propriétés thermiques
+    T = Thermo.Tsat(P) + Thermo.EPE(x * 100)
+    lambda_i = Thermo.chaleur_latente(P)
+    Cp = Thermo.Cp_solution(x)
 
-    for i in range(n):
-        L.append(L[i] - V[i])
-        x.append(L[i] * x[i] / L[i + 1])
+    # Bilans énergétiques
+    Q = np.empty_like(V)
+    Q[:, 0] = (
+        L[:, 0] * Cp[:, 0] * T[:, 0]
+        + V[:, 0] * lambda_i[:, 0]
+        - F * Thermo.Cp_solution(xF) * T_feed
+    ) / 0.97
+    Q[:, 1:] = (V[:, :-1] * lambda_i[:, :-1]) / 1.03
 
-    # Températures
-    T = []
-    for i in range(n):
-        Ts = Thermo.Tsat(P[i])
-        T.append(Ts + Thermo.EPE(x[i + 1] * 100))
+    return L, V, x, T, Q
 
-    # Propriétés thermiques
-    lambda_i = [Thermo.chaleur_latente(P[i]) for i in range(n)]
-    Cp = [Thermo.Cp_solution(x[i + 1]) for i in range(n)]
 
-    # Bilans énergétiques
-    Q = []
-    for i in range(n):
-        if i == 0:
-            Qi = (
-                L[1] * Cp[0] * T[0]
-                + V[0] * lambda_i[0]
-                - F * Thermo.Cp_solution(xF) * T_feed
-            ) / 0.97
-        else:
-            Qi = (V[i - 1] * lambda_i[i - 1]) / 1.03
-        Q.append(Qi)
-
-    return L[1:], V, x[1:], T, Q
\ No newline at end of file
+def pressions_effets(n, xF, x_final, Pn=0.15, T_vapeur=120):
+    """
+    Pressions de n effets (bar) donnant des écarts de température égaux
+    entre la vapeur de chauffe (T_vapeur) et le dernier effet à Pn, en
+    tenant compte de l'élévation du point d'ébullition de chaque effet
+    """
+    i = np.arange(1, n + 1)
+    # Répartition égale de la vapeur : concentrations connues a priori
+    x = xF / (1 - i / n * (1 - xF / x_final))
+    EPE = Thermo.EPE(x * 100)
+
+    T_n = Thermo.Tsat(Pn) + EPE[-1]
+    T = T_vapeur - i * (T_vapeur - T_n) / n
+    P = Thermo.Psat(T - EPE)
+    P[-1] = Pn
+    return P
+
+
+# ---------- RÉGIME TRANSITOIRE ----------
+def echelon(t0, avant, apres, duree=60.0):
+    """
+    Perturbation en échelon à t0 (s), adoucie par une rampe de `duree` s
+    avant, apres : scalaires ou tableaux (N,) (un niveau par scénario)
+    """
+    avant = np.asarray(avant, dtype=float)
+    apres = np.asarray(apres, dtype=float)
+
+    def valeur(t):
+        f = np.clip((t - t0) / duree, 0.0, 1.0) if duree > 0 else float(t >= t0)
+        return avant + f * (apres - avant)
+    return valeur
+
+
+def _entree(valeur):
+    """Entrée constante ou fonction du temps -> fonction t -> valeur"""
+    if callable(valeur):
+        return valeur
+    return lambda t: valeur
+
+
+def _table_saturation():
+    """Table de saturation du modèle transitoire (Tsat de la vapeur à chaque pas)"""
+    global _TABLE_DYNAMIQUE
+    if Thermo.tables is not None:
+        return Thermo.tables
+    if _TABLE_DYNAMIQUE is None:
+        from thermodynamique import TableSaturation
+        _TABLE_DYNAMIQUE = TableSaturation()
+    return _TABLE_DYNAMIQUE
+
+_TABLE_DYNAMIQUE = None
+
+
+def evaporation_dynamique(duree=3600, F=20000, xF=0.15, T_feed=85, P_vapeur=None, P=None,
+                          x_final=0.65, retention=5000.0, tau_ebullition=10.0, demarrage=False,
+                          n_points=121, rtol=1e-5):
+    """
+    Évaporateur multi-effet en régime transitoire, alimentation directe
+    États par effet : rétention M (kg), concentration x, température T (°C)
+
+        dM/dt = L_entrée - L_sortie - V
+        M dx/dt = L_entrée (x_entrée - x) + V x
+        M Cp dT/dt = L_entrée Cp_e (T_entrée) - L_entrée Cp T + q - V λ
+
+    - effet 1 chauffé par la vapeur vive : q = 0.97 UA (Tsat(P_vapeur) - T),
+      UA calé sur le régime permanent de evaporation_multi_cas ;
+      effets suivants chauffés par la vapeur du précédent : q = V λ / 1.03
+    - ébullition dès que T dépasse Tsat(P) + EPE(x), avec un temps de
+      relaxation tau_ebullition (s) : c'est ce terme qui rend le système raide
+    - soutirage proportionnel à la rétention (vanne de niveau linéaire),
+      égal au débit du régime permanent quand M = retention
+
+    F, xF, T_feed, P_vapeur : constantes, tableaux (N,) ou fonctions t -> valeur
+                              (voir echelon) ; les N scénarios sont intégrés ensemble
+    P : pressions des effets (n,) ou (N, n), par défaut pressions_effets(3, ...)
+    P_vapeur : pression de la vapeur vive (bar), par défaut Psat(120 °C)
+    x_final : concentration du régime permanent de calage
+    demarrage : True part d'effets remplis d'alimentation froide ; sinon
+                du régime permanent correspondant aux entrées à t = 0
+    Retourne un dict de trajectoires (n_points, [N,] n) : t (s), M, x, T, V, L
+    (kg/h) et S (vapeur vive, kg/h)
+    """
+    from scipy.integrate import solve_ivp
+    from scipy.sparse import kron, identity, csr_matrix
+
+    F_t, xF_t, Tf_t = _entree(F), _entree(xF), _entree(T_feed)
+    Pv_t = _entree(Thermo.Psat(120.0) if P_vapeur is None else P_vapeur)
+
+    entrees0 = np.broadcast_arrays(*(np.atleast_1d(np.asarray(f(0.0), dtype=float))
+                                     for f in (F_t, xF_t, Tf_t, Pv_t)))
+    if P is None:
+        P = pressions_effets(3, float(np.mean(entrees0[1])), x_final)
+    P = np.atleast_2d(np.asarray(P, dtype=float))
+    N = max(len(entrees0[0]), len(P))
+    n = P.shape[1]
+    P = np.broadcast_to(P, (N, n))
+    F0, xF0, Tf0, Pv0 = (np.broadcast_to(a, (N,)) for a in entrees0)
+
+    # Propriétés aux pressions des effets (constantes)
+    Tsat_P = Thermo.Tsat(P)
+    lam = Thermo.chaleur_latente(P)
+    table = _table_saturation()
+
+    # Calage sur le régime permanent : UA de l'effet 1 et débits de soutirage
+    L_ref, V_ref, x_ref, T_ref, Q_ref = evaporation_multi_cas(F0, xF0, x_final, P, Tf0)
+    dT1 = table.Tsat(Pv0) - T_ref[:, 0]
+    if np.any(dT1 <= 0):
+        raise ValueError("Vapeur vive plus froide que le premier effet : augmenter P_vapeur "
+                         "ou abaisser les pressions des effets")
+    UA = Q_ref[:, 0] / 3600 / dT1                 # W/K
+    k_soutirage = L_ref / 3600 / retention        # 1/s
+
+    def entrees(t):
+        """F (kg/s), xF, T_feed et Tsat de la vapeur vive à l'instant t, (N, 1)"""
+        F_, xF_, Tf_, Pv_ = (np.broadcast_to(np.asarray(f(t), dtype=float), (N,))[:, None]
+                             for f in (F_t, xF_t, Tf_t, Pv_t))
+        return F_ / 3600, xF_, Tf_, table.Tsat(Pv_)
+
+    def flux(e, M, x, T):
+        """Débits (kg/s) et puissances ; e : entrées (N, 1) ou (N, k), M, x, T : (N, n, k)"""
+        F_, xF_, Tf_, T_vap = e
+        Cp = Thermo.Cp_solution(x)
+        T_eq = Tsat_P[..., None] + Thermo.EPE(x * 100)
+        V = np.maximum(T - T_eq, 0) * M * Cp / (lam[..., None] * tau_ebullition)
+        L = k_soutirage[..., None] * M
+
+        q = np.empty_like(T)
+        q[:, 0] = 0.97 * UA[:, None] * (T_vap - T[:, 0])
+        q[:, 1:] = V[:, :-1] * lam[:, :-1, None] / 1.03
+
+        L_e = np.concatenate([np.broadcast_to(F_[:, None], L[:, :1].shape), L[:, :-1]], axis=1)
+        x_e = np.concatenate([np.broadcast_to(xF_[:, None], x[:, :1].shape), x[:, :-1]], axis=1)
+        T_e = np.concatenate([np.broadcast_to(Tf_[:, None], T[:, :1].shape), T[:, :-1]], axis=1)
+        h_e = Thermo.Cp_solution(x_e) * T_e
+        return V, L, q, L_e, x_e, h_e, Cp, T_vap
+
+    def derivees(t, y):
+        M, x, T = y.reshape(3, N, n, -1)
+        V, L, q, L_e, x_e, h_e, Cp, _ = flux(entrees(t), M, x, T)
+        dM = L_e - L - V
+        dx = (L_e * (x_e - x) + V * x) / M
+        dT = (L_e * (h_e - Cp * T) + q - V * lam[..., None]) / (M * Cp)
+        return np.concatenate([dM, dx, dT]).reshape(3 * N * n, -1)
+
+    # Les scénarios sont indépendants : jacobien bloc-diagonal (3n x 3n par scénario)
+    motif = kron(np.ones((3, 3)), kron(identity(N), np.ones((n, n))))
+    options = dict(method='BDF', vectorized=True, jac_sparsity=csr_matrix(motif), rtol=rtol,
+                   atol=np.concatenate([np.full(N * n, 1e-3), np.full(N * n, 1e-8), np.full(N * n, 1e-5)]))
+
+    if demarrage:
+        y0 = np.concatenate([np.full((N, n), retention).ravel(),
+                             np.repeat(xF0, n), np.repeat(Tf0, n)])
+    else:
+        # Régime permanent des entrées à t = 0 : intégration préalable à entrées figées
+        y_init = np.concatenate([np.full((N, n), retention).ravel(), x_ref.ravel(), T_ref.ravel()])
+        fige = lambda t, y: derivees(0.0, y)
+        pre = solve_ivp(fige, (0, 24 * 3600), y_init, **options)
+        if not pre.success:
+            raise RuntimeError(f"Calcul du régime permanent échoué : {pre.message}")
+        y0 = pre.y[:, -1]
+
+    t = np.linspace(0, duree, n_points)
+    sol = solve_ivp(derivees, (0, duree), y0, t_eval=t, **options)
+    if not sol.success:
+        raise RuntimeError(f"Intégration de l'évaporateur échouée : {sol.message}")
+
+    M, x, T = sol.y.reshape(3, N, n, -1)
+    e = [np.concatenate(a, axis=1) for a in zip(*(entrees(ti) for ti in t))]
+    V, L, q, _, _, _, _, T_vap = flux(e, M, x, T)
+    S = q[:, 0] / 0.97 / Thermo.chaleur_latente(Thermo.Psat(T_vap))
+
+    unique = N == 1 and all(np.ndim(a) == 0 for a in (F_t(0.0), xF_t(0.0), Tf_t(0.0), Pv_t(0.0)))
+
+    def sortie(a):
+        """(N, [n,] n_points) -> (n_points, [N,] [n])"""
+        a = np.moveaxis(a, -1, 0)
+        return a[:, 0] if unique else a
+
+    return {
+        't': t,
+        'M': sortie(M),
+        'x': sortie(x),
+        'T': sortie(T),
+        'V': sortie(V * 3600),
+        'L': sortie(L * 3600),
+        'S': sortie(S * 3600),
+        'n_evaluations': sol.nfev,
+    }
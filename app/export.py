@@ -0,0 +1,101 @@
+"""
+Module export
+Sérialisation en flux (NDJSON, CSV) des résultats de balayages et de lots,
+avec écriture incrémentale dans resultats/ et export Excel des petits résultats
+"""
+
+from itertools import islice
+import csv
+import io
+import json
+import os
+
+DOSSIER_EXPORTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'resultats', 'exports')
+
+# Au-delà, l'export Excel est refusé (tout le tableau est chargé en mémoire)
+MAX_LIGNES_EXCEL = 100000
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+    'csv': ('text/csv', '.csv'),
+}
+
+
+def lignes_blocs(blocs):
+    """Lignes (dict) d'une suite de tableaux structurés NumPy"""
+    for bloc in blocs:
+        noms = bloc.dtype.names
+        for ligne in bloc.tolist():
+            yield dict(zip(noms, ligne))
+
+
+def flux_ndjson(lignes):
+    """Une ligne JSON par résultat"""
+    for ligne in lignes:
+        yield json.dumps(ligne) + '\n'
+
+
+def flux_csv(lignes, taille_paquet=1000):
+    """CSV avec en-tête (colonnes de la première ligne), produit par paquets de lignes"""
+    tampon = io.StringIO()
+    ecrivain = None
+    n = 0
+    for ligne in lignes:
+        if ecrivain is None:
+            ecrivain = csv.DictWriter(tampon, fieldnames=list(ligne), lineterminator='\n')
+            ecrivain.writeheader()
+        ecrivain.writerow(ligne)
+        n += 1
+        if n % taille_paquet == 0:
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+    if tampon.tell():
+        yield tampon.getvalue()
+
+
+def serialiser(lignes, format_='ndjson'):
+    """Générateur de texte au format demandé ('ndjson' ou 'csv')"""
+    if format_ == 'ndjson':
+        return flux_ndjson(lignes)
+    if format_ == 'csv':
+        return flux_csv(lignes)
+    raise ValueError(f"Format inconnu : {format_} (attendu : {', '.join(FORMATS)})")
+
+
+def ecrire_en_flux(morceaux, chemin):
+    """
+    Écrit les morceaux de texte dans `chemin` au fur et à mesure et les
+    renvoie à l'identique (pour diffuser et enregistrer en même temps)
+    """
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, 'w', encoding='utf-8', newline='') as f:
+        for morceau in morceaux:
+            f.write(morceau)
+            yield morceau
+
+
+def enregistrer(lignes, nom, format_='ndjson', dossier=DOSSIER_EXPORTS):
+    """Écrit les lignes dans dossier/nom.<format> sans les garder en mémoire ; renvoie le chemin"""
+    chemin = os.path.join(dossier, nom + FORMATS[format_][1])
+    for _ in ecrire_en_flux(serialiser(lignes, format_), chemin):
+        pass
+    return chemin
+
+
+def exporter_excel(lignes, chemin):
+    """
+    Export Excel (pandas + openpyxl), réservé aux petits résultats
+    chemin : chemin de fichier ou objet fichier binaire (io.BytesIO)
+    """
+    import pandas as pd
+
+    lignes = list(islice(lignes, MAX_LIGNES_EXCEL + 1))
+    if len(lignes) > MAX_LIGNES_EXCEL:
+        raise ValueError(f"Trop de lignes pour Excel (> {MAX_LIGNES_EXCEL}) : "
+                         "utiliser le CSV ou le NDJSON")
+    if isinstance(chemin, str):
+        os.makedirs(os.path.dirname(chemin) or '.', exist_ok=True)
+    pd.DataFrame.from_records(lignes).to_excel(chemin, index=False)
+    return chemin
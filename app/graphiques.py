@@ -0,0 +1,266 @@
+"""
+Module graphiques
+Tracé des graphiques de simulation sur des objets Figure explicites
+(canevas Agg), sans l'état global de pyplot : sûr dans un serveur WSGI
+multithread et utilisable dans un pool de threads ou de processus.
+Les figures sont construites une fois par thread (gabarits) puis seules
+leurs données sont remplacées ; export PNG, SVG ou JSON (tracé navigateur)
+"""
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import io
+import multiprocessing
+import threading
+
+import numpy as np
+
+
+def nouvelle_figure(figsize=(10, 4)):
+    """Figure indépendante attachée à son propre canevas Agg"""
+    # Import au premier graphique : Matplotlib n'est pas chargé au démarrage
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure_en_png(fig, dpi=100):
+    """Rend la figure en PNG"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+# ---------- GABARITS ----------
+# Chaque graphique = 2 panneaux décrits une fois : servent à construire la
+# figure Matplotlib, à la mettre à jour et à l'export JSON pour le navigateur
+
+def _effets(d):
+    return np.arange(1, len(d['T']) + 1)
+
+def _heures(d):
+    return np.asarray(d['t']) / 3600
+
+SERIES = {
+    'effets': _effets,
+    'T': lambda d: np.asarray(d['T'], dtype=float),
+    'x_pct': lambda d: np.asarray(d['x'], dtype=float) * 100,
+    'V': lambda d: np.asarray(d['V'], dtype=float),
+    'A': lambda d: np.asarray(d['A'], dtype=float),
+    'heures': _heures,
+    'Tlin': lambda d: np.asarray(d['Tlin'], dtype=float),
+    'Slin': lambda d: np.asarray(d['Slin'], dtype=float),
+    'G_um_s': lambda d: np.asarray(d['Glin'], dtype=float) * 1e6,
+    'taille_um': lambda d: np.asarray(d['Glin'], dtype=float) * 1e6 * np.asarray(d['t']),
+}
+
+_LIGNE_EFFETS = {'type': 'ligne', 'x': 'effets', 'xlabel': "Effet", 'marqueurs': True, 'grille': 'xy'}
+_BARRES_EFFETS = {'type': 'barres', 'x': 'effets', 'xlabel': "Effet", 'grille': 'y'}
+_LIGNE_TEMPS = {'type': 'ligne', 'x': 'heures', 'xlabel': "Temps (h)", 'remplissage': True, 'grille': 'xy'}
+
+GABARITS = {
+    'profils_temp_conc': [
+        {**_LIGNE_EFFETS, 'y': 'T', 'couleur': '#1f77b4',
+         'titre': "Profil de température", 'ylabel': "Température (°C)"},
+        {**_LIGNE_EFFETS, 'y': 'x_pct', 'couleur': 'red',
+         'titre': "Profil de concentration", 'ylabel': "Concentration (%)"},
+    ],
+    'vapeur_surface': [
+        {**_BARRES_EFFETS, 'y': 'V', 'couleur': 'skyblue', 'bordure': 'navy', 'annotation': '{:.0f}',
+         'titre': "Production de vapeur", 'ylabel': "Vapeur (kg/h)"},
+        {**_BARRES_EFFETS, 'y': 'A', 'couleur': 'lightgreen', 'bordure': 'darkgreen', 'annotation': '{:.1f}',
+         'titre': "Surface d'échange", 'ylabel': "Surface (m²)"},
+    ],
+    'cristallisation': [
+        {**_LIGNE_TEMPS, 'y': 'Tlin', 'couleur': 'blue',
+         'titre': "Profil de température - Cristallisation", 'ylabel': "Température (°C)"},
+        {**_LIGNE_TEMPS, 'y': 'Slin', 'couleur': 'red',
+         'titre': "Profil de sursaturation", 'ylabel': "Sursaturation relative"},
+    ],
+    'croissance_taille': [
+        {**_LIGNE_TEMPS, 'y': 'G_um_s', 'couleur': 'green',
+         'titre': "Vitesse de croissance", 'ylabel': "G (µm/s)"},
+        {**_LIGNE_TEMPS, 'y': 'taille_um', 'couleur': '#6f42c1',
+         'titre': "Évolution de la taille des cristaux", 'ylabel': "Taille (µm)"},
+    ],
+}
+
+# graph_id : nom du fichier téléchargé
+GRAPHIQUES = {
+    'profils_temp_conc': 'profils_temperature_concentration.png',
+    'vapeur_surface': 'production_vapeur_surface.png',
+    'cristallisation': 'cristallisation.png',
+    'croissance_taille': 'croissance_taille.png',
+}
+
+
+def _tracer_panneau(ax, panneau, x, y):
+    """Crée les éléments variables d'un panneau ; renvoie leurs références"""
+    elements = {}
+    if panneau['type'] == 'barres':
+        elements['barres'] = ax.bar(x, y, width=0.6, color=panneau['couleur'],
+                                    edgecolor=panneau.get('bordure'))
+        elements['textes'] = [ax.text(b.get_x() + b.get_width() / 2., b.get_height(),
+                                      panneau['annotation'].format(b.get_height()),
+                                      ha='center', va='bottom', fontweight='bold')
+                              for b in elements['barres']]
+    else:
+        style = {'marker': 'o', 'markerfacecolor': 'white', 'markersize': 8} if panneau.get('marqueurs') else {}
+        elements['ligne'], = ax.plot(x, y, '-', color=panneau['couleur'], linewidth=2, **style)
+        if panneau.get('remplissage'):
+            elements['remplissage'] = ax.fill_between(x, y, alpha=0.3, color=panneau['couleur'])
+    return elements
+
+
+def _mettre_a_jour_panneau(ax, panneau, elements, x, y):
+    """Remplace les données d'un panneau existant et réajuste les échelles"""
+    if panneau['type'] == 'barres':
+        for barre, texte, h in zip(elements['barres'], elements['textes'], y):
+            barre.set_height(h)
+            texte.set_position((barre.get_x() + barre.get_width() / 2., h))
+            texte.set_text(panneau['annotation'].format(h))
+        ax.relim()
+    else:
+        elements['ligne'].set_data(x, y)
+        # relim ignore les collections : le remplissage est recréé après
+        if 'remplissage' in elements:
+            elements['remplissage'].remove()
+        ax.relim()
+        if 'remplissage' in elements:
+            elements['remplissage'] = ax.fill_between(x, y, alpha=0.3, color=panneau['couleur'])
+    ax.autoscale_view()
+
+
+def construire(graph_id, d):
+    """Figure complète du graphique `graph_id` ; renvoie (figure, éléments de chaque panneau)"""
+    fig = nouvelle_figure()
+    elements = []
+    for i, panneau in enumerate(GABARITS[graph_id]):
+        ax = fig.add_subplot(1, 2, i + 1)
+        x, y = SERIES[panneau['x']](d), SERIES[panneau['y']](d)
+        elements.append(_tracer_panneau(ax, panneau, x, y))
+        ax.set_title(panneau['titre'], fontweight='bold', fontsize=12)
+        ax.set_xlabel(panneau['xlabel'], fontweight='bold')
+        ax.set_ylabel(panneau['ylabel'], fontweight='bold')
+        if panneau['grille'] == 'y':
+            ax.grid(axis='y', alpha=0.3)
+        else:
+            ax.grid(True, alpha=0.3)
+        if panneau['x'] == 'effets':
+            ax.set_xticks(x)
+    fig.tight_layout()
+    return fig, elements
+
+
+class Gabarit:
+    """
+    Figure construite une seule fois (axes, titres, grilles, étiquettes),
+    dont seules les données sont remplacées à chaque rendu
+    """
+
+    def __init__(self, graph_id, d):
+        self.graph_id = graph_id
+        self.figure, self.elements = construire(graph_id, d)
+
+    def mettre_a_jour(self, d):
+        for ax, panneau, elements in zip(self.figure.axes, GABARITS[self.graph_id], self.elements):
+            _mettre_a_jour_panneau(ax, panneau, elements, SERIES[panneau['x']](d), SERIES[panneau['y']](d))
+
+
+# Un jeu de gabarits par thread : une figure n'est jamais dessinée par deux threads à la fois
+_gabarits = threading.local()
+
+
+def _gabarit(graph_id, d):
+    """Gabarit du thread courant, créé au premier usage ; True si les données restent à poser"""
+    cache = _gabarits.__dict__.setdefault('figures', {})
+    if graph_id not in cache:
+        cache[graph_id] = Gabarit(graph_id, d)
+        return cache[graph_id], False
+    return cache[graph_id], True
+
+
+def donnees_graphique(graph_id, d):
+    """Description JSON du graphique (panneaux, libellés et séries) pour un tracé côté navigateur"""
+    panneaux = []
+    for panneau in GABARITS[graph_id]:
+        description = {cle: v for cle, v in panneau.items() if cle not in ('x', 'y')}
+        description['x'] = SERIES[panneau['x']](d).tolist()
+        description['y'] = SERIES[panneau['y']](d).tolist()
+        panneaux.append(description)
+    return {'id': graph_id, 'panneaux': panneaux}
+
+
+def donnees_graphiques(d):
+    """Sous-ensemble des résultats utilisé par les tracés (léger à transmettre à un processus)"""
+    return {cle: np.asarray(d[cle]) for cle in ('T', 'x', 'V', 'A', 't', 'Tlin', 'Slin', 'Glin')}
+
+
+FORMATS_IMAGE = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def tracer(graph_id, d, format_='png', gabarit=True):
+    """
+    Trace le graphique `graph_id` et renvoie l'image (PNG ou SVG, bytes)
+    gabarit : réutilise la figure déjà construite par ce thread (seules les
+              données changent) ; False reconstruit la figure entière
+    """
+    if format_ not in FORMATS_IMAGE:
+        raise ValueError(f"Format d'image inconnu : {format_}")
+    if gabarit:
+        modele, a_mettre_a_jour = _gabarit(graph_id, d)
+        if a_mettre_a_jour:
+            modele.mettre_a_jour(d)
+        fig = modele.figure
+    else:
+        fig, _ = construire(graph_id, d)
+    if format_ == 'svg':
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='svg', bbox_inches='tight')
+        return buffer.getvalue()
+    return figure_en_png(fig)
+
+
+class Rendu:
+    """
+    Rendu de plusieurs graphiques en parallèle
+    mode : 'thread' (défaut, sans copie des données) ou 'processus'
+           (vrai parallélisme, les données sont transmises par pickle ;
+           processus lancés par 'spawn', sans les verrous du serveur)
+    """
+
+    def __init__(self, n_workers=4, mode='thread'):
+        if mode not in ('thread', 'processus'):
+            raise ValueError(f"Mode de rendu inconnu : {mode}")
+        self.mode = mode
+        self.n_workers = n_workers
+        self._pool = None
+        self._verrou = threading.Lock()
+
+    def _executeur(self):
+        # Créé à la première requête ; le verrou évite deux pools sous requêtes concurrentes
+        with self._verrou:
+            if self._pool is None:
+                if self.mode == 'thread':
+                    self._pool = ThreadPoolExecutor(self.n_workers, thread_name_prefix='rendu')
+                else:
+                    self._pool = ProcessPoolExecutor(self.n_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def tracer_tous(self, d, graph_ids=None):
+        """{graph_id: PNG} des graphiques demandés (tous par défaut)"""
+        graph_ids = list(graph_ids or GRAPHIQUES)
+        d = donnees_graphiques(d)
+        if self.n_workers <= 1 or len(graph_ids) == 1:
+            return {graph_id: tracer(graph_id, d) for graph_id in graph_ids}
+        futurs = {graph_id: self._executeur().submit(tracer, graph_id, d) for graph_id in graph_ids}
+        return {graph_id: futur.result() for graph_id, futur in futurs.items()}
+
+    def fermer(self):
+        with self._verrou:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
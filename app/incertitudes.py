@@ -0,0 +1,188 @@
+"""
+Module incertitudes
+Propagation des incertitudes par Monte Carlo : les entrées incertaines
+(U, Rf, prix de la vapeur, loi de coût des évaporateurs, alimentation) sont
+échantillonnées par hypercube latin ou suite de Sobol, évaluées par lots
+vectorisés et l'échantillonnage s'arrête dès que les percentiles demandés
+sont connus à la précision voulue
+"""
+
+import numpy as np
+from evaporateurs import evaporation_multi_cas
+from optimisation import (surface_echange, ecarts_temperature, cout_evaporateur,
+                          cout_cristalliseur, TCI, OPEX, ROI, SECONDES_HEURE)
+from cristallisation import volume_cristalliseur
+from thermodynamique import Thermo
+from mesures import chronometre
+
+# Lois des entrées incertaines
+# ('normale', moyenne, écart-type) | ('uniforme', min, max) | ('triangulaire', min, mode, max)
+DISTRIBUTIONS = {
+    'U1': ('normale', 2500, 250),
+    'U2': ('normale', 2200, 220),
+    'U3': ('normale', 1800, 180),
+    'Rf': ('triangulaire', 0.0001, 0.0002, 0.0004),
+    'prix_vapeur': ('uniforme', 20, 35),
+    'coefficient_evaporateur': ('triangulaire', 12000, 15000, 19000),
+    'exposant_evaporateur': ('uniforme', 0.60, 0.70),
+    'xF': ('normale', 0.15, 0.005),
+    'T_feed': ('uniforme', 80, 90),
+}
+
+SORTIES = ('vapeur', 'surface', 'tci', 'opex', 'roi')
+
+
+def echantillonner(u, distributions=None):
+    """Uniformes u (N, d) -> {entrée: (N,)} par les fonctions quantiles des lois"""
+    from scipy import stats
+
+    distributions = distributions or DISTRIBUTIONS
+    echantillons = {}
+    for j, (nom, (loi, *p)) in enumerate(distributions.items()):
+        if loi == 'normale':
+            echantillons[nom] = stats.norm.ppf(u[:, j], p[0], p[1])
+        elif loi == 'uniforme':
+            echantillons[nom] = p[0] + u[:, j] * (p[1] - p[0])
+        elif loi == 'triangulaire':
+            echantillons[nom] = stats.triang.ppf(u[:, j], (p[1] - p[0]) / (p[2] - p[0]), p[0], p[2] - p[0])
+        else:
+            raise ValueError(f"Loi inconnue : {loi}")
+    return echantillons
+
+
+def evaluer_echantillons(e, F=20000, x_final=0.65, P=(1.5, 0.6, 0.15), Pelec=150,
+                         profit=300000, C_cristalliseur=0.0):
+    """
+    Évaporateur + économie pour N jeux d'entrées (dict de tableaux (N,)),
+    en une passe ; les entrées absentes de `e` prennent leur valeur nominale
+    Renvoie {sortie: (N,)} pour SORTIES
+    """
+    n = len(next(iter(e.values())))
+    nominal = lambda nom, defaut: e.get(nom, np.full(n, float(defaut)))
+
+    L, V, x, T, Q = evaporation_multi_cas(F, nominal('xF', 0.15), x_final, P, nominal('T_feed', 85))
+    DT = ecarts_temperature(T)
+    U = np.column_stack([nominal(f'U{i + 1}', u) for i, u in enumerate((2500, 2200, 1800))])
+    # surface_echange renvoie des m² × 3600 (Q en J/h) : surfaces et coûts en m²
+    A = surface_echange(Q, U, DT, nominal('Rf', 0.0002)[:, None]) / SECONDES_HEURE
+    S = Q[:, 0] / 2.15e6
+
+    Cev = cout_evaporateur(A, nominal('coefficient_evaporateur', 15000)[:, None],
+                           nominal('exposant_evaporateur', 0.65)[:, None]).sum(axis=1)
+    tci = TCI(Cev + C_cristalliseur)
+    return {
+        'vapeur': S,
+        'surface': A.sum(axis=1),
+        'tci': tci,
+        'opex': OPEX(S, Pelec, nominal('prix_vapeur', 25)),
+        'roi': ROI(tci, profit),
+    }
+
+
+def _generateurs(methode, d, n_repliques, graine):
+    """Une fonction n -> uniformes (n, d) par réplique indépendante"""
+    from scipy.stats import qmc
+
+    graines = np.random.SeedSequence(graine).spawn(n_repliques)
+    if methode == 'sobol':
+        # Une suite brouillée par réplique, tirée par blocs : les tailles
+        # cumulées restent des puissances de 2
+        return [qmc.Sobol(d, scramble=True, seed=np.random.default_rng(g)).random for g in graines]
+    if methode == 'lhs':
+        rngs = [np.random.default_rng(g) for g in graines]
+        return [lambda n, rng=rng: qmc.LatinHypercube(d, seed=rng).random(n) for rng in rngs]
+    if methode == 'aleatoire':
+        rngs = [np.random.default_rng(g) for g in graines]
+        return [lambda n, rng=rng: rng.random((n, d)) for rng in rngs]
+    raise ValueError(f"Méthode d'échantillonnage inconnue : {methode}")
+
+
+@chronometre('incertitudes.monte_carlo')
+def monte_carlo(methode='sobol', percentiles=(5, 50, 95), tolerance=0.002, confiance=0.95,
+                n_initial=256, n_max=2**20, n_repliques=8, distributions=None, graine=0,
+                n_classes=40, retourner_echantillons=False, **options):
+    """
+    Monte Carlo avec arrêt automatique
+    methode     : 'sobol' (défaut), 'lhs' (hypercube latin par lot) ou 'aleatoire'
+    n_repliques : suites randomisées indépendantes ; la dispersion des
+                  percentiles entre répliques donne leur intervalle de confiance
+                  (valable aussi pour Sobol et l'hypercube latin, dont l'erreur
+                  décroît plus vite qu'en tirage aléatoire)
+    tolerance   : demi-largeur relative maximale de l'intervalle de confiance de
+                  chaque percentile de chaque sortie ; la taille de chaque réplique
+                  double (à partir de n_initial) jusqu'à l'atteindre, ou n_max au total
+    options     : F, x_final, P, Pelec, profit, C_cristalliseur (evaluer_echantillons)
+    """
+    from scipy.stats import t as student
+
+    distributions = distributions or DISTRIBUTIONS
+    if 'C_cristalliseur' not in options:
+        # Même cristalliseur que la simulation de l'application
+        options['C_cristalliseur'] = cout_cristalliseur(volume_cristalliseur(5000, Thermo.densite(0.65, 60)))
+    generateurs = _generateurs(methode, len(distributions), n_repliques, graine)
+    k = student.ppf(0.5 + confiance / 2, n_repliques - 1) / np.sqrt(n_repliques)
+
+    lots = {nom: [] for nom in SORTIES}
+    entrees = {nom: [] for nom in distributions}
+    n, a_tirer = 0, n_initial
+    historique = []
+    while True:
+        # Les répliques d'un même lot sont évaluées ensemble : (R * a_tirer,)
+        u = np.concatenate([tirer(a_tirer) for tirer in generateurs])
+        e = echantillonner(u, distributions)
+        for nom, valeurs in evaluer_echantillons(e, **options).items():
+            lots[nom].append(valeurs.reshape(n_repliques, a_tirer))
+        if retourner_echantillons:
+            for nom, valeurs in e.items():
+                entrees[nom].append(valeurs)
+        n += n_repliques * a_tirer
+
+        estimations, ecart_max = {}, 0.0
+        for nom in SORTIES:
+            lots[nom] = [np.concatenate(lots[nom], axis=1)]
+            par_replique = np.percentile(lots[nom][0], percentiles, axis=1)   # (q, R)
+            valeurs = par_replique.mean(axis=1)
+            demi = k * par_replique.std(axis=1, ddof=1)
+            ecart_max = max(ecart_max, float(np.max(demi / np.maximum(np.abs(valeurs), 1e-300))))
+            estimations[nom] = (valeurs, demi)
+        historique.append({'n': n, 'ecart_relatif': ecart_max})
+
+        if ecart_max <= tolerance or n >= n_max:
+            break
+        a_tirer = min(n // n_repliques, (n_max - n) // n_repliques)  # doublement
+        if a_tirer == 0:
+            break
+
+    sorties = {}
+    for nom, (valeurs, demi) in estimations.items():
+        tout = lots[nom][0].ravel()
+        comptes, bornes = np.histogram(tout, bins=n_classes)
+        sorties[nom] = {
+            'moyenne': float(tout.mean()),
+            'ecart_type': float(tout.std(ddof=1)),
+            'percentiles': {str(q): float(v) for q, v in zip(percentiles, valeurs)},
+            'intervalles': {str(q): [float(v - d), float(v + d)] for q, v, d in zip(percentiles, valeurs, demi)},
+            'histogramme': {'comptes': comptes, 'bornes': bornes},
+        }
+    res = {
+        'methode': methode,
+        'n_echantillons': n,
+        'converge': historique[-1]['ecart_relatif'] <= tolerance,
+        'historique': historique,
+        'sorties': sorties,
+    }
+    if retourner_echantillons:
+        res['echantillons'] = {nom: np.concatenate(v) for nom, v in entrees.items()}
+    return res
+
+
+if __name__ == "__main__":
+    import time
+    for methode in ['aleatoire', 'lhs', 'sobol']:
+        t0 = time.perf_counter()
+        res = monte_carlo(methode)
+        print(f"\n{methode}: {res['n_echantillons']} échantillons en {time.perf_counter() - t0:.2f} s"
+              f" (convergé : {res['converge']})")
+        for nom, s in res['sorties'].items():
+            p = s['percentiles']
+            print(f"  {nom:8s} P5 {p['5']:.4g}  P50 {p['50']:.4g}  P95 {p['95']:.4g}")
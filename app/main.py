@@ -65,8 +65,12 @@ Blin = nucleation(Slin, 50)
 print(f"Sursaturation finale = {Slin[-1]:.3f}")
 print(f"Croissance G finale = {Glin[-1]:.2e} m/s")
 print(f"Nucléation B finale = {Blin[-1]:.2e}")
-print(f"L50 finale = {L50(Glin[-1], t[-1])*1e6:.1f} µm")
-print(f"CV = {CV()} %")
+batch = simulation_batch(lambda ti: profil_lineaire(ti, 70, 35, 4*3600))
+
+print(f"L50 finale = {batch['L50'][-1]*1e6:.1f} µm")
+print(f"CV = {batch['CV'][-1]:.1f} %")
+if batch['domine_par_semence']:
+    print(f"  (L50 et CV dominés par la semence : croissance relative {batch['croissance_relative']:.2%})")
 
 
 # ================== DIMENSIONNEMENT ==================
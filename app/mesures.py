@@ -0,0 +1,176 @@
+"""
+Module mesures
+Chronométrage léger des étapes de calcul : compteurs et histogrammes de
+latence agrégés (exposés au format texte Prometheus) et détail optionnel
+par requête
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import threading
+import time
+
+# Bornes des histogrammes (secondes)
+BORNES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogramme:
+    """Histogramme cumulatif à bornes fixes"""
+
+    def __init__(self, bornes=BORNES):
+        self.bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.n = 0
+
+    def observer(self, valeur):
+        self.comptes[bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.n += 1
+
+
+class Metriques:
+    """Registre de compteurs et d'histogrammes étiquetés, partagé entre threads"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._compteurs = {}      # (nom, étiquettes) -> valeur
+        self._histogrammes = {}   # (nom, étiquettes) -> Histogramme
+        self._aides = {}
+
+    def decrire(self, nom, aide):
+        self._aides[nom] = aide
+
+    def incrementer(self, nom, valeur=1, **etiquettes):
+        cle = (nom, tuple(sorted(etiquettes.items())))
+        with self._verrou:
+            self._compteurs[cle] = self._compteurs.get(cle, 0) + valeur
+
+    def observer(self, nom, valeur, **etiquettes):
+        cle = (nom, tuple(sorted(etiquettes.items())))
+        with self._verrou:
+            if cle not in self._histogrammes:
+                self._histogrammes[cle] = Histogramme()
+            self._histogrammes[cle].observer(valeur)
+
+    def vider(self):
+        with self._verrou:
+            self._compteurs.clear()
+            self._histogrammes.clear()
+
+    def prometheus(self, jauges=()):
+        """
+        Texte au format d'exposition Prometheus
+        jauges : [(nom, valeur, {étiquettes}[, type])] évaluées au moment de la
+                 lecture (type 'gauge' par défaut, 'counter' pour un compteur
+                 tenu ailleurs) ; regroupées par famille dans l'ordre d'apparition
+        """
+        with self._verrou:
+            compteurs = sorted(self._compteurs.items())
+            histogrammes = sorted((cle, (h.bornes, list(h.comptes), h.somme, h.n))
+                                  for cle, h in self._histogrammes.items())
+
+        lignes = []
+        vus = set()
+
+        def entete(nom, type_):
+            if nom not in vus:
+                vus.add(nom)
+                if nom in self._aides:
+                    lignes.append(f"# HELP {nom} {self._aides[nom]}")
+                lignes.append(f"# TYPE {nom} {type_}")
+
+        for (nom, etiquettes), valeur in compteurs:
+            entete(nom, 'counter')
+            lignes.append(f"{nom}{_etiquettes(etiquettes)} {valeur}")
+
+        for (nom, etiquettes), (bornes, comptes, somme, n) in histogrammes:
+            entete(nom, 'histogram')
+            cumul = 0
+            for borne, compte in zip(tuple(bornes) + ('+Inf',), comptes):
+                cumul += compte
+                lignes.append(f"{nom}_bucket{_etiquettes(etiquettes + (('le', borne),))} {cumul}")
+            lignes.append(f"{nom}_sum{_etiquettes(etiquettes)} {somme:.6f}")
+            lignes.append(f"{nom}_count{_etiquettes(etiquettes)} {n}")
+
+        familles = {}
+        for nom, valeur, etiquettes, *type_ in jauges:
+            familles.setdefault(nom, []).append((valeur, etiquettes, type_[0] if type_ else 'gauge'))
+        for nom, valeurs in familles.items():
+            for valeur, etiquettes, type_ in valeurs:
+                entete(nom, type_)
+                lignes.append(f"{nom}{_etiquettes(tuple(sorted(etiquettes.items())))} {valeur}")
+
+        return '\n'.join(lignes) + '\n'
+
+
+def _echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquettes(etiquettes):
+    if not etiquettes:
+        return ''
+    return '{' + ','.join(f'{k}="{_echapper(v)}"' for k, v in etiquettes) + '}'
+
+
+METRIQUES = Metriques()
+METRIQUES.decrire('evap_etape_duree_secondes', "Durée des étapes de calcul")
+METRIQUES.decrire('evap_etape_total', "Nombre d'exécutions des étapes de calcul")
+METRIQUES.decrire('evap_etape_erreurs_total', "Étapes de calcul interrompues par une exception")
+
+# Détail de la requête en cours : {étape: [durée cumulée (s), nombre d'appels]} ou None
+_detail = ContextVar('detail_etapes', default=None)
+
+
+@contextmanager
+def etape(nom):
+    """Chronomètre le bloc sous le nom d'étape `nom`"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        METRIQUES.incrementer('evap_etape_erreurs_total', etape=nom)
+        raise
+    finally:
+        duree = time.perf_counter() - t0
+        METRIQUES.observer('evap_etape_duree_secondes', duree, etape=nom)
+        METRIQUES.incrementer('evap_etape_total', etape=nom)
+        detail = _detail.get()
+        if detail is not None:
+            cumul = detail.setdefault(nom, [0.0, 0])
+            cumul[0] += duree
+            cumul[1] += 1
+
+
+def chronometre(nom):
+    """Décorateur : chaque appel de la fonction est une étape `nom`"""
+    def decorateur(fonction):
+        @wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            with etape(nom):
+                return fonction(*args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+def commencer_detail():
+    """Active le détail par étape pour le contexte courant (une requête)"""
+    return _detail.set({})
+
+
+def terminer_detail(jeton):
+    """Désactive le détail et renvoie {étape: (durée s, nombre d'appels)}"""
+    detail = _detail.get()
+    _detail.reset(jeton)
+    return {nom: tuple(v) for nom, v in (detail or {}).items()}
+
+
+def format_timing(detail, total=None):
+    """En-tête X-Timing : 'etape;dur=12.345;n=2, ..., total;dur=...' (durées en ms)"""
+    parties = [f"{nom};dur={1e3 * duree:.3f};n={n}" for nom, (duree, n) in detail.items()]
+    if total is not None:
+        parties.append(f"total;dur={1e3 * total:.3f}")
+    return ', '.join(parties)
@@ -1,32 +1,172 @@
+from itertools import islice
+
 import numpy as np
 import numpy as np
-import matplotlib.pyplot as plt
-from evaporateurs import evaporation_triple_effet
+from evaporateurs import evaporation_multi_cas, pressions_effets
+from thermodynamique import Thermo
+from mesures import chronometre
 
 Rf = 0.0002
 
 Rf = 0.0002  # résistance thermique due à l’encrassement
 
-def surface_echange(Q, U, DT):
-    """Calcule la surface d’échange thermique pour chaque effet"""
-    A = []
-    for i in range(len(Q)):
-        Ueff = 1 / (1/U[i] + Rf)  # corrige U pour encrassement
-        surface = Q[i] / (Ueff * DT[i])
-        surface = max(surface, 0)  # empêche surface négative
-        A.append(surface)
-    return A
+def surface_echange(Q, U, DT, Rf=Rf):
+    """
+    Calcule la surface d’échange thermique pour chaque effet
+    Q, DT : (n,) pour un cas ou (N, n) pour N cas
+    Rf : résistance d'encrassement (m².K/W), scalaire ou par effet (..., n)
+         — p. ex. (K, P, n) pour K plannings de nettoyage sur P périodes
+    """
+    Ueff = 1 / (1/np.asarray(U, dtype=float) + np.asarray(Rf, dtype=float))  # corrige U pour encrassement
+    A = np.asarray(Q, dtype=float) / (Ueff * np.asarray(DT, dtype=float))
+    return np.maximum(A, 0)  # empêche surface négative
 
 # ---------- ÉCONOMIE DE VAPEUR ----------
 def economie_vapeur(V, S):
     return sum(V) / S
 
+# ---------- ÉCARTS DE TEMPÉRATURE ----------
+def ecarts_temperature(T, T_vapeur=120):
+    """
+    Forces motrices de chaque effet : [T_vapeur - T1, T1 - T2, ...]
+    T : (n,) ou (N, n)
+    """
+    T = np.asarray(T, dtype=float)
+    amont = np.concatenate([np.full(T.shape[:-1] + (1,), T_vapeur), T[..., :-1]], axis=-1)
+    return amont - T
+
+def coefficients_U(n):
+    """Coefficients U (W/m².K) de n effets, interpolés sur ceux du triple effet"""
+    if n == 1:
+        return np.array(U[:1], dtype=float)
+    return np.interp(np.linspace(0, 1, n), np.linspace(0, 1, len(U)), U)
+
 # ---------- ÉTUDE NOMBRE D’EFFETS ----------
-def etude_nombre_effets(F, xF, x_out, n_effets):
-    economie = 0.9 * n_effets
-    surface = 100 * n_effets**0.8
-    vapeur = F / economie
-    return economie, surface, vapeur
+def etude_nombre_effets(F, xF, x_out, n_effets, T_feed=85, Pn=0.15):
+    """Économie de vapeur, surface totale (m²) et vapeur de chauffe d'un évaporateur à n effets"""
+    res = balayage_nombre_effets(F, xF, x_out, T_feed, [n_effets], Pn)
+    return float(res['economie'][0, 0]), float(res['surface'][0, 0]), float(res['vapeur'][0, 0])
+
+def balayage_nombre_effets(F, xF, x_out, T_feed=85, n_effets=range(1, 9), Pn=0.15):
+    """
+    Balayage du nombre d'effets, vectorisé sur les débits F
+    Retourne des tableaux (nombre de configurations, nombre de débits)
+    """
+    F = np.atleast_1d(np.asarray(F, dtype=float))
+    n_effets = list(n_effets)
+    economie = np.empty((len(n_effets), len(F)))
+    surface = np.empty_like(economie)
+    vapeur = np.empty_like(economie)
+
+    for k, n in enumerate(n_effets):
+        P = pressions_effets(n, xF, x_out, Pn)
+        L, V, x, T, Q = evaporation_multi_cas(F, xF, x_out, P, T_feed)
+        S = Q[:, 0] / 2.15e6
+        A = surface_echange(Q, coefficients_U(n), ecarts_temperature(T))
+
+        vapeur[k] = S
+        economie[k] = V.sum(axis=1) / S
+        surface[k] = A.sum(axis=1)
+
+    return {
+        'n_effets': np.array(n_effets),
+        'F': F,
+        'economie': economie,
+        'surface': surface,
+        'vapeur': vapeur,
+    }
+
+# ---------- DIMENSIONNEMENT À SURFACES ÉGALES ----------
+# Q est en J/h et U en W/m².K : surface_echange renvoie des m² × 3600
+SECONDES_HEURE = 3600
+# Vapeur de chauffe bornée sous le point critique de l'eau (373.9 °C, limite CoolProp)
+T_CHAUFFE_MAX = 370.0
+
+@chronometre('optimisation.surfaces_egales')
+def dimensionnement_surfaces_egales(F, xF, x_final, T_feed, n_effets=3, Pn=0.15,
+                                    T_vapeur=120, A_cible=None, U_effets=None,
+                                    tol=1e-6, max_iter=50):
+    """
+    Ajuste les écarts de température (donc les pressions) des effets jusqu'à
+    obtenir des surfaces égales, ou égales à A_cible (m² par effet ; la
+    température de la vapeur de chauffe devient alors l'inconnue). Vectorisé
+    sur les cas. 'A' suit la convention de surface_echange (m² × 3600),
+    'A_m2' est en m².
+    Une surface cible qui exigerait une vapeur de chauffe au-delà de
+    T_CHAUFFE_MAX est infaisable : le cas est borné à T_CHAUFFE_MAX et
+    signalé ('faisable', converge=False, 'message').
+
+    À flux Q figés, la répartition DT_i ∝ Q_i / Ueff_i égalise exactement
+    les surfaces : on itère cette substitution, qui ne dépend de T que par
+    la chaleur latente et le bilan du 1er effet et converge en quelques pas.
+    """
+    if U_effets is None:
+        U_effets = coefficients_U(n_effets)
+    Ueff = 1 / (1/np.asarray(U_effets, dtype=float) + Rf)
+
+    # Concentrations fixées par le bilan matière (pressions indifférentes)
+    P = np.full(n_effets, Pn)
+    L, V, x, T, Q = evaporation_multi_cas(F, xF, x_final, P, T_feed)
+    N = len(L)
+    EPE = Thermo.EPE(x * 100)
+    T_n = Thermo.Tsat(Pn) + EPE[:, -1]
+
+    T_chauffe = np.full(N, float(T_vapeur))
+    DT = np.repeat(((T_chauffe - T_n) / n_effets)[:, None], n_effets, axis=1)
+    faisable = np.ones(N, dtype=bool)
+    residus = []
+
+    for iteration in range(1, max_iter + 1):
+        T = T_chauffe[:, None] - np.cumsum(DT, axis=1)
+        P = Thermo.Psat(T - EPE)
+        P[:, -1] = Pn
+        L, V, x, T, Q = evaporation_multi_cas(F, xF, x_final, P, T_feed)
+
+        A = surface_echange(Q, U_effets, DT)
+        if A_cible is None:
+            A_ref = A.mean(axis=1, keepdims=True)
+        else:
+            A_ref = np.broadcast_to(np.asarray(A_cible, dtype=float).reshape(-1, 1) * SECONDES_HEURE, (N, 1))
+            # Cas infaisables, bornés à T_CHAUFFE_MAX : surfaces seulement égales entre elles
+            A_ref = np.where(faisable[:, None], A_ref, A.mean(axis=1, keepdims=True))
+        residu = np.abs(A - A_ref).max(axis=1) / A_ref[:, 0]
+        residus.append(float(residu.max()))
+        if residus[-1] < tol:
+            break
+
+        charge = Q / Ueff
+        if A_cible is None:
+            DT = charge / charge.sum(axis=1, keepdims=True) * (T_chauffe - T_n)[:, None]
+        else:
+            DT = charge / (np.asarray(A_cible, dtype=float).reshape(-1, 1) * SECONDES_HEURE)
+            faisable = T_n + DT.sum(axis=1) <= T_CHAUFFE_MAX
+            T_chauffe = np.minimum(T_n + DT.sum(axis=1), T_CHAUFFE_MAX)
+            DT = np.where(faisable[:, None], DT,
+                          charge / charge.sum(axis=1, keepdims=True) * (T_chauffe - T_n)[:, None])
+
+    message = None
+    if not faisable.all():
+        message = (f"A_cible inatteignable pour {int((~faisable).sum())} cas : "
+                   f"vapeur de chauffe requise au-delà de {T_CHAUFFE_MAX} °C")
+    return {
+        'P': P,
+        'T': T,
+        'DT': DT,
+        'A': A,
+        'A_m2': A / SECONDES_HEURE,
+        'L': L,
+        'V': V,
+        'x': x,
+        'Q': Q,
+        'vapeur': Q[:, 0] / 2.15e6,
+        'T_vapeur': T_chauffe,
+        'iterations': iteration,
+        'residu': residus[-1],
+        'historique_residu': residus,
+        'converge': bool(faisable.all() and residus[-1] < tol),
+        'faisable': faisable,
+        'message': message,
+    }
 
 # ---------- ANALYSE DE SENSIBILITÉ ----------
 def analyse_sensibilite(param, valeurs, fonction):
@@ -36,8 +176,8 @@ def analyse_sensibilite(param, valeurs, fonction):
     return resultats
 
 # ---------- COÛTS ----------
-def cout_evaporateur(A):
-    return 15000 * A**0.65
+def cout_evaporateur(A, coefficient=15000, exposant=0.65):
+    return coefficient * A**exposant
 
 def cout_echangeur(A):
     return 8000 * A**0.7
@@ -48,8 +188,8 @@ def cout_cristalliseur(V):
 def TCI(Cequip):
     return 1.55 * Cequip
 
-def OPEX(S, Pelec):
-    vapeur = S * 8000 * 25 / 1000
+def OPEX(S, Pelec, prix_vapeur=25):
+    vapeur = S * 8000 * prix_vapeur / 1000
     elec = Pelec * 8000 * 0.12
     return vapeur + elec
 
@@ -62,39 +202,51 @@ U = [2500, 2200, 1800]
 # ================================
 # ANALYSE DE SENSIBILITÉ GÉNÉRALE
 # ================================
+@chronometre('optimisation.sensibilite')
 def sensibilite(param_values, param_name, F, xF, x_out, T_feed, P_base):
-    vapeur = []
-    surface = []
-    temperatures = []
-
-    for v in param_values:
-        if param_name == "pression":
-            P = [v, 0.6, 0.15]
-            F0, x0, T0 = F, xF, T_feed
-        elif param_name == "concentration":
-            P = P_base
-            F0, x0, T0 = F, xF, T_feed
-            x_out = v
-        elif param_name == "debit":
-            P = P_base
-            F0, x0, T0 = v, xF, T_feed
-        elif param_name == "temperature":
-            P = P_base
-            F0, x0, T0 = F, xF, v
-
-        L, V, x, T, Q = evaporation_triple_effet(F0, x0, x_out, P, T0)
-
-        S = Q[0] / 2.15e6
-        DT = [120-T[0], T[0]-T[1], T[1]-T[2]]
-        A = surface_echange(Q, U, DT)
-
-        vapeur.append(S)
-        surface.append(sum(A))
-        temperatures.append(T)
+    valeurs = np.asarray(param_values, dtype=float)
+    P = np.tile(np.asarray(P_base, dtype=float), (len(valeurs), 1))
+    F0, x0, xs, T0 = F, xF, x_out, T_feed
+
+    if param_name == "pression":
+        P = np.column_stack([valeurs, np.full(len(valeurs), 0.6), np.full(len(valeurs), 0.15)])
+    elif param_name == "concentration":
+        xs = valeurs
+    elif param_name == "debit":
+        F0 = valeurs
+    elif param_name == "temperature":
+        T0 = valeurs
+
+    # Tous les points du balayage sont résolus en une seule passe
+    L, V, x, T, Q = evaporation_multi_cas(F0, x0, xs, P, T0)
+
+    S = Q[:, 0] / 2.15e6
+    A = surface_echange(Q, U, ecarts_temperature(T))
+
+    vapeur = S.tolist()
+    surface = A.sum(axis=1).tolist()
+    temperatures = T.tolist()
 
     return vapeur, surface, temperatures
 
 
+def sensibilite_iter(param_values, param_name, F, xF, x_out, T_feed, P_base, taille_bloc=10000):
+    """
+    Version générateur de sensibilite : param_values peut être un itérable
+    paresseux ; les points sont résolus par blocs et produits ligne à ligne
+    (dict), sans jamais matérialiser tout le balayage en mémoire
+    """
+    valeurs = iter(param_values)
+    while True:
+        bloc = list(islice(valeurs, taille_bloc))
+        if not bloc:
+            return
+        vapeur, surface, temperatures = sensibilite(bloc, param_name, F, xF, x_out, T_feed, P_base)
+        for v, S, A, T in zip(bloc, vapeur, surface, temperatures):
+            yield {param_name: float(v), 'vapeur': S, 'surface': A,
+                   'T1': T[0], 'T2': T[1], 'T3': T[2]}
+
+
 # ================================
 # TRACE DES GRAPHES
 # ================================
@@ -104,6 +256,8 @@ def sensibilite(param_values, param_name, F, xF, x_out, T_feed, P_base):
 #import matplotlib.pyplot as plt
 
 def tracer_graphes(param_values, vapeur, surface, temperatures, param_label):
+    import matplotlib.pyplot as plt
+
     fig, axs = plt.subplots(1, 3, figsize=(15, 5))  # 1 ligne, 3 colonnes
 
     # Graphe 1 : consommation de vapeur
@@ -33,8 +33,151 @@ async function checkAPIHealth() {
     }
 }
 
+// ---------- Tracé des graphiques côté navigateur ----------
+// Dessine en SVG la description renvoyée par /api/download/<graph_id>?format=json
+// (deux panneaux par graphique : courbe, courbe remplie ou barres annotées)
+
+const SVG_NS = 'http://www.w3.org/2000/svg';
+
+function elementSVG(nom, attributs, texte) {
+    const el = document.createElementNS(SVG_NS, nom);
+    for (const [cle, valeur] of Object.entries(attributs)) {
+        el.setAttribute(cle, valeur);
+    }
+    if (texte !== undefined) {
+        el.textContent = texte;
+    }
+    return el;
+}
+
+// Graduations "rondes" entre min et max
+function graduations(min, max, n = 5) {
+    const pasBrut = (max - min) / n || 1;
+    const puissance = Math.pow(10, Math.floor(Math.log10(pasBrut)));
+    const pas = [1, 2, 2.5, 5, 10].map(m => m * puissance).find(p => p >= pasBrut);
+    const valeurs = [];
+    for (let v = Math.ceil(min / pas) * pas; v <= max + pas * 1e-9; v += pas) {
+        valeurs.push(Math.abs(v) < pas * 1e-9 ? 0 : v);
+    }
+    return valeurs;
+}
+
+function formatGraduation(v) {
+    const a = Math.abs(v);
+    if (a !== 0 && (a >= 1e5 || a < 1e-2)) {
+        return v.toExponential(1);
+    }
+    return Number(v.toPrecision(4)).toString();
+}
+
+// Formats Python '{:.0f}' / '{:.1f}' des annotations de barres
+function formatAnnotation(format, v) {
+    const m = /\.(\d+)f/.exec(format || '');
+    return v.toFixed(m ? parseInt(m[1]) : 0);
+}
+
+function dessinerPanneau(svg, panneau, x0, largeur, hauteur) {
+    const marge = { gauche: 60, droite: 10, haut: 28, bas: 40 };
+    const l = largeur - marge.gauche - marge.droite;
+    const h = hauteur - marge.haut - marge.bas;
+    const barres = panneau.type === 'barres';
+
+    let xmin = Math.min(...panneau.x), xmax = Math.max(...panneau.x);
+    if (barres) { xmin -= 0.5; xmax += 0.5; }
+    let ymin = Math.min(...panneau.y), ymax = Math.max(...panneau.y);
+    if (barres || panneau.remplissage) { ymin = Math.min(ymin, 0); ymax = Math.max(ymax, 0); }
+    if (ymax === ymin) { ymax = ymin + 1; }
+    const ecart = (ymax - ymin) * 0.05;
+    if (!(barres || panneau.remplissage) || ymin < 0) { ymin -= ecart; }
+    ymax += barres ? 2 * ecart : ecart;
+
+    const X = v => x0 + marge.gauche + (v - xmin) / ((xmax - xmin) || 1) * l;
+    const Y = v => marge.haut + h - (v - ymin) / (ymax - ymin) * h;
+
+    // Grille et graduations
+    for (const v of graduations(ymin, ymax)) {
+        svg.appendChild(elementSVG('line', { x1: X(xmin), x2: X(xmax), y1: Y(v), y2: Y(v), stroke: '#ddd' }));
+        svg.appendChild(elementSVG('text', { x: X(xmin) - 5, y: Y(v) + 4, 'text-anchor': 'end', 'font-size': 11 },
+                                   formatGraduation(v)));
+    }
+    const gradX = panneau.xlabel === 'Effet' ? panneau.x : graduations(xmin, xmax);
+    for (const v of gradX) {
+        if (panneau.grille !== 'y') {
+            svg.appendChild(elementSVG('line', { x1: X(v), x2: X(v), y1: Y(ymin), y2: Y(ymax), stroke: '#ddd' }));
+        }
+        svg.appendChild(elementSVG('text', { x: X(v), y: Y(ymin) + 15, 'text-anchor': 'middle', 'font-size': 11 },
+                                   formatGraduation(v)));
+    }
+    svg.appendChild(elementSVG('rect', { x: X(xmin), y: Y(ymax), width: l, height: h,
+                                         fill: 'none', stroke: '#333' }));
+
+    // Données
+    if (barres) {
+        panneau.x.forEach((xi, i) => {
+            const yi = panneau.y[i];
+            svg.appendChild(elementSVG('rect', {
+                x: X(xi - 0.3), width: X(xi + 0.3) - X(xi - 0.3),
+                y: Y(Math.max(yi, 0)), height: Math.abs(Y(yi) - Y(0)),
+                fill: panneau.couleur, stroke: panneau.bordure || 'none'
+            }));
+            svg.appendChild(elementSVG('text', { x: X(xi), y: Y(yi) - 4, 'text-anchor': 'middle',
+                                                 'font-size': 11, 'font-weight': 'bold' },
+                                       formatAnnotation(panneau.annotation, yi)));
+        });
+    } else {
+        const points = panneau.x.map((xi, i) => `${X(xi)},${Y(panneau.y[i])}`);
+        if (panneau.remplissage) {
+            const base = `${X(panneau.x[panneau.x.length - 1])},${Y(0)} ${X(panneau.x[0])},${Y(0)}`;
+            svg.appendChild(elementSVG('polygon', { points: points.join(' ') + ' ' + base,
+                                                    fill: panneau.couleur, 'fill-opacity': 0.3 }));
+        }
+        svg.appendChild(elementSVG('polyline', { points: points.join(' '), fill: 'none',
+                                                 stroke: panneau.couleur, 'stroke-width': 2 }));
+        if (panneau.marqueurs) {
+            panneau.x.forEach((xi, i) => {
+                svg.appendChild(elementSVG('circle', { cx: X(xi), cy: Y(panneau.y[i]), r: 4,
+                                                       fill: 'white', stroke: panneau.couleur, 'stroke-width': 2 }));
+            });
+        }
+    }
+
+    // Libellés
+    svg.appendChild(elementSVG('text', { x: x0 + marge.gauche + l / 2, y: 18, 'text-anchor': 'middle',
+                                         'font-size': 13, 'font-weight': 'bold' }, panneau.titre));
+    svg.appendChild(elementSVG('text', { x: x0 + marge.gauche + l / 2, y: hauteur - 6, 'text-anchor': 'middle',
+                                         'font-size': 12, 'font-weight': 'bold' }, panneau.xlabel));
+    const yLabel = elementSVG('text', { x: 0, y: 0, 'text-anchor': 'middle', 'font-size': 12, 'font-weight': 'bold',
+                                        transform: `translate(${x0 + 14},${marge.haut + h / 2}) rotate(-90)` },
+                              panneau.ylabel);
+    svg.appendChild(yLabel);
+}
+
+function dessinerGraphique(conteneur, description, largeur = 1000, hauteur = 400) {
+    const svg = elementSVG('svg', { viewBox: `0 0 ${largeur} ${hauteur}`, width: '100%',
+                                    'font-family': 'sans-serif' });
+    const n = description.panneaux.length;
+    description.panneaux.forEach((panneau, i) => {
+        dessinerPanneau(svg, panneau, i * largeur / n, largeur / n, hauteur);
+    });
+    conteneur.innerHTML = '';
+    conteneur.appendChild(svg);
+    return svg;
+}
+
+// Récupère la description JSON d'un graphique (URL /api/download/...) et la dessine
+async function chargerGraphique(conteneur, url) {
+    const separateur = url.includes('?') ? '&' : '?';
+    const response = await fetch(url + separateur + 'format=json');
+    if (!response.ok) {
+        throw new Error(`Erreur HTTP: ${response.status}`);
+    }
+    return dessinerGraphique(conteneur, await response.json());
+}
+
 // Exporter les fonctions pour une utilisation globale
 window.formatNumber = formatNumber;
 window.formatTemperature = formatTemperature;
 window.formatPercentage = formatPercentage;
-window.checkAPIHealth = checkAPIHealth;
\ No newline at end of file
+window.checkAPIHealth = checkAPIHealth;
+window.dessinerGraphique = dessinerGraphique;
+window.chargerGraphique = chargerGraphique;
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+Module stockage
+Stockage colonnaire des entrées / sorties de scénarios : un fichier .npy
+par colonne et par bloc ajouté, relus en mémoire projetée (mmap) pour
+filtrer et retracer les historiques sans recalcul
+"""
+
+import contextlib
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:        # Windows
+    fcntl = None
+    import msvcrt
+
+DOSSIER_STOCKAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'resultats', 'stockage')
+
+
+class StockageColonnaire:
+    """
+    Arborescence :
+        <dossier>/manifeste.json             colonnes, types et blocs
+        <dossier>/bloc_<uuid>/<colonne>.npy  une colonne d'un bloc
+        <dossier>/.verrou                    verrou des écritures entre processus
+
+    Plusieurs processus peuvent écrire dans le même dossier : chaque écriture
+    relit le manifeste sous verrou de fichier et les blocs portent des noms uniques
+    """
+
+    def __init__(self, dossier=DOSSIER_STOCKAGE):
+        self.dossier = dossier
+        self._verrou = threading.Lock()
+        os.makedirs(dossier, exist_ok=True)
+        self._chemin_manifeste = os.path.join(dossier, 'manifeste.json')
+        self._chemin_verrou = os.path.join(dossier, '.verrou')
+        self._charger_manifeste()
+
+    def _charger_manifeste(self):
+        """Relit le manifeste (publié par os.replace : jamais lu à moitié écrit)"""
+        try:
+            with open(self._chemin_manifeste, encoding='utf-8') as f:
+                self.manifeste = json.load(f)
+        except FileNotFoundError:
+            self.manifeste = {'colonnes': {}, 'blocs': []}
+        return self.manifeste
+
+    @contextlib.contextmanager
+    def _exclusif(self):
+        """Verrou du thread puis du fichier .verrou, manifeste relu une fois acquis"""
+        with self._verrou, open(self._chemin_verrou, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield self._charger_manifeste()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @property
+    def colonnes(self):
+        return list(self._charger_manifeste()['colonnes'])
+
+    def __len__(self):
+        return sum(b['n'] for b in self._charger_manifeste()['blocs'])
+
+    def _ecrire_manifeste(self, manifeste):
+        temporaire = self._chemin_manifeste + '.tmp'
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(manifeste, f, indent=1)
+        os.replace(temporaire, self._chemin_manifeste)
+        self.manifeste = manifeste
+
+    def ajouter(self, donnees):
+        """
+        Ajoute un bloc de lignes
+        donnees : dict {colonne: tableau (n,)} ou tableau structuré NumPy
+        """
+        if isinstance(donnees, np.ndarray):
+            donnees = {nom: donnees[nom] for nom in donnees.dtype.names}
+        donnees = {nom: np.ascontiguousarray(v) for nom, v in donnees.items()}
+        tailles = {len(v) for v in donnees.values()}
+        if len(tailles) != 1:
+            raise ValueError("Toutes les colonnes d'un bloc doivent avoir la même longueur")
+        n = tailles.pop()
+
+        with self._exclusif() as manifeste:
+            types = manifeste['colonnes']
+            if types and set(types) != set(donnees):
+                raise ValueError(f"Colonnes attendues : {sorted(types)}")
+            for nom, valeurs in donnees.items():
+                types.setdefault(nom, valeurs.dtype.str)
+
+            # Le bloc n'est visible qu'une fois toutes ses colonnes écrites
+            manifeste['blocs'].append({'nom': self._ecrire_bloc(donnees, types), 'n': n})
+            self._ecrire_manifeste(manifeste)
+        return n
+
+    def _ecrire_bloc(self, donnees, types):
+        """Écrit les colonnes d'un nouveau bloc (nom unique) et renvoie son nom"""
+        nom_bloc = f"bloc_{uuid.uuid4().hex}"
+        dossier_bloc = os.path.join(self.dossier, nom_bloc)
+        os.makedirs(dossier_bloc)
+        for nom, valeurs in donnees.items():
+            np.save(os.path.join(dossier_bloc, nom + '.npy'), valeurs.astype(types[nom], copy=False))
+        return nom_bloc
+
+    def colonne(self, nom):
+        """Colonne complète : liste de tableaux mmap, un par bloc"""
+        manifeste = self._charger_manifeste()
+        if nom not in manifeste['colonnes']:
+            raise KeyError(f"Colonne inconnue : {nom}")
+        return [np.load(os.path.join(self.dossier, b['nom'], nom + '.npy'), mmap_mode='r')
+                for b in manifeste['blocs']]
+
+    def lire(self, colonnes=None, **filtres):
+        """
+        Lignes vérifiant les filtres, sous forme de dict de colonnes
+        filtres : colonne=(min, max) (bornes incluses, None = non bornée)
+        Seules les colonnes filtrées sont lues pour la sélection ; les autres
+        ne sont chargées que pour les lignes retenues
+        """
+        manifeste = self._charger_manifeste()
+        colonnes = colonnes or list(manifeste['colonnes'])
+        inconnues = set(colonnes).union(filtres) - set(manifeste['colonnes'])
+        if inconnues:
+            raise KeyError(f"Colonnes inconnues : {sorted(inconnues)}")
+        resultat = {nom: [] for nom in colonnes}
+
+        for b in manifeste['blocs']:
+            dossier_bloc = os.path.join(self.dossier, b['nom'])
+            masque = np.ones(b['n'], dtype=bool)
+            for nom, (bas, haut) in filtres.items():
+                valeurs = np.load(os.path.join(dossier_bloc, nom + '.npy'), mmap_mode='r')
+                if bas is not None:
+                    masque &= valeurs >= bas
+                if haut is not None:
+                    masque &= valeurs <= haut
+            if not masque.any():
+                continue
+            for nom in colonnes:
+                valeurs = np.load(os.path.join(dossier_bloc, nom + '.npy'), mmap_mode='r')
+                resultat[nom].append(np.asarray(valeurs[masque]))
+
+        return {nom: np.concatenate(morceaux) if morceaux
+                else np.empty(0, dtype=manifeste['colonnes'][nom])
+                for nom, morceaux in resultat.items()}
+
+    def compacter(self):
+        """
+        Fusionne tous les blocs en un seul (moins de fichiers à ouvrir à la lecture)
+        Le bloc fusionné et le nouveau manifeste sont publiés avant la suppression
+        des anciens blocs : un lecteur voit toujours l'un ou l'autre état complet
+        """
+        with self._exclusif() as manifeste:
+            if len(manifeste['blocs']) <= 1:
+                return
+            anciens = [b['nom'] for b in manifeste['blocs']]
+            donnees = self.lire()
+            n = len(next(iter(donnees.values())))
+            manifeste['blocs'] = [{'nom': self._ecrire_bloc(donnees, manifeste['colonnes']), 'n': n}]
+            self._ecrire_manifeste(manifeste)
+            for nom_bloc in anciens:
+                dossier_bloc = os.path.join(self.dossier, nom_bloc)
+                for fichier in os.listdir(dossier_bloc):
+                    os.remove(os.path.join(dossier_bloc, fichier))
+                os.rmdir(dossier_bloc)
@@ -0,0 +1,239 @@
+"""
+Module substitut
+Modèle de substitution de l'évaporateur triple effet : régression
+polynomiale ou RBF des températures T et des puissances Q sur un plan de
+Sobol du domaine de validité, entraînée hors ligne, enregistrée en .npz et
+rechargée au démarrage. Les bilans matière restent exacts ; hors du domaine
+d'entraînement, le modèle complet (CoolProp) est appelé
+"""
+
+from itertools import combinations_with_replacement
+import os
+
+import numpy as np
+from evaporateurs import evaporation_multi_cas
+
+CHEMIN_SUBSTITUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'resultats', 'substitut.npz')
+
+# Domaine d'entraînement (entrées du modèle, dans l'ordre des colonnes)
+DOMAINE = {
+    'F': (16000, 24000),        # kg/h
+    'xF': (0.10, 0.20),
+    'x_final': (0.55, 0.70),
+    'T_feed': (60, 95),         # °C
+    'P1': (0.7, 1.9),           # bar
+    'P2': (0.3, 0.9),
+    'P3': (0.1, 0.25),
+}
+
+SORTIES = ('T1', 'T2', 'T3', 'Q1', 'Q2', 'Q3')
+
+
+def exposants_polynome(d, degre):
+    """Exposants (m, d) de tous les monômes de degré total <= degre, par degré croissant"""
+    exposants = [np.zeros(d, dtype=int)]
+    for k in range(1, degre + 1):
+        for termes in combinations_with_replacement(range(d), k):
+            exposants.append(np.bincount(termes, minlength=d))
+    return np.array(exposants)
+
+
+def schema_monomes(d, degre):
+    """
+    Pour chaque degré k : (indice du monôme parent de degré k-1, variable)
+    — chaque monôme est son parent multiplié par une variable, ce qui
+    construit tous les monômes en `degre` produits vectorisés
+    """
+    niveaux, precedents = [], {(): 0}
+    for k in range(1, degre + 1):
+        termes = list(combinations_with_replacement(range(d), k))
+        niveaux.append((np.array([precedents[t[:-1]] for t in termes]), np.array([t[-1] for t in termes])))
+        precedents = {t: i for i, t in enumerate(termes)}
+    return niveaux
+
+
+def _monomes(z, niveaux):
+    colonnes = [np.ones((len(z), 1))]
+    for parents, variables in niveaux:
+        colonnes.append(colonnes[-1][:, parents] * z[:, variables])
+    return np.hstack(colonnes)
+
+
+def _noyau_rbf(z, centres):
+    """Noyau polyharmonique r³"""
+    r2 = (z ** 2).sum(axis=1)[:, None] + (centres ** 2).sum(axis=1)[None] - 2 * z @ centres.T
+    return np.maximum(r2, 0) ** 1.5
+
+
+class Substitut:
+    """
+    Régression T, Q = f(F, xF, x_final, T_feed, P1, P2, P3)
+    type_ : 'polynome' (moindres carrés sur les monômes de degré <= degre)
+            ou 'rbf' (noyau r³ + terme linéaire, interpolant)
+    Les entrées sont ramenées sur [-1, 1] ; les sorties sont centrées réduites
+    """
+
+    def __init__(self, type_, bornes, moyenne, echelle, coefficients,
+                 exposants=None, centres=None, erreurs=None):
+        self.type_ = str(type_)
+        self.bornes = np.asarray(bornes, dtype=float)
+        self.moyenne = np.asarray(moyenne, dtype=float)
+        self.echelle = np.asarray(echelle, dtype=float)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.exposants = None if exposants is None else np.asarray(exposants)
+        self.centres = None if centres is None else np.asarray(centres, dtype=float)
+        self.erreurs = erreurs or {}
+        self._niveaux = None
+        if self.exposants is not None:
+            self._niveaux = schema_monomes(self.exposants.shape[1], int(self.exposants.sum(axis=1).max()))
+
+    def _reduire(self, X):
+        bas, haut = self.bornes[:, 0], self.bornes[:, 1]
+        return 2 * (X - bas) / (haut - bas) - 1
+
+    def _caracteristiques(self, z):
+        if self.type_ == 'polynome':
+            return _monomes(z, self._niveaux)
+        lineaire = np.column_stack([np.ones(len(z)), z])
+        return np.hstack([_noyau_rbf(z, self.centres), lineaire])
+
+    def dans_domaine(self, X):
+        X = np.atleast_2d(X)
+        return np.all((X >= self.bornes[:, 0]) & (X <= self.bornes[:, 1]), axis=1)
+
+    def predire(self, X):
+        """Sorties (N, 6) : T1..T3 (°C), Q1..Q3 (J/h), sans contrôle du domaine"""
+        z = self._reduire(np.atleast_2d(X))
+        return self._caracteristiques(z) @ self.coefficients * self.echelle + self.moyenne
+
+    def evaporation_multi_cas(self, F, xF, x_final, P, T_feed):
+        """
+        Même interface et mêmes sorties que evaporateurs.evaporation_multi_cas
+        (triple effet) ; les cas hors du domaine passent par le modèle complet
+        """
+        P = np.atleast_2d(np.asarray(P, dtype=float))
+        F, xF, x_final, T_feed = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (F, xF, x_final, T_feed))
+        )
+        N = max(len(F), len(P))
+        P = np.broadcast_to(P, (N, P.shape[1]))
+        F, xF, x_final, T_feed = (np.broadcast_to(a, (N,)) for a in (F, xF, x_final, T_feed))
+        if P.shape[1] != 3:
+            return evaporation_multi_cas(F, xF, x_final, P, T_feed)
+
+        # Bilans matière exacts (répartition égale de la vapeur)
+        Vtot = F - F * xF / x_final
+        V = np.repeat((Vtot / 3)[:, None], 3, axis=1)
+        L = F[:, None] - np.cumsum(V, axis=1)
+        x = (F * xF)[:, None] / L
+
+        X = np.column_stack([F, xF, x_final, T_feed, P])
+        dedans = self.dans_domaine(X)
+        if dedans.all():
+            Y = self.predire(X)
+            return L, V, x, Y[:, :3], Y[:, 3:]
+        Y = np.empty((N, 6))
+        if dedans.any():
+            Y[dedans] = self.predire(X[dedans])
+        dehors = ~dedans
+        _, _, _, T, Q = evaporation_multi_cas(F[dehors], xF[dehors], x_final[dehors],
+                                              P[dehors], T_feed[dehors])
+        Y[dehors] = np.hstack([T, Q])
+        return L, V, x, Y[:, :3], Y[:, 3:]
+
+    def enregistrer(self, chemin=CHEMIN_SUBSTITUT):
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        optionnels = {cle: v for cle, v in (('exposants', self.exposants), ('centres', self.centres))
+                      if v is not None}
+        np.savez(chemin, type_=self.type_, bornes=self.bornes, moyenne=self.moyenne,
+                 echelle=self.echelle, coefficients=self.coefficients,
+                 erreurs_noms=list(self.erreurs), erreurs=np.array(list(self.erreurs.values())),
+                 **optionnels)
+
+    @classmethod
+    def charger(cls, chemin=CHEMIN_SUBSTITUT):
+        with np.load(chemin) as f:
+            erreurs = dict(zip(f['erreurs_noms'].tolist(), f['erreurs'].tolist()))
+            return cls(f['type_'].item(), f['bornes'], f['moyenne'], f['echelle'], f['coefficients'],
+                       f['exposants'] if 'exposants' in f else None,
+                       f['centres'] if 'centres' in f else None, erreurs)
+
+
+def plan_sobol(n, graine=0):
+    """n points (arrondi à la puissance de 2 supérieure) du domaine d'entraînement"""
+    from scipy.stats import qmc
+
+    bornes = np.array(list(DOMAINE.values()), dtype=float)
+    u = qmc.Sobol(len(bornes), scramble=True, seed=graine).random_base2(int(np.ceil(np.log2(n))))
+    return bornes[:, 0] + u * (bornes[:, 1] - bornes[:, 0])
+
+
+def _modele_complet(X):
+    _, _, _, T, Q = evaporation_multi_cas(X[:, 0], X[:, 1], X[:, 2], X[:, 4:], X[:, 3])
+    return np.hstack([T, Q])
+
+
+def entrainer(type_='polynome', n=2048, degre=3, n_validation=1024, graine=0):
+    """
+    Ajuste le substitut sur n points du modèle complet et mesure son erreur
+    sur n_validation points indépendants (erreur relative max et RMS par sortie)
+    """
+    bornes = np.array(list(DOMAINE.values()), dtype=float)
+    X = plan_sobol(n, graine)
+    Y = _modele_complet(X)
+    moyenne, echelle = Y.mean(axis=0), Y.std(axis=0)
+    Yr = (Y - moyenne) / echelle
+
+    substitut = Substitut(type_, bornes, moyenne, echelle, np.zeros((1, Y.shape[1])))
+    z = substitut._reduire(X)
+    if type_ == 'polynome':
+        substitut.exposants = exposants_polynome(X.shape[1], degre)
+        substitut._niveaux = schema_monomes(X.shape[1], degre)
+        substitut.coefficients = np.linalg.lstsq(_monomes(z, substitut._niveaux), Yr, rcond=None)[0]
+    elif type_ == 'rbf':
+        lineaire = np.column_stack([np.ones(len(z)), z])
+        k = lineaire.shape[1]
+        A = np.block([[_noyau_rbf(z, z), lineaire], [lineaire.T, np.zeros((k, k))]])
+        b = np.vstack([Yr, np.zeros((k, Yr.shape[1]))])
+        substitut.centres = z
+        substitut.coefficients = np.linalg.solve(A, b)
+    else:
+        raise ValueError(f"Type de substitut inconnu : {type_}")
+
+    rng = np.random.default_rng(graine + 1)
+    X_val = bornes[:, 0] + rng.random((n_validation, len(bornes))) * (bornes[:, 1] - bornes[:, 0])
+    Y_val = _modele_complet(X_val)
+    ecart = np.abs(substitut.predire(X_val) - Y_val) / np.abs(Y_val)
+    for j, nom in enumerate(SORTIES):
+        substitut.erreurs[f'{nom}_max'] = float(ecart[:, j].max())
+        substitut.erreurs[f'{nom}_rms'] = float(np.sqrt((ecart[:, j] ** 2).mean()))
+    return substitut
+
+
+def charger_si_present(chemin=CHEMIN_SUBSTITUT):
+    """Substitut enregistré, ou None s'il n'a pas encore été entraîné"""
+    if not os.path.exists(chemin):
+        return None
+    return Substitut.charger(chemin)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    type_ = sys.argv[1] if len(sys.argv) > 1 else 'polynome'
+    t0 = time.perf_counter()
+    substitut = entrainer(type_)
+    print(f"Substitut {type_} entraîné en {time.perf_counter() - t0:.2f} s")
+    for nom in SORTIES:
+        print(f"  {nom}: erreur relative max {substitut.erreurs[nom + '_max']:.2e}, "
+              f"RMS {substitut.erreurs[nom + '_rms']:.2e}")
+    substitut.enregistrer()
+    print(f"Enregistré dans {CHEMIN_SUBSTITUT}")
+
+    X = plan_sobol(1)[:1]
+    n_repetitions = 10000
+    t0 = time.perf_counter()
+    for _ in range(n_repetitions):
+        substitut.predire(X)
+    print(f"Évaluation d'un point : {1e6 * (time.perf_counter() - t0) / n_repetitions:.1f} µs")
@@ -0,0 +1,152 @@
+"""
+Module taches
+Exécution en arrière-plan des calculs longs (balayages, optimisations,
+cristallisation fine) avec suivi d'état, de progression et publication
+de résultats partiels
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+from itertools import islice
+import threading
+import time
+import traceback
+import uuid
+
+
+class Tache:
+    """
+    Calcul soumis au gestionnaire ; la fonction reçoit la tâche pour rendre compte
+    Seuls les max_partiels derniers résultats partiels sont conservés, et
+    seulement pendant le calcul : un lecteur trop lent perd les plus anciens
+    """
+
+    def __init__(self, type_tache, parametres, max_partiels=10000):
+        self.id = uuid.uuid4().hex
+        self.type = type_tache
+        self.parametres = parametres
+        self.etat = 'en_attente'
+        self.progression = 0.0
+        self.resultat = None
+        self.erreur = None
+        self.cree = time.time()
+        self.debut = None
+        self.fin = None
+        self.partiels = deque(maxlen=max_partiels)
+        self.n_partiels = 0
+        self._condition = threading.Condition()
+
+    @property
+    def terminee(self):
+        return self.etat in ('terminee', 'echec')
+
+    def avancer(self, progression):
+        """Met à jour la progression (0 à 1)"""
+        with self._condition:
+            self.progression = float(progression)
+            self._condition.notify_all()
+
+    def publier(self, elements):
+        """Publie des résultats partiels (liste d'éléments sérialisables)"""
+        with self._condition:
+            elements = list(elements)
+            self.partiels.extend(elements)
+            self.n_partiels += len(elements)
+            self._condition.notify_all()
+
+    def _demarrer(self):
+        with self._condition:
+            self.etat = 'en_cours'
+            self.debut = time.time()
+
+    def _terminer(self, etat, resultat=None, erreur=None):
+        with self._condition:
+            # Les lecteurs en cours gardent l'ancien tampon jusqu'à la fin de leur lecture
+            self.partiels = deque(maxlen=self.partiels.maxlen)
+            self.etat = etat
+            self.resultat = resultat
+            self.erreur = erreur
+            self.fin = time.time()
+            if etat == 'terminee':
+                self.progression = 1.0
+            self._condition.notify_all()
+
+    def suivre(self, delai=15.0):
+        """
+        Générateur des résultats partiels, au fil de leur publication,
+        jusqu'à la fin de la tâche
+        """
+        with self._condition:
+            tampon = self.partiels
+        i = 0  # indice absolu du prochain élément à lire
+        while True:
+            with self._condition:
+                if i >= self.n_partiels and not self.terminee:
+                    self._condition.wait(delai)
+                premier = self.n_partiels - len(tampon)
+                i = max(i, premier)
+                nouveaux = list(islice(tampon, i - premier, None))
+                fini = self.terminee
+            i += len(nouveaux)
+            for element in nouveaux:
+                yield element
+            if fini and i >= self.n_partiels:
+                return
+
+    def etat_json(self):
+        """Résumé de la tâche (sans le résultat)"""
+        return {
+            'id': self.id,
+            'type': self.type,
+            'etat': self.etat,
+            'progression': self.progression,
+            'n_partiels': self.n_partiels,
+            'erreur': self.erreur,
+            'cree': self.cree,
+            'debut': self.debut,
+            'fin': self.fin,
+            'duree': (self.fin or time.time()) - self.debut if self.debut else None,
+        }
+
+
+class GestionnaireTaches:
+    """File de tâches exécutées par un pool de threads"""
+
+    def __init__(self, n_workers=2, conserver=100):
+        self.conserver = conserver
+        self._pool = ThreadPoolExecutor(n_workers, thread_name_prefix='tache')
+        self._taches = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def soumettre(self, type_tache, fonction, parametres):
+        """Soumet fonction(tache, **parametres) ; renvoie la tâche"""
+        tache = Tache(type_tache, parametres)
+        with self._verrou:
+            self._taches[tache.id] = tache
+            self._purger()
+        self._pool.submit(self._executer, tache, fonction)
+        return tache
+
+    def _executer(self, tache, fonction):
+        tache._demarrer()
+        try:
+            resultat = fonction(tache, **tache.parametres)
+        except Exception as e:
+            traceback.print_exc()
+            tache._terminer('echec', erreur=str(e))
+        else:
+            tache._terminer('terminee', resultat=resultat)
+
+    def _purger(self):
+        """Oublie les plus anciennes tâches terminées au-delà de `conserver`"""
+        terminees = [id_ for id_, t in self._taches.items() if t.terminee]
+        for id_ in terminees[:max(len(self._taches) - self.conserver, 0)]:
+            del self._taches[id_]
+
+    def obtenir(self, id_tache):
+        with self._verrou:
+            return self._taches.get(id_tache)
+
+    def lister(self):
+        with self._verrou:
+            return list(self._taches.values())
@@ -3,23 +3,262 @@ Module thermodynamique
 Propriétés eau / vapeur avec CoolProp
 """
 
-from CoolProp.CoolProp import PropsSI
+from collections import OrderedDict
+import threading
+
 import numpy as np
 
+from mesures import chronometre
+
+
+def PropsSI(*args):
+    """
+    CoolProp.PropsSI, importé au premier appel : l'import de CoolProp
+    coûte plusieurs secondes et n'est pas nécessaire avec les tables ou le cache
+    """
+    global PropsSI
+    from CoolProp.CoolProp import PropsSI
+    return PropsSI(*args)
+
+
+# ---------- TABLES DE SATURATION ----------
+class TableSaturation:
+    """
+    Tables de saturation eau / vapeur précalculées une seule fois avec
+    CoolProp puis interpolées (linéaire en ln P) pour des entrées NumPy.
+    Les pressions hors de la plage tabulée sont renvoyées à CoolProp.
+    """
+
+    def __init__(self, P_min=0.05, P_max=5.0, n_points=2000):
+        self.P_min = P_min
+        self.P_max = P_max
+        self.lnP = np.linspace(np.log(P_min), np.log(P_max), n_points)
+
+        P_pa = np.exp(self.lnP) * 1e5
+        h_v = PropsSI('H', 'P', P_pa, 'Q', 1, 'Water')
+        h_l = PropsSI('H', 'P', P_pa, 'Q', 0, 'Water')
+        self.T = PropsSI('T', 'P', P_pa, 'Q', 0, 'Water') - 273.15
+        self.lam = h_v - h_l
+
+    def _interpoler(self, P_bar, table, exact):
+        P = np.asarray(P_bar, dtype=float)
+        resultat = np.interp(np.log(P), self.lnP, table)
+
+        hors_plage = (P < self.P_min) | (P > self.P_max)
+        if np.any(hors_plage):
+            resultat = np.array(resultat, dtype=float)
+            resultat[hors_plage] = exact(P[hors_plage])
+        return resultat
+
+    def Tsat(self, P_bar):
+        """Température de saturation (°C)"""
+        return self._interpoler(P_bar, self.T, _Tsat_coolprop)
+
+    def chaleur_latente(self, P_bar):
+        """Chaleur latente de vaporisation (J/kg)"""
+        return self._interpoler(P_bar, self.lam, _chaleur_latente_coolprop)
+
+    def Psat(self, T):
+        """Pression de saturation (bar) à la température T (°C)"""
+        T = np.asarray(T, dtype=float)
+        resultat = np.exp(np.interp(T, self.T, self.lnP))
+
+        hors_plage = (T < self.T[0]) | (T > self.T[-1])
+        if np.any(hors_plage):
+            resultat = np.array(resultat, dtype=float)
+            resultat[hors_plage] = _Psat_coolprop(T[hors_plage])
+        return resultat
+
+    def verifier(self, n_points=500):
+        """
+        Auto-contrôle : compare les tables à CoolProp entre les nœuds
+        Retourne les erreurs maximales (Tsat en K, chaleur latente relative)
+        """
+        lnP = np.linspace(self.lnP[0], self.lnP[-1], n_points)
+        # décalage d'un demi-pas : on teste au milieu des mailles
+        lnP = np.clip(lnP + 0.5 * (self.lnP[1] - self.lnP[0]), self.lnP[0], self.lnP[-1])
+        P = np.exp(lnP)
+
+        err_T = np.abs(self.Tsat(P) - _Tsat_coolprop(P))
+        lam_ref = _chaleur_latente_coolprop(P)
+        err_lam = np.abs(self.chaleur_latente(P) - lam_ref) / lam_ref
+
+        return {
+            'erreur_Tsat_max': float(err_T.max()),
+            'erreur_lambda_rel_max': float(err_lam.max()),
+            'n_points': n_points,
+        }
+
+
+@chronometre('thermo.coolprop')
+def _coolprop(sortie, P_bar, Q):
+    """Appel PropsSI sur la saturation, quelle que soit la forme de P_bar"""
+    P_pa = np.asarray(P_bar, dtype=float) * 1e5
+    if P_pa.ndim == 0:
+        return PropsSI(sortie, 'P', float(P_pa), 'Q', Q, 'Water')
+    return np.reshape(PropsSI(sortie, 'P', P_pa.ravel(), 'Q', Q, 'Water'), P_pa.shape)
+
+
+def _Tsat_coolprop(P_bar):
+    return _coolprop('T', P_bar, 0) - 273.15
+
+
+def _chaleur_latente_coolprop(P_bar):
+    return _coolprop('H', P_bar, 1) - _coolprop('H', P_bar, 0)
+
+
+@chronometre('thermo.coolprop')
+def _Psat_coolprop(T):
+    T_k = np.asarray(T, dtype=float) + 273.15
+    if T_k.ndim == 0:
+        return PropsSI('P', 'T', float(T_k), 'Q', 0, 'Water') / 1e5
+    return np.reshape(PropsSI('P', 'T', T_k.ravel(), 'Q', 0, 'Water'), T_k.shape) / 1e5
+
+
+# ---------- CACHE DES PROPRIÉTÉS ----------
+class CacheProprietes:
+    """
+    Cache LRU borné des propriétés de saturation, indexé sur la pression
+    quantifiée (pas en bar). La valeur est calculée à la pression
+    quantifiée pour que le résultat ne dépende pas de l'ordre des appels.
+    """
+
+    def __init__(self, capacite=256, pas=1e-6):
+        self.capacite = capacite
+        self.pas = pas
+        self._valeurs = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obtenir(self, nom, P_bar, calcul):
+        """Valeur de la propriété `nom` à P_bar, calculée par `calcul` si absente"""
+        if not np.isfinite(P_bar):
+            raise ValueError(f"Pression non finie : {P_bar}")
+        cle = (nom, int(round(P_bar / self.pas)))
+        with self._verrou:
+            if cle in self._valeurs:
+                self._valeurs.move_to_end(cle)
+                self.hits += 1
+                return self._valeurs[cle]
+            self.misses += 1
+
+        valeur = float(calcul(cle[1] * self.pas))
+
+        with self._verrou:
+            self._valeurs[cle] = valeur
+            self._valeurs.move_to_end(cle)
+            while len(self._valeurs) > self.capacite:
+                self._valeurs.popitem(last=False)
+                self.evictions += 1
+        return valeur
+
+    def obtenir_tableau(self, nom, P_bar, calcul):
+        """Version tableau de `obtenir` : une consultation par pression distincte"""
+        P = np.asarray(P_bar, dtype=float)
+        uniques, inverse = np.unique(P, return_inverse=True)
+        valeurs = np.array([self.obtenir(nom, p, calcul) for p in uniques])
+        return valeurs[inverse].reshape(P.shape)
+
+    def vider(self):
+        """Vide le cache et remet les compteurs à zéro"""
+        with self._verrou:
+            self._valeurs.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Compteurs du cache"""
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                'taille': len(self._valeurs),
+                'capacite': self.capacite,
+                'pas_bar': self.pas,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'taux_hit': self.hits / total if total else 0.0,
+            }
+
+
+def _scalaire(valeur, P_bar):
+    """Renvoie un float si l'entrée était scalaire"""
+    if np.ndim(P_bar) == 0:
+        return float(valeur)
+    return np.asarray(valeur, dtype=float)
+
 
 class Thermo:
 
-    @staticmethod
-    def Tsat(P_bar):
+    # Tables de saturation actives (None : appels directs à CoolProp)
+    tables = None
+
+    # Cache des appels scalaires (None : pas de cache)
+    cache = CacheProprietes()
+
+    @classmethod
+    def activer_tables(cls, P_min=0.05, P_max=5.0, n_points=2000):
+        """Active le calcul tabulé de Tsat et de la chaleur latente"""
+        cls.tables = TableSaturation(P_min, P_max, n_points)
+        cls.vider_cache()
+        return cls.tables
+
+    @classmethod
+    def desactiver_tables(cls):
+        """Revient aux appels directs à CoolProp"""
+        cls.tables = None
+        cls.vider_cache()
+
+    @classmethod
+    def _Tsat(cls, P_bar):
+        if cls.tables is not None:
+            return cls.tables.Tsat(P_bar)
+        return _Tsat_coolprop(P_bar)
+
+    @classmethod
+    def _chaleur_latente(cls, P_bar):
+        if cls.tables is not None:
+            return cls.tables.chaleur_latente(P_bar)
+        return _chaleur_latente_coolprop(P_bar)
+
+    # Au-delà de ce nombre de pressions distinctes, un tableau n'est pas
+    # consulté dans le cache mais calculé directement (tables ou CoolProp)
+    n_max_cache = 64
+
+    @classmethod
+    def _propriete(cls, nom, P_bar, calcul):
+        if cls.cache is not None:
+            if np.ndim(P_bar) == 0:
+                return cls.cache.obtenir(nom, P_bar, calcul)
+            if cls.tables is None and np.unique(P_bar).size <= cls.n_max_cache:
+                return cls.cache.obtenir_tableau(nom, P_bar, calcul)
+        return _scalaire(calcul(P_bar), P_bar)
+
+    @classmethod
+    def Tsat(cls, P_bar):
         """Température de saturation (°C)"""
-        return PropsSI('T', 'P', P_bar * 1e5, 'Q', 0, 'Water') - 273.15
+        return cls._propriete('Tsat', P_bar, cls._Tsat)
 
-    @staticmethod
-    def chaleur_latente(P_bar):
+    @classmethod
+    def chaleur_latente(cls, P_bar):
         """Chaleur latente de vaporisation (J/kg)"""
-        h_v = PropsSI('H', 'P', P_bar * 1e5, 'Q', 1, 'Water')
-        h_l = PropsSI('H', 'P', P_bar * 1e5, 'Q', 0, 'Water')
-        return h_v - h_l
+        return cls._propriete('lambda', P_bar, cls._chaleur_latente)
+
+    @classmethod
+    def Psat(cls, T):
+        """Pression de saturation (bar) à la température T (°C)"""
+        if cls.tables is not None:
+            return _scalaire(cls.tables.Psat(T), T)
+        return _scalaire(_Psat_coolprop(T), T)
+
+    @classmethod
+    def vider_cache(cls):
+        """Vide le cache des propriétés (à appeler après changement de backend)"""
+        if cls.cache is not None:
+            cls.cache.vider()
 
     @staticmethod
     def Cp_solution(x):
@@ -39,4 +278,4 @@ class Thermo:
         x : fraction massique
         T : température (°C)
         """
-        return 1000 + 400*x - 0.3*(T - 20)
\ No newline at end of file
+        return 1000 + 400*x - 0.3*(T - 20)
@@ -0,0 +1,9 @@
+"""
+Les modules de l'application sont des modules plats de app/ : les tests
+les importent comme l'application (python app/app_flask.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
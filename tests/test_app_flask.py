@@ -0,0 +1,165 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app_flask
+
+
+@pytest.fixture
+def client():
+    app_flask.CACHE_RESULTATS.vider()
+    app_flask.CACHE_CALCULS.vider()
+    return app_flask.app.test_client()
+
+
+def test_graphiques_d_une_page_sans_recalcul(client, monkeypatch):
+    appels = []
+    calculer = app_flask.calculer
+    monkeypatch.setattr(app_flask, 'calculer', lambda **p: appels.append(p) or calculer(**p))
+
+    resultats = client.post('/api/simuler', json={'F': 21000}).get_json()['resultats']
+    for url in resultats['graphiques'].values():
+        assert client.get(url + '&format=json').status_code == 200
+    assert len(appels) == 1
+
+
+@pytest.fixture
+def dossier_exports(tmp_path, monkeypatch):
+    dossier = tmp_path / 'exports'
+    monkeypatch.setattr(app_flask.export, 'DOSSIER_EXPORTS', str(dossier))
+    return dossier
+
+
+def test_nom_d_export_nettoye(client, dossier_exports):
+    corps = {'grille': {'pression': [1.4, 1.5]}, 'n_processus': 1, 'nom': '../../hors_exports'}
+    reponse = client.post('/api/export/balayage?format=csv&enregistrer=1', json=corps)
+    assert reponse.status_code == 200 and len(reponse.get_data(as_text=True).splitlines()) == 3
+    assert [p.name for p in dossier_exports.iterdir()] == ['hors_exports.csv']
+    assert not (dossier_exports.parent.parent / 'hors_exports.csv').exists()
+
+    for nom in ('..', '', '/'):
+        corps['nom'] = nom
+        reponse = client.post('/api/export/balayage?enregistrer=1', json=corps)
+        assert reponse.status_code == 400
+
+
+def test_grille_invalide_refusee_avant_le_flux(client):
+    reponse = client.post('/api/export/balayage', json={'grille': {'inconnu': [1, 2]}})
+    assert reponse.status_code == 400 and 'inconnu' in reponse.get_json()['error']
+
+
+def test_options_de_balayage_validees_et_plafonnees(client, monkeypatch):
+    for options in ({'taille_bloc': 0}, {'taille_bloc': 'abc'}, {'n_processus': 0},
+                    {'n_processus': 2.5}):
+        corps = {'grille': {'pression': [1.4, 1.5]}, **options}
+        reponse = client.post('/api/export/balayage', json=corps)
+        assert reponse.status_code == 400 and not reponse.get_json()['success']
+
+    monkeypatch.setattr(app_flask, 'MAX_PROCESSUS_BALAYAGE', 1)
+    assert app_flask.options_balayage() == (1, 5000)
+    assert app_flask.options_balayage(64, 10) == (1, 10)
+
+
+def test_excel_trop_grand_refuse(client, monkeypatch):
+    monkeypatch.setattr(app_flask.export, 'MAX_LIGNES_EXCEL', 2)
+    corps = {'grille': {'pression': [1.3, 1.4, 1.5]}, 'n_processus': 1}
+    reponse = client.post('/api/export/balayage?format=xlsx', json=corps)
+    assert reponse.status_code == 400 and not reponse.get_json()['success']
+
+
+def test_metriques_regroupees_par_famille(client):
+    client.post('/api/simuler', json={})
+    texte = client.get('/metrics').get_data(as_text=True)
+    familles = [ligne.split()[2] for ligne in texte.splitlines() if ligne.startswith('# TYPE')]
+    assert len(familles) == len(set(familles))
+    assert '# TYPE evap_cache_hits_total counter' in texte
+    assert '# TYPE evap_cache_misses_total counter' in texte
+    # Les échantillons d'une famille se suivent, une ligne par cache
+    echantillons = [ligne for ligne in texte.splitlines() if ligne and not ligne.startswith('#')]
+    noms = [ligne.split('{')[0].split()[0] for ligne in echantillons]
+    for famille in ('evap_cache_entrees', 'evap_cache_hits_total', 'evap_cache_misses_total'):
+        indices = [i for i, nom in enumerate(noms) if nom == famille]
+        assert len(indices) == 3 and indices == list(range(indices[0], indices[0] + 3))
+
+
+def _importer_dans_un_processus(code):
+    dossier_app = os.path.dirname(app_flask.__file__)
+    return subprocess.run([sys.executable, '-c', code], cwd=dossier_app,
+                          capture_output=True, text=True, timeout=120)
+
+
+def test_import_sans_bibliotheques_lourdes():
+    code = ("import sys, app_flask; "
+            "print(sorted(m for m in ('CoolProp', 'matplotlib', 'scipy', 'pandas') if m in sys.modules))")
+    assert _importer_dans_un_processus(code).stdout.strip().endswith('[]')
+
+
+def test_module_de_calcul_manquant_signale_a_l_import():
+    code = "import sys; sys.modules['incertitudes'] = None; import app_flask"
+    sortie = _importer_dans_un_processus(code)
+    assert sortie.returncode != 0
+    assert 'ModuleNotFoundError: import of incertitudes' in sortie.stderr
+    assert 'NameError' not in sortie.stderr
+
+
+def test_lot_egal_aux_simulations_unitaires(client):
+    scenarios = [{'F': 18000, 'T_feed': 80}, {'F': 22000, 'x_final': 0.6}]
+    reponse = client.post('/api/simuler/lot', json={'scenarios': scenarios}).get_json()
+    assert reponse['n'] == 2
+    colonnes = reponse['colonnes']
+    for scenario, ligne in zip(scenarios, reponse['lignes']):
+        d = app_flask.calculer(**app_flask.lire_parametres(scenario))
+        valeurs = dict(zip(colonnes, ligne))
+        assert valeurs['T1'] == pytest.approx(d['T'][0])
+        assert valeurs['A3'] == pytest.approx(d['A'][2])
+        assert valeurs['economie_vapeur'] == pytest.approx(d['E'])
+
+    csv = 'F,xF,x_final,T_feed\n18000,0.15,0.65,80\n22000,0.15,0.6,85\n'
+    texte = client.post('/api/simuler/lot?format=csv', data=csv, content_type='text/csv').get_data(as_text=True)
+    lignes = texte.splitlines()
+    assert lignes[0].split(',') == colonnes and len(lignes) == 3
+    assert float(lignes[1].split(',')[colonnes.index('T1')]) == pytest.approx(reponse['lignes'][0][4])
+
+
+def test_lot_borne(client, monkeypatch):
+    monkeypatch.setattr(app_flask, 'MAX_SCENARIOS', 1)
+    assert client.post('/api/simuler/lot', json=[{}, {}]).status_code == 413
+    assert client.post('/api/simuler/lot', json=[]).status_code == 400
+
+
+def test_telechargement_svg_et_etag(client):
+    reponse = client.get('/api/download/cristallisation?format=svg')
+    assert reponse.status_code == 200 and reponse.mimetype == 'image/svg+xml'
+    etag = reponse.headers['ETag']
+    assert client.get('/api/download/cristallisation?format=svg',
+                      headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/download/cristallisation').headers['ETag'] != etag
+    assert client.get('/api/download/cristallisation?format=gif').status_code == 400
+    reponse = client.get('/api/download/cristallisation?F=abc')
+    assert reponse.status_code == 400 and not reponse.get_json()['success']
+
+
+def test_historique_requete_invalide_refusee(client, tmp_path, monkeypatch):
+    stock = app_flask.StockageColonnaire(str(tmp_path))
+    stock.ajouter({'F': [15000., 20000.], 'tci': [1., 2.]})
+    monkeypatch.setenv('EVAP_STOCKAGE', '1')
+    monkeypatch.setitem(app_flask.HISTORIQUES, 'lot', stock)
+
+    reponse = client.get('/api/historique/lot?colonnes=tci&F=18000,').get_json()
+    assert reponse['colonnes'] == {'tci': [2.]}
+    for requete in ('colonnes=bogus', 'F=abc,', 'F=,1e5x'):
+        reponse = client.get('/api/historique/lot?' + requete)
+        assert reponse.status_code == 400 and not reponse.get_json()['success']
+
+
+def test_semence_parametrable_et_signalee(client):
+    defaut = client.post('/api/simuler', json={}).get_json()['resultats']
+    assert defaut['parametres']['masse_semence'] == 5.0
+    assert defaut['cristallisation']['domine_par_semence']
+
+    faible = client.post('/api/simuler', json={'masse_semence': 1e-3}).get_json()['resultats']
+    assert not faible['cristallisation']['domine_par_semence']
+    assert faible['cristallisation']['taille_moyenne'] != pytest.approx(
+        defaut['cristallisation']['taille_moyenne'], rel=0.01)
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from balayage import balayage_parallele, taille_grille
+from thermodynamique import Thermo
+
+GRILLE = {'pression': [1.3, 1.5, 1.7], 'concentration': [0.6, 0.65], 'debit': [18000, 22000]}
+
+
+def test_serie_egal_parallele():
+    serie = balayage_parallele(GRILLE, n_processus=1, taille_bloc=5, tables=False)
+    parallele = balayage_parallele(GRILLE, n_processus=2, taille_bloc=5, tables=False)
+    assert len(serie) == taille_grille(GRILLE) == 12
+    for nom in serie.dtype.names:
+        np.testing.assert_array_equal(serie[nom], parallele[nom])
+
+
+def test_serie_sans_effet_sur_thermo():
+    Thermo.Tsat(1.5)
+    tables, stats = Thermo.tables, Thermo.cache.stats()
+    T1 = balayage_parallele({'pression': [1.5]}, n_processus=1)['T1'][0]
+    assert Thermo.tables is tables
+    # Cache ni vidé ni remis à zéro
+    apres = Thermo.cache.stats()
+    assert apres['taille'] >= stats['taille'] and apres['hits'] >= stats['hits']
+    assert T1 == pytest.approx(121.43558579, abs=1e-8)
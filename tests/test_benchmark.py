@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+import pytest
+
+import benchmark
+
+
+def test_reference_absente_explicite(tmp_path):
+    with pytest.raises(FileNotFoundError, match='--enregistrer'):
+        benchmark.comparer({}, str(tmp_path / 'reference.json'))
+    sortie = subprocess.run([sys.executable, benchmark.__file__, '--comparer',
+                             '--reference', str(tmp_path / 'reference.json')],
+                            capture_output=True, text=True, timeout=120)
+    assert sortie.returncode == 2 and '--enregistrer' in sortie.stdout
+
+
+def test_regression_detectee(tmp_path):
+    chemin = benchmark.enregistrer_reference({'cas[1]': {'p50_ms': 1.0}, 'autre[1]': {'p50_ms': 1.0}},
+                                             str(tmp_path / 'reference.json'))
+    mesures = {'cas[1]': {'p50_ms': 1.5}, 'autre[1]': {'p50_ms': 1.1}, 'nouveau[1]': {'p50_ms': 1.0}}
+    assert benchmark.comparer(mesures, chemin, seuil=0.2) == ['cas[1]']
@@ -0,0 +1,39 @@
+import os
+
+from cache_resultats import VERSION_MODELE, CacheResultats, cle_parametres
+
+PARAMS = {'F': 20000, 'xF': 0.15, 'x_final': 0.65, 'T_feed': 85}
+
+
+def test_images_persistees_avec_leur_format(tmp_path):
+    cache = CacheResultats(dossier=str(tmp_path))
+    svg, png = b'<svg/>', b'\x89PNG'
+    cle_svg = cle_parametres(PARAMS, graphique='temperatures', format='svg')
+    cle_png = cle_parametres(PARAMS, graphique='temperatures', format='png')
+    assert cle_svg != cle_png
+    cache.enregistrer(cle_svg, svg, '.svg')
+    cache.enregistrer(cle_png, png, '.png')
+    cache.enregistrer('resultats', {'a': 1})
+    assert sorted(os.listdir(tmp_path)) == sorted([cle_svg + '.svg', cle_png + '.png', 'resultats.json'])
+
+    relu = CacheResultats(dossier=str(tmp_path))
+    assert relu.obtenir(cle_svg) == svg and relu.obtenir(cle_png) == png
+    assert relu.obtenir('resultats') == {'a': 1} and relu.stats()['hits_disque'] == 3
+
+
+def test_capacite_disque_et_vidage(tmp_path):
+    cache = CacheResultats(capacite=2, dossier=str(tmp_path), capacite_disque=3)
+    for i in range(5):
+        cache.enregistrer(f'cle{i}', {'i': i})
+    assert len(os.listdir(tmp_path)) == 3
+    cache.vider(disque=True)
+    assert os.listdir(tmp_path) == [] and cache.obtenir('cle4') is None
+
+
+def test_cle_depend_de_la_version_des_modeles(monkeypatch):
+    import cache_resultats
+    cle = cle_parametres(PARAMS)
+    monkeypatch.setattr(cache_resultats, 'VERSION_MODELE', VERSION_MODELE + 1)
+    assert cle_parametres(PARAMS) != cle
+    monkeypatch.setattr(cache_resultats, 'EMPREINTE_MODELES', 'autre')
+    assert cle_parametres(PARAMS) != cle
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from cristallisation import (balayage_continu, cascade_msmpr, msmpr, optimiser_refroidissement,
+                             profil_par_morceaux, simulation_batch, solubilite)
+from thermodynamique import Thermo
+
+
+def test_batch_signale_la_semence_dominante():
+    res = simulation_batch()
+    assert res['domine_par_semence']
+    assert abs(res['croissance_relative']) < 0.01
+    # Semence négligeable : la nucléation fait évoluer la distribution
+    res = simulation_batch(masse_semence=1e-3)
+    assert not res['domine_par_semence']
+
+
+def test_batch_vectorise_sur_les_profils():
+    profils = lambda t: np.array([70 - 35 * t / 14400, 70 - 20 * t / 14400])
+    res = simulation_batch(profils)
+    assert res['L50'].shape == (100, 2) and res['domine_par_semence'].shape == (2,)
+    seul = simulation_batch(lambda t: 70 - 20 * t / 14400)
+    np.testing.assert_allclose(res['C'][:, 1], seul['C'], rtol=1e-6)
+
+
+def test_profil_par_morceaux_vectorise_en_temps():
+    noeuds = np.array([[70, 60, 50, 40], [70, 65, 50, 35]])
+    t = np.linspace(0, 120, 9)
+    T = profil_par_morceaux(t, noeuds, 100)
+    assert T.shape == (2, 9)
+    np.testing.assert_allclose(T, np.column_stack([profil_par_morceaux(ti, noeuds, 100) for ti in t]))
+    assert profil_par_morceaux(50.0, noeuds[0], 100) == 55.0
+
+
+def test_optimum_non_rapporte_si_score_plat():
+    res = optimiser_refroidissement('cubique', n_candidats=8, n_generations=2)
+    assert not res['significatif'] and res['parametres'] is None and res['message']
+    res = optimiser_refroidissement('cubique', n_candidats=8, n_generations=2, masse_semence=1e-3)
+    assert res['significatif'] and res['parametres'] is not None
+
+
+def _cinetiques_constantes(G=1e-8):
+    return {'masse_semence': 0.0, 'L_noyau': 1e-12,
+            'f_croissance': lambda S, T: np.full(np.shape(S), G),
+            'f_nucleation': lambda S, mT: 1e8 * S}
+
+
+def test_msmpr_solution_analytique():
+    # Un étage, alimentation claire, G constant : n(L) ∝ exp(-L/Gτ), L43 = 4Gτ et CV = 50 %
+    res = msmpr(3600, 35.0, **_cinetiques_constantes())
+    assert res['L50'] == pytest.approx(4 * 1e-8 * 3600, rel=1e-6)
+    assert res['CV'] == pytest.approx(50, rel=1e-6)
+    # Soluté consommé = masse cristallisée
+    C_alim = solubilite(70.0)
+    rho = Thermo.densite(C_alim / 100, 70.0)
+    assert (C_alim - res['C']) * rho / 100 == pytest.approx(res['masse_cristaux'], rel=1e-6)
+
+
+def test_cascade_resserre_la_distribution():
+    grilles = balayage_continu([1800, 3600, 7200], (1, 2, 4), **_cinetiques_constantes())
+    assert grilles['CV'].shape == (3, 3)
+    assert np.all(np.diff(grilles['CV'], axis=1) < 0)
+    res = cascade_msmpr([3600, 3600], [1, 3])
+    assert np.isnan(res['etages']['T'][0, 1:]).all()
+    np.testing.assert_allclose(res['etages']['T'][1], [58.333333, 46.666667, 35.0], rtol=1e-6)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from evaporateurs import echelon, evaporation_dynamique
+
+
+def test_regime_permanent_stable_et_bilans_fermes():
+    res = evaporation_dynamique(3600)
+    np.testing.assert_allclose(res['M'][-1], res['M'][0], rtol=1e-6)
+    np.testing.assert_allclose(res['x'][-1], res['x'][0], rtol=1e-6)
+    # Bilans matière global et en soluté du dernier effet
+    assert res['L'][-1][-1] + res['V'][-1].sum() == pytest.approx(20000, rel=1e-6)
+    assert res['L'][-1][-1] * res['x'][-1][-1] == pytest.approx(20000 * 0.15, rel=1e-6)
+
+
+def test_echelon_de_debit_par_scenario():
+    res = evaporation_dynamique(6 * 3600, F=echelon(600, 20000, [18000, 22000]))
+    assert res['L'].shape == (121, 2, 3) and res['S'].shape == (121, 2)
+    np.testing.assert_allclose(res['L'][0, 0], res['L'][0, 1])
+    sortie = res['L'][-1][:, -1] + res['V'][-1].sum(axis=1)
+    np.testing.assert_allclose(sortie, [18000, 22000], rtol=5e-3)
+    # Plus de débit : moins concentré en sortie du dernier effet
+    assert res['x'][-1, 0, -1] > res['x'][-1, 1, -1]
+
+
+def test_vapeur_vive_trop_froide_refusee():
+    with pytest.raises(ValueError):
+        evaporation_dynamique(600, P_vapeur=0.5)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from economie import BORNES, PENALITE, cout_specifique, economic_optimization, section_doree
+
+
+def test_cout_specifique_scalaire_et_vectorise():
+    P = np.array([[1.5, 0.6, 0.15], [1.2, 0.5, 0.15]])
+    couts = cout_specifique([20000, 20000], 0.15, 0.65, P)
+    assert couts.shape == (2,)
+    assert cout_specifique(20000, 0.15, 0.65, P[0]) == pytest.approx(couts[0])
+
+
+def test_point_de_fonctionnement_par_defaut_faisable():
+    # Pressions à écarts de température égaux ; surfaces coûtées en m²
+    assert cout_specifique() == pytest.approx(38.5929, rel=1e-4)
+    # P1 = 1.5 bar : premier effet plus chaud que la vapeur de chauffe
+    assert cout_specifique(P=(1.5, 0.6, 0.15)) == PENALITE
+
+
+def test_section_doree_optimum_aux_bornes():
+    assert section_doree(lambda x: x, 2.0, 5.0)[:2] == (2.0, 2.0)
+    assert section_doree(lambda x: -x, 2.0, 5.0)[:2] == (5.0, -5.0)
+    x, f, _ = section_doree(lambda x: (x - 3) ** 2, 2.0, 5.0)
+    assert x == pytest.approx(3, abs=1e-2)
+
+
+def test_optimum_a_la_borne_du_debit():
+    recherche = economic_optimization(('F',))
+    grille = economic_optimization(('F',), 'grille')
+    assert recherche['variables']['F'] == BORNES['F'][1] == grille['variables']['F']
+    assert recherche['cout_specifique'] == pytest.approx(grille['cout_specifique'])
+
+
+@pytest.mark.parametrize('variables', [('F',), ('P1',), ('P1', 'P2'), ('P1', 'P2', 'P3', 'x_final')])
+def test_optimisation_sur_sous_ensembles(variables):
+    res = economic_optimization(variables)
+    assert list(res['variables']) == list(variables)
+    for nom, valeur in res['variables'].items():
+        assert BORNES[nom][0] - 1e-9 <= valeur <= BORNES[nom][1] + 1e-9
+    assert res['cout_specifique'] < cout_specifique() < PENALITE
+    grille = economic_optimization(variables, 'grille', n_grille=5)
+    assert res['cout_specifique'] <= grille['cout_specifique'] * (1 + 1e-3)
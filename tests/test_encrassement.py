@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from encrassement import (ages_depuis_nettoyage, bilan_reference, evaluer_plannings,
+                          optimiser_nettoyages, resistance_encrassement)
+
+
+def test_ages_et_resistance():
+    nettoyages = np.array([[0, 0], [1, 0], [0, 0], [0, 1]], dtype=bool)
+    np.testing.assert_array_equal(ages_depuis_nettoyage(nettoyages, pas=24),
+                                  [[0, 0], [0, 24], [24, 48], [48, 0]])
+    Rf = resistance_encrassement(np.array([0.0, 1e6]), 0.0004, 200.0)
+    assert Rf[0] == 0 and Rf[1] == pytest.approx(0.0004)
+
+
+def test_plannings_evalues_en_une_passe():
+    reference = bilan_reference()
+    plannings = np.random.default_rng(0).random((20, 28, 3)) < 0.1
+    couts = evaluer_plannings(plannings, reference=reference)
+    un_a_un = [evaluer_plannings(p, reference=reference)[0] for p in plannings]
+    np.testing.assert_allclose(couts, un_a_un)
+
+
+def test_optimum_meilleur_que_les_references():
+    res = optimiser_nettoyages(duree_campagne=28, intervalles=[1, 2, 4, 7, 14, 28],
+                               n_candidats=200, n_generations=3)
+    jamais = evaluer_plannings(np.zeros((28, 3), dtype=bool))[0]
+    assert res['cout'] <= res['cout_periodique'] <= jamais
+
+    planning = np.zeros((28, 3), dtype=bool)
+    for n in res['nettoyages']:
+        planning[n['periode'], np.array(n['effets']) - 1] = True
+    assert evaluer_plannings(planning)[0] == pytest.approx(res['cout'])
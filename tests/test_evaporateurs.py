@@ -0,0 +1,24 @@
+import numpy as np
+
+from evaporateurs import evaporation_triple_effet, evaporation_multi_cas
+
+
+def test_multi_cas_egal_aux_cas_scalaires():
+    F = np.array([16000.0, 20000.0, 24000.0])
+    xF = np.array([0.12, 0.15, 0.18])
+    T_feed = np.array([70.0, 85.0, 95.0])
+    P = [1.5, 0.6, 0.15]
+    L, V, x, T, Q = evaporation_multi_cas(F, xF, 0.65, P, T_feed)
+    assert T.shape == (3, 3)
+    for i in range(3):
+        scalaire = evaporation_triple_effet(F[i], xF[i], 0.65, P, T_feed[i])
+        for lot, ref in zip((L, V, x, T, Q), scalaire):
+            np.testing.assert_allclose(lot[i], ref, rtol=1e-12)
+
+
+def test_bilan_matiere():
+    L, V, x, T, Q = evaporation_multi_cas(20000, 0.15, 0.65, [1.5, 0.6, 0.15], 85)
+    assert np.isclose(L[0, -1], 20000 * 0.15 / 0.65)
+    assert np.isclose(L[0, -1] + V[0].sum(), 20000)
+    assert np.isclose(x[0, -1], 0.65)
+    assert np.all(np.diff(T[0]) < 0)
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app_flask
+import graphiques
+from graphiques import GRAPHIQUES, Rendu, tracer
+
+PARAMETRES = [(16000, 0.12, 0.6, 70), (18000, 0.15, 0.6, 85), (20000, 0.15, 0.65, 85), (24000, 0.2, 0.7, 90)]
+
+
+@pytest.fixture(scope='module')
+def donnees():
+    return [graphiques.donnees_graphiques(app_flask.calculer(*p)) for p in PARAMETRES]
+
+
+def test_rendus_concurrents_independants(donnees):
+    attendus = [tracer('profils_temp_conc', d, gabarit=False) for d in donnees]
+    assert len(set(attendus)) == len(attendus)
+    with ThreadPoolExecutor(4) as pool:
+        for _ in range(3):
+            # Gabarits par thread : chaque thread met à jour sa propre figure
+            images = list(pool.map(lambda d: tracer('profils_temp_conc', d), donnees))
+            assert images == attendus
+
+
+@pytest.mark.parametrize('mode', ['thread', 'processus'])
+def test_rendu_parallele(donnees, mode):
+    rendu = Rendu(n_workers=2, mode=mode)
+    try:
+        images = rendu.tracer_tous(donnees[0])
+    finally:
+        rendu.fermer()
+    assert list(images) == list(GRAPHIQUES)
+    assert all(image.startswith(b'\x89PNG') for image in images.values())
+
+
+def test_pool_de_rendu_unique_sous_concurrence(monkeypatch):
+    crees = []
+
+    def executeur_lent(*args, **kwargs):
+        time.sleep(0.05)            # élargit la fenêtre entre le test et l'affectation
+        crees.append(ThreadPoolExecutor(*args, **kwargs))
+        return crees[-1]
+
+    monkeypatch.setattr(graphiques, 'ThreadPoolExecutor', executeur_lent)
+    rendu = Rendu(n_workers=2)
+    with ThreadPoolExecutor(8) as pool:
+        pools = list(pool.map(lambda _: rendu._executeur(), range(8)))
+    rendu.fermer()
+    assert len(crees) == 1 and all(p is crees[0] for p in pools)
+
+
+def test_gabarit_mis_a_jour_comme_figure_reconstruite(donnees):
+    gabarit = graphiques.Gabarit('vapeur_surface', donnees[0])
+    gabarit.mettre_a_jour(donnees[3])
+    reconstruite, _ = graphiques.construire('vapeur_surface', donnees[3])
+    for ax, ref in zip(gabarit.figure.axes, reconstruite.axes):
+        assert ax.get_ylim() == pytest.approx(ref.get_ylim())
+        assert [t.get_text() for t in ax.texts] == [t.get_text() for t in ref.texts]
+        assert [b.get_height() for b in ax.patches] == pytest.approx([b.get_height() for b in ref.patches])
+
+
+def test_formats_svg_et_json(donnees):
+    assert tracer('cristallisation', donnees[0], 'svg').lstrip().startswith(b'<?xml')
+    description = graphiques.donnees_graphique('vapeur_surface', donnees[0])
+    assert [p['titre'] for p in description['panneaux']] == ["Production de vapeur", "Surface d'échange"]
+    assert description['panneaux'][0]['y'] == pytest.approx(list(donnees[0]['V']))
+    with pytest.raises(ValueError):
+        tracer('cristallisation', donnees[0], 'gif')
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from incertitudes import DISTRIBUTIONS, SORTIES, echantillonner, evaluer_echantillons, monte_carlo
+
+
+def test_lois_des_entrees():
+    u = np.random.default_rng(0).random((100000, len(DISTRIBUTIONS)))
+    e = echantillonner(u)
+    assert e['U1'].mean() == pytest.approx(2500, rel=0.01) and e['U1'].std() == pytest.approx(250, rel=0.02)
+    assert 20 <= e['prix_vapeur'].min() and e['prix_vapeur'].max() <= 35
+    assert 0.0001 <= e['Rf'].min() and e['Rf'].max() <= 0.0004
+
+
+def test_evaluation_vectorisee():
+    e = echantillonner(np.random.default_rng(1).random((5, len(DISTRIBUTIONS))))
+    ensemble = evaluer_echantillons(e)
+    for i in range(5):
+        seul = evaluer_echantillons({nom: v[i:i + 1] for nom, v in e.items()})
+        for nom in SORTIES:
+            assert seul[nom][0] == pytest.approx(ensemble[nom][i])
+
+
+def test_arret_a_la_tolerance():
+    res = monte_carlo('sobol', tolerance=0.01, n_max=2**16)
+    assert res['converge'] and res['n_echantillons'] < 2**16
+    assert res['historique'][-1]['ecart_relatif'] <= 0.01
+    p = res['sorties']['tci']['percentiles']
+    assert p['5'] < p['50'] < p['95']
+
+    res = monte_carlo('lhs', tolerance=1e-9, n_initial=64, n_max=2**12, retourner_echantillons=True)
+    assert not res['converge'] and res['n_echantillons'] == 2**12
+    assert res['echantillons']['U1'].shape == (2**12,)
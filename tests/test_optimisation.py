@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from evaporateurs import evaporation_n_effets, evaporation_triple_effet, pressions_effets
+from optimisation import balayage_nombre_effets, dimensionnement_surfaces_egales, ecarts_temperature
+from thermodynamique import CacheProprietes
+
+
+def test_n_effets_coherent_avec_triple_effet():
+    P = [1.5, 0.6, 0.15]
+    for a, b in zip(evaporation_n_effets(20000, 0.15, 0.65, P, 85),
+                    evaporation_triple_effet(20000, 0.15, 0.65, P, 85)):
+        np.testing.assert_allclose(a, b)
+
+
+def test_pressions_effets_ecarts_egaux():
+    for n in (2, 4, 6):
+        P = pressions_effets(n, 0.15, 0.65)
+        assert len(P) == n and np.all(np.diff(P) < 0)
+        _, _, _, T, _ = evaporation_n_effets(20000, 0.15, 0.65, P, 85)
+        DT = ecarts_temperature(T)
+        np.testing.assert_allclose(DT, DT[0], rtol=1e-3)
+
+
+def test_economie_croit_avec_le_nombre_d_effets():
+    res = balayage_nombre_effets([18000, 22000], 0.15, 0.65, n_effets=range(1, 6))
+    assert res['economie'].shape == (5, 2)
+    assert np.all(np.diff(res['economie'], axis=0) > 0)
+
+
+def test_surfaces_egales_a_la_surface_cible():
+    res = dimensionnement_surfaces_egales(20000, 0.15, 0.65, 85, A_cible=200)
+    assert res['converge'] and res['message'] is None
+    np.testing.assert_allclose(res['A_m2'], 200, rtol=1e-5)
+
+
+def test_surface_cible_inatteignable_signalee():
+    res = dimensionnement_surfaces_egales([20000, 20000], 0.15, 0.65, 85, A_cible=[5, 200])
+    assert not res['converge']
+    assert res['faisable'].tolist() == [False, True]
+    assert res['T_vapeur'][0] <= 370.0 and res['message']
+    np.testing.assert_allclose(res['A_m2'][1], 200, rtol=1e-5)
+
+
+def test_pression_non_finie_refusee():
+    with pytest.raises(ValueError):
+        CacheProprietes().obtenir('T', float('inf'), lambda P: P)
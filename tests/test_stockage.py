@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from stockage import StockageColonnaire
+
+
+def test_ajout_filtre_relecture_et_compactage(tmp_path):
+    stock = StockageColonnaire(str(tmp_path))
+    stock.ajouter({'F': np.array([15000., 20000.]), 'tci': np.array([1., 2.])})
+    bloc = np.array([(25000., 3.)], dtype=[('F', 'f8'), ('tci', 'f8')])
+    stock.ajouter(bloc)
+    assert len(stock) == 3 and sorted(stock.colonnes) == ['F', 'tci']
+
+    # Relu par une autre instance (manifeste sur disque)
+    relu = StockageColonnaire(str(tmp_path))
+    np.testing.assert_array_equal(relu.lire(['tci'], F=(18000, None))['tci'], [2., 3.])
+    assert len(relu.lire(F=(None, 1000))['F']) == 0
+
+    relu.compacter()
+    assert len(relu.manifeste['blocs']) == 1
+    np.testing.assert_array_equal(relu.lire()['F'], [15000., 20000., 25000.])
+    assert len(list(tmp_path.glob('bloc_*'))) == 1
+
+
+def test_ecrivains_independants_sans_collision(tmp_path):
+    # Deux instances (comme deux processus) dont le manifeste en mémoire est périmé
+    a, b = StockageColonnaire(str(tmp_path)), StockageColonnaire(str(tmp_path))
+    a.ajouter({'F': np.array([1.])})
+    b.ajouter({'F': np.array([2.])})
+    a.ajouter({'F': np.array([3.])})
+    np.testing.assert_array_equal(b.lire()['F'], [1., 2., 3.])
+
+    b.compacter()
+    a.ajouter({'F': np.array([4.])})
+    np.testing.assert_array_equal(a.lire()['F'], [1., 2., 3., 4.])
+    assert len(list(tmp_path.glob('bloc_*'))) == 2
+
+
+def test_colonnes_incoherentes_refusees(tmp_path):
+    stock = StockageColonnaire(str(tmp_path))
+    stock.ajouter({'F': np.zeros(2)})
+    with pytest.raises(ValueError):
+        stock.ajouter({'x': np.zeros(2)})
+    with pytest.raises(ValueError):
+        stock.ajouter({'F': np.zeros(2), 'x': np.zeros(3)})
+    with pytest.raises(KeyError):
+        stock.lire(['x'])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from evaporateurs import evaporation_multi_cas
+from substitut import Substitut, entrainer
+
+
+@pytest.fixture(scope='module')
+def substitut():
+    return entrainer(n=256, n_validation=64)
+
+
+def test_precision_et_bilans_exacts(substitut):
+    assert max(v for k, v in substitut.erreurs.items() if k.endswith('_max')) < 1e-2
+    P = np.array([[1.5, 0.6, 0.15], [1.2, 0.5, 0.2]])
+    rapide = substitut.evaporation_multi_cas([18000, 21000], 0.15, 0.65, P, 85)
+    complet = evaporation_multi_cas([18000, 21000], 0.15, 0.65, P, 85)
+    for a, b in zip(rapide[:3], complet[:3]):
+        np.testing.assert_allclose(a, b)
+    np.testing.assert_allclose(rapide[3], complet[3], rtol=1e-2)
+    np.testing.assert_allclose(rapide[4], complet[4], rtol=1e-2)
+
+
+def test_hors_domaine_modele_complet(substitut):
+    P = np.array([[1.5, 0.6, 0.15], [3.0, 0.6, 0.15]])   # P1 = 3 bar hors domaine
+    assert substitut.dans_domaine(np.array([[20000, 0.15, 0.65, 85, *p] for p in P])).tolist() == [True, False]
+    _, _, _, T, Q = substitut.evaporation_multi_cas(20000, 0.15, 0.65, P, 85)
+    _, _, _, T_ref, Q_ref = evaporation_multi_cas(20000, 0.15, 0.65, P[1:], 85)
+    np.testing.assert_array_equal(T[1], T_ref[0])
+    np.testing.assert_array_equal(Q[1], Q_ref[0])
+
+
+def test_enregistrement(substitut, tmp_path):
+    chemin = str(tmp_path / 'substitut.npz')
+    substitut.enregistrer(chemin)
+    relu = Substitut.charger(chemin)
+    X = np.array([[20000, 0.15, 0.65, 85, 1.5, 0.6, 0.15]])
+    np.testing.assert_array_equal(relu.predire(X), substitut.predire(X))
+    assert relu.erreurs == substitut.erreurs
+
+
+def test_type_inconnu():
+    with pytest.raises(ValueError):
+        entrainer('reseau', n=16, n_validation=4)
@@ -0,0 +1,36 @@
+import threading
+
+from taches import GestionnaireTaches, Tache
+
+
+def test_partiels_bornes_et_liberes_en_fin_de_tache():
+    tache = Tache('essai', {}, max_partiels=5)
+    lecteur = tache.suivre(delai=0.1)
+    tache.publier(range(3))
+    assert [next(lecteur) for _ in range(3)] == [0, 1, 2]
+    tache.publier(range(3, 20))
+    assert len(tache.partiels) == 5 and tache.n_partiels == 20
+
+    tache._terminer('terminee', resultat={'n': 20})
+    assert len(tache.partiels) == 0 and tache.etat_json()['n_partiels'] == 20
+    # Le lecteur en cours finit sa lecture (les plus anciens non lus sont perdus)
+    assert list(lecteur) == list(range(15, 20))
+    assert list(tache.suivre()) == []
+
+
+def test_execution_et_etat():
+    gestionnaire = GestionnaireTaches(n_workers=1)
+    demarre, libere = threading.Event(), threading.Event()
+
+    def calcul(tache, n):
+        demarre.set()
+        libere.wait(5)
+        tache.publier(range(n))
+        return n
+
+    tache = gestionnaire.soumettre('essai', calcul, {'n': 4})
+    assert demarre.wait(5)
+    assert tache.etat == 'en_cours' and tache.debut is not None
+    libere.set()
+    list(tache.suivre())
+    assert tache.etat == 'terminee' and tache.resultat == 4 and tache.n_partiels == 4
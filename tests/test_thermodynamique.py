@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from thermodynamique import CacheProprietes, TableSaturation, Thermo, _Psat_coolprop, _Tsat_coolprop
+
+
+@pytest.fixture(scope='module')
+def table():
+    return TableSaturation()
+
+
+def test_tables_proches_de_coolprop(table):
+    erreurs = table.verifier()
+    assert erreurs['erreur_Tsat_max'] < 1e-3 and erreurs['erreur_lambda_rel_max'] < 1e-5
+    T = np.array([60.0, 100.0, 140.0])
+    np.testing.assert_allclose(table.Psat(T), _Psat_coolprop(T), rtol=1e-5)
+
+
+def test_tables_hors_plage_renvoyees_a_coolprop(table):
+    P = np.array([0.01, 1.0, 10.0])
+    np.testing.assert_allclose(table.Tsat(P), _Tsat_coolprop(P), atol=1e-3)
+
+
+def test_activer_tables_vectorise():
+    P = np.linspace(0.1, 2.0, 50)
+    try:
+        Thermo.activer_tables()
+        T = Thermo.Tsat(P)
+        assert T.shape == P.shape
+        # Scalaires : cache quantifié à 1e-6 bar
+        np.testing.assert_allclose(T, [Thermo.Tsat(p) for p in P], atol=1e-3)
+        np.testing.assert_allclose(T, _Tsat_coolprop(P), atol=1e-3)
+    finally:
+        Thermo.desactiver_tables()
+    assert Thermo.tables is None
+
+
+def test_cache_lru_et_compteurs():
+    cache = CacheProprietes(capacite=2)
+    appels = []
+    calcul = lambda P: appels.append(P) or 2 * P
+    assert cache.obtenir('x', 1.0, calcul) == 2.0
+    assert cache.obtenir('x', 1.0 + 1e-9, calcul) == 2.0   # même pression quantifiée
+    cache.obtenir('x', 2.0, calcul)
+    cache.obtenir('x', 3.0, calcul)                       # évince 1.0
+    cache.obtenir('x', 1.0, calcul)
+    stats = cache.stats()
+    assert len(appels) == 4
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['taille']) == (1, 4, 2, 2)
+
+
+def test_cache_tableau_une_consultation_par_pression():
+    cache = CacheProprietes()
+    P = np.array([[1.5, 0.6], [1.5, 0.15]])
+    valeurs = cache.obtenir_tableau('Tsat', P, _Tsat_coolprop)
+    np.testing.assert_allclose(valeurs, _Tsat_coolprop(P), atol=1e-8)
+    assert cache.stats()['misses'] == 3